@@ -0,0 +1,387 @@
+"""
+Emulador do ESP32 no PC (CPython)
+Roda o mesmo servidor e o mesmo tratamento de comandos de main.py com Pin e
+PWM simulados, que registram cada escrita com horário. Um proxy entre o PC e
+o firmware pode adicionar latência, jitter e perda (TCP: perda vira atraso de
+retransmissão, com bloqueio de ordem; UDP: o datagrama some e a ordem pode
+trocar). Permite testar carga e latência do LineFollower sem o hardware:
+
+    python emulator.py --latency 5 --jitter 3 --loss 0.02 --log escritas.csv
+    python line_follower.py 127.0.0.1 --camera gravacao.avi --headless --latency-log lat.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import importlib.util
+import os
+import random
+import sys
+import time
+import types
+
+FIRMWARE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+# Penalidade de um segmento TCP perdido (retransmissão mínima do Linux)
+TCP_RETRANSMIT_MS = 200
+
+
+class WriteLog:
+    """Escritas nos pinos: (horário monotonic, nome, valor)"""
+
+    def __init__(self):
+        self.entries = []
+
+    def record(self, name, value):
+        self.entries.append((time.monotonic(), name, value))
+
+    def counts(self):
+        """Escritas por pino"""
+        result = {}
+        for _, name, _ in self.entries:
+            result[name] = result.get(name, 0) + 1
+        return result
+
+    def save(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['t', 'pin', 'value'])
+            start = self.entries[0][0] if self.entries else 0.0
+            for t, name, value in self.entries:
+                writer.writerow([round(t - start, 6), name, value])
+
+
+def fake_machine(log=None):
+    """Módulo machine com Pin e PWM simulados (log=None não registra escritas)"""
+    machine = types.ModuleType('machine')
+
+    class Pin:
+        OUT = 1
+        IN = 0
+
+        def __init__(self, pin_id, mode=None, *args, **kwargs):
+            self.id = pin_id
+            self._value = 0
+
+        def value(self, value=None):
+            if value is None:
+                return self._value
+            self._value = value
+            if log is not None:
+                log.record(f"pin{self.id}", value)
+
+        def __call__(self, value=None):
+            return self.value(value)
+
+    class PWM:
+        def __init__(self, pin, freq=None, duty=None, **kwargs):
+            self.id = pin.id
+            self._freq = freq
+            self._duty = duty or 0
+
+        def freq(self, freq=None):
+            if freq is None:
+                return self._freq
+            self._freq = freq
+
+        def duty(self, duty=None):
+            if duty is None:
+                return self._duty
+            self._duty = duty
+            if log is not None:
+                log.record(f"pwm{self.id}", duty)
+
+        def duty_u16(self, duty=None):
+            if duty is None:
+                return self._duty * 64
+            self._duty = duty // 64
+            if log is not None:
+                log.record(f"pwm{self.id}", self._duty)
+
+        def deinit(self):
+            pass
+
+    machine.Pin = Pin
+    machine.PWM = PWM
+    machine.emulated = True
+    return machine
+
+
+def load_firmware(log=None, name='esp32_main'):
+    """
+    Importa main.py com machine/network simulados
+    Não substitui um módulo machine real; um simulado é trocado para registrar em log
+    """
+    machine = sys.modules.get('machine')
+    if machine is None or getattr(machine, 'emulated', False):
+        sys.modules['machine'] = fake_machine(log)
+    sys.modules.setdefault('network', types.ModuleType('network'))
+
+    spec = importlib.util.spec_from_file_location(name, FIRMWARE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LinkProfile:
+    """Atraso de um sentido do enlace: latência + jitter (ms) e perda (0-1)"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, loss=0.0, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.loss = loss
+        self.random = random.Random(seed)
+
+        # Estatísticas
+        self.forwarded = 0
+        self.dropped = 0
+
+    @property
+    def impaired(self):
+        return self.latency > 0 or self.jitter > 0 or self.loss > 0
+
+    def delay(self):
+        return self.latency + self.random.uniform(0, self.jitter)
+
+    def lost(self):
+        return self.loss > 0 and self.random.random() < self.loss
+
+
+class TcpLink:
+    """Um sentido de uma conexão TCP: entrega em ordem, cada bloco com seu atraso"""
+
+    def __init__(self, reader, writer, profile):
+        self.reader = reader
+        self.writer = writer
+        self.profile = profile
+        self._queue = asyncio.Queue()
+        self._last_delivery = 0.0
+
+    async def receive(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await self.reader.read(4096)
+            if not data:
+                break
+            deliver_at = loop.time() + self.profile.delay()
+            if self.profile.lost():
+                # O segmento é retransmitido; os seguintes esperam por ele
+                deliver_at += TCP_RETRANSMIT_MS / 1000
+                self.profile.dropped += 1
+            # TCP não reordena: nunca entrega antes do bloco anterior
+            deliver_at = max(deliver_at, self._last_delivery)
+            self._last_delivery = deliver_at
+            await self._queue.put((deliver_at, data))
+        await self._queue.put((None, None))
+
+    async def deliver(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            deliver_at, data = await self._queue.get()
+            if data is None:
+                break
+            delay = deliver_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.writer.write(data)
+            await self.writer.drain()
+            self.profile.forwarded += 1
+        self.writer.close()
+
+
+class UdpRelay(asyncio.DatagramProtocol):
+    """Recebe datagramas e os reenvia com atraso/perda por uma função de saída"""
+
+    def __init__(self, profile, forward):
+        self.profile = profile
+        self.forward = forward
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if self.profile.lost():
+            self.profile.dropped += 1
+            return
+        # Cada datagrama tem seu atraso: com jitter a ordem pode trocar
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.profile.delay(), self._send, data, addr)
+
+    def _send(self, data, addr):
+        self.profile.forwarded += 1
+        self.forward(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+class EmulatedESP32:
+    """
+    Firmware de main.py em localhost atrás de um proxy com perturbações
+    Sem perturbações o firmware escuta direto nas portas públicas
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, udp_port=8766, latency_ms=0.0,
+                 jitter_ms=0.0, loss=0.0, ramp=True, seed=None, log=None,
+                 internal_offset=1000):
+        self.log = log if log is not None else WriteLog()
+        self.firmware = load_firmware(self.log)
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.ramp = ramp
+        self.uplink = LinkProfile(latency_ms, jitter_ms, loss, seed)
+        self.downlink = LinkProfile(latency_ms, jitter_ms, loss,
+                                    None if seed is None else seed + 1)
+        self.proxied = self.uplink.impaired
+        self.internal_offset = internal_offset if self.proxied else 0
+        self.motor_control = None
+        self._tasks = []
+        self._servers = []
+        self._transports = []
+
+    @property
+    def firmware_port(self):
+        return self.port + self.internal_offset
+
+    @property
+    def firmware_udp_port(self):
+        return self.udp_port + self.internal_offset if self.udp_port else 0
+
+    async def start(self):
+        """Inicia o firmware (e o proxy, se houver perturbações)"""
+        firmware = self.firmware
+        if self.ramp and firmware.SLEW_RATE:
+            self.motor_control = firmware.SmoothMotorControl()
+        else:
+            self.motor_control = firmware.MotorControl()
+
+        self._tasks.append(asyncio.create_task(firmware.serve(
+            self.motor_control, self.host, self.firmware_port, self.firmware_udp_port)))
+        # Deixa o servidor do firmware abrir as portas
+        await asyncio.sleep(0.05)
+
+        if self.proxied:
+            self._servers.append(await asyncio.start_server(self._proxy_tcp, self.host,
+                                                            self.port))
+            if self.udp_port:
+                await self._start_udp_proxy()
+
+    async def _proxy_tcp(self, client_reader, client_writer):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.firmware_port)
+        except OSError:
+            client_writer.close()
+            return
+
+        up = TcpLink(client_reader, writer, self.uplink)
+        down = TcpLink(reader, client_writer, self.downlink)
+        await asyncio.gather(up.receive(), up.deliver(), down.receive(), down.deliver(),
+                             return_exceptions=True)
+
+    async def _start_udp_proxy(self):
+        loop = asyncio.get_running_loop()
+        upstreams = {}  # cliente -> socket ligado ao firmware (as respostas voltam por ele)
+
+        def to_client(data, client):
+            public.sendto(data, client)
+
+        def to_firmware(data, client):
+            upstream = upstreams.get(client)
+            if upstream is not None:
+                upstream.sendto(data)
+            else:
+                asyncio.ensure_future(open_upstream(client, data))
+
+        async def open_upstream(client, data):
+            if client not in upstreams:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: UdpRelay(self.downlink, lambda reply, _: to_client(reply, client)),
+                    remote_addr=(self.host, self.firmware_udp_port))
+                upstreams[client] = transport
+                self._transports.append(transport)
+            upstreams[client].sendto(data)
+
+        public, _ = await loop.create_datagram_endpoint(
+            lambda: UdpRelay(self.uplink, to_firmware), local_addr=(self.host, self.udp_port))
+        self._transports.append(public)
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+        for transport in self._transports:
+            transport.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def report(self):
+        """Linhas de resumo: escritas por pino e tráfego do proxy"""
+        entries = self.log.entries
+        lines = []
+        if entries:
+            duration = max(entries[-1][0] - entries[0][0], 1e-6)
+            lines.append(f"Escritas nos pinos: {len(entries)} "
+                         f"({len(entries) / duration:.0f}/s em {duration:.1f} s)")
+            lines.append("  " + ", ".join(f"{name}: {count}"
+                                          for name, count in sorted(self.log.counts().items())))
+        if self.proxied:
+            lines.append(f"Proxy PC->ESP32: {self.uplink.forwarded} entregues, "
+                         f"{self.uplink.dropped} perdidos")
+            lines.append(f"Proxy ESP32->PC: {self.downlink.forwarded} entregues, "
+                         f"{self.downlink.dropped} perdidos")
+        return lines
+
+
+async def run(args):
+    emulator = EmulatedESP32(args.host, args.port, args.udp_port, args.latency, args.jitter,
+                             args.loss, ramp=not args.no_ramp, seed=args.seed)
+    await emulator.start()
+    print(f"✓ ESP32 emulado em ws://{args.host}:{args.port}"
+          f"{f' e UDP {args.udp_port}' if args.udp_port else ''}")
+    if emulator.proxied:
+        print(f"  Enlace: {args.latency} ms ± {args.jitter} ms, perda {args.loss * 100:.1f}% "
+              f"(firmware em {emulator.firmware_port})")
+
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await emulator.stop()
+        for line in emulator.report():
+            print(line)
+        if args.log:
+            emulator.log.save(args.log)
+            print(f"✓ Escritas salvas em {args.log}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ESP32 emulado (firmware de main.py no PC)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--udp-port', type=int, default=8766,
+                        help='Porta do canal UDP (0 desativa)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Atraso em cada sentido (ms)')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Atraso extra aleatório de 0 a JITTER ms')
+    parser.add_argument('--loss', type=float, default=0.0,
+                        help='Probabilidade de perda por pacote (0-1)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Semente do gerador aleatório (execuções reproduzíveis)')
+    parser.add_argument('--no-ramp', action='store_true',
+                        help='MotorControl sem rampa (PWM aplicado direto no comando)')
+    parser.add_argument('--log', type=str, default=None, metavar='ARQUIVO',
+                        help='Salva as escritas nos pinos (CSV) ao sair')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n✓ Emulador encerrado")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,37 @@ import time
 from machine import Pin, PWM
 import json
 import struct
+import gc
+import hashlib
+import binascii
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    # CPython (testes com módulo machine simulado)
+    import asyncio
+
+# Relógio em milissegundos (MicroPython tem ticks_ms/ticks_diff nativos)
+if hasattr(time, 'ticks_ms'):
+    ticks_ms = time.ticks_ms
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+else:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_us():
+        return int(time.monotonic() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+# Horários ecoados nos acks (µs, com wrap em 2^29 - divide o período dos ticks
+# do MicroPython; o PC desfaz o wrap e estima o offset entre os relógios)
+TIMING_MASK = (1 << 29) - 1
+
+def timing_us():
+    return ticks_us() & TIMING_MASK
 
 # Configuração dos pinos do motor (ajuste conforme seu hardware)
 # Motor Esquerdo
@@ -25,9 +56,93 @@ MOTOR_RIGHT_PWM = 14
 SSID = "SEU_WIFI"  # Altere para seu WiFi
 PASSWORD = "SUA_SENHA"  # Altere para sua senha
 PORT = 8765
+UDP_PORT = 8766  # Canal de controle UDP (0 desativa)
+
+# Para os motores se nenhum comando chegar neste intervalo (0 desativa)
+WATCHDOG_TIMEOUT_MS = 1000
+
+# Intervalo de envio de telemetria ao PC (0 desativa)
+TELEMETRY_INTERVAL_MS = 1000
+
+# Mostra cada comando recebido no serial (lento em altas taxas de comando)
+VERBOSE = False
+
+# Protocolo binário de comandos (mantenha em sincronia com pc/protocol.py)
+# Comando: opcode, seq, velocidade esquerda, velocidade direita, flags
+COMMAND_FORMAT = '<BHbbB'
+COMMAND_SIZE = struct.calcsize(COMMAND_FORMAT)
+ACK_FORMAT = '<BHB'  # opcode, seq, status
+# Ack com horários: + recepção e PWM aplicado (µs, timing_us) - sempre nos últimos 8 bytes
+ACK_TIMING_FORMAT = '<BHBII'
+
+OP_STOP = 0x00
+OP_FORWARD = 0x01
+OP_BACKWARD = 0x02
+OP_LEFT = 0x03
+OP_RIGHT = 0x04
+OP_SHARP_LEFT = 0x05
+OP_SHARP_RIGHT = 0x06
+OP_CUSTOM = 0x07
+OP_LINE = 0x08   # Erro da linha: esquerda = erro, direita = heading (x127), confiança nos bits 1-7 das flags
+OP_GAINS = 0x09  # Ganhos do controlador de direção (somente JSON)
+OP_ACK = 0x80
+
+# Datagrama UDP: comando + timestamp do PC (ms)
+# Ack: opcode, seq, status, timestamp ecoado, recepção e PWM aplicado (µs)
+UDP_COMMAND_FORMAT = '<BHbbBI'
+UDP_COMMAND_SIZE = struct.calcsize(UDP_COMMAND_FORMAT)
+UDP_ACK_FORMAT = '<BHBIII'
+
+FLAG_ACK_REQUESTED = 0x01
+LINE_SCALE = 127  # Erro e heading normalizados (-1 a 1) viram int8
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Opcodes WebSocket
+WS_OPCODE_TEXT = 0x01
+WS_OPCODE_BINARY = 0x02
+WS_OPCODE_CLOSE = 0x08
+WS_OPCODE_PING = 0x09
+
+# Buffer de recepção pré-alocado (maior frame aceito)
+WS_BUFFER_SIZE = 2048
+
+# Laço de controle dos motores no ESP32 (rampa de PWM)
+CONTROL_PERIOD_MS = 5  # 200 Hz
+SLEW_RATE = 400        # Variação máxima de velocidade (%/s); 0 aplica os comandos direto
+HOLD_MS = 250          # Mantém o último setpoint por este tempo sem pacotes novos...
+DECAY_RATE = 150       # ...e depois reduz o alvo até zero nesta taxa (%/s)
+
+# Controlador de direção local (PC envia só o erro da linha)
+STEERING_ENABLED = True
+STEER_KP = 60.0             # Correção (pontos de velocidade) por unidade de erro normalizado
+STEER_KI = 10.0
+STEER_KD = 8.0
+STEER_KFF = 20.0            # Feed-forward do heading da linha
+STEER_BASE_SPEED = 45
+STEER_MAX_CORRECTION = 70
+STEER_INTEGRAL_LIMIT = 1.0
+STEER_TIMEOUT_MS = 300      # Sem erro novo neste tempo, o controlador solta os motores
+
+# Datagramas UDP que chegam com atraso acima deste (relativo ao menor atraso visto) são descartados
+UDP_STALE_MS = 150
+# Após tantos descartes seguidos por atraso, assume que o relógio mudou e ressincroniza
+UDP_STALE_RESYNC = 10
+
+# Duty por velocidade inteira (0-100%), calculado uma vez: 10 bits (duty) e 16 bits (duty_u16)
+DUTY_TABLE = [int(speed * 10.23) for speed in range(101)]
+DUTY_TABLE_U16 = [speed * 65535 // 100 for speed in range(101)]
 
 class MotorControl:
-    """Classe para controlar os motores do carrinho"""
+    """
+    Classe para controlar os motores do carrinho
+    Guarda a direção e o duty atuais de cada motor e só escreve nos pinos
+    o que mudou; o duty vem de uma tabela (duty_u16 quando o port tem)
+    """
+    
+    # Controlador de direção local (SteeringController), se habilitado
+    steering = None
     
     def __init__(self):
         # Configurar pinos dos motores
@@ -39,6 +154,20 @@ class MotorControl:
         self.right_pin2 = Pin(MOTOR_RIGHT_PIN2, Pin.OUT)
         self.right_pwm = PWM(Pin(MOTOR_RIGHT_PWM), freq=1000)
         
+        # PWM de 16 bits onde existe (MicroPython >= 1.19); métodos já resolvidos
+        if hasattr(self.left_pwm, 'duty_u16'):
+            self.duty_table = DUTY_TABLE_U16
+            self.left_duty = self.left_pwm.duty_u16
+            self.right_duty = self.right_pwm.duty_u16
+        else:
+            self.duty_table = DUTY_TABLE
+            self.left_duty = self.left_pwm.duty
+            self.right_duty = self.right_pwm.duty
+        
+        # Estado escrito nos pinos: [direção (-1, 0, 1), duty]; None força a escrita
+        self.left_state = [None, None]
+        self.right_state = [None, None]
+        
         self.stop()
     
     def set_motor(self, left_speed, right_speed):
@@ -47,33 +176,32 @@ class MotorControl:
         left_speed: -100 a 100 (negativo = ré)
         right_speed: -100 a 100 (negativo = ré)
         """
-        # Motor Esquerdo
-        if left_speed > 0:
-            self.left_pin1.value(1)
-            self.left_pin2.value(0)
-            self.left_pwm.duty(int(abs(left_speed) * 10.23))  # 0-1023
-        elif left_speed < 0:
-            self.left_pin1.value(0)
-            self.left_pin2.value(1)
-            self.left_pwm.duty(int(abs(left_speed) * 10.23))
+        self.apply(left_speed, right_speed)
+    
+    def apply(self, left_speed, right_speed):
+        """Escreve direção e PWM nos pinos imediatamente (só o que mudou)"""
+        self.drive(self.left_pin1, self.left_pin2, self.left_duty, self.left_state, left_speed)
+        self.drive(self.right_pin1, self.right_pin2, self.right_duty, self.right_state,
+                   right_speed)
+    
+    def drive(self, pin1, pin2, write_duty, state, speed):
+        """Um motor: velocidade -100 a 100 -> pinos de direção e duty da tabela"""
+        if speed > 0:
+            direction = 1
+        elif speed < 0:
+            direction = -1
+            speed = -speed
         else:
-            self.left_pin1.value(0)
-            self.left_pin2.value(0)
-            self.left_pwm.duty(0)
+            direction = 0
+        duty = self.duty_table[min(100, int(speed + 0.5))]
         
-        # Motor Direito
-        if right_speed > 0:
-            self.right_pin1.value(1)
-            self.right_pin2.value(0)
-            self.right_pwm.duty(int(abs(right_speed) * 10.23))
-        elif right_speed < 0:
-            self.right_pin1.value(0)
-            self.right_pin2.value(1)
-            self.right_pwm.duty(int(abs(right_speed) * 10.23))
-        else:
-            self.right_pin1.value(0)
-            self.right_pin2.value(0)
-            self.right_pwm.duty(0)
+        if direction != state[0]:
+            pin1.value(1 if direction > 0 else 0)
+            pin2.value(1 if direction < 0 else 0)
+            state[0] = direction
+        if duty != state[1]:
+            write_duty(duty)
+            state[1] = duty
     
     def forward(self, speed=50):
         """Move para frente"""
@@ -102,6 +230,68 @@ class MotorControl:
     def stop(self):
         """Para o carrinho"""
         self.set_motor(0, 0)
+    
+    def emergency_stop(self):
+        """Para imediatamente (watchdog, desconexão), reescrevendo todos os pinos"""
+        self.left_state[0] = self.left_state[1] = None
+        self.right_state[0] = self.right_state[1] = None
+        self.apply(0, 0)
+
+def approach(value, target, step):
+    """Move value em direção a target no máximo step"""
+    if target > value:
+        return min(value + step, target)
+    return max(value - step, target)
+
+class SmoothMotorControl(MotorControl):
+    """
+    Controle com rampa: set_motor só define o alvo e update(), chamado em
+    taxa fixa, leva o PWM até ele respeitando a taxa de variação
+    Sem setpoints novos por hold_ms, o alvo decai até parar
+    """
+    
+    def __init__(self, slew_rate=SLEW_RATE, hold_ms=HOLD_MS, decay_rate=DECAY_RATE):
+        self.slew_rate = slew_rate
+        self.hold_ms = hold_ms
+        self.decay_rate = decay_rate
+        
+        self.target_left = 0
+        self.target_right = 0
+        self.current_left = 0
+        self.current_right = 0
+        self.last_setpoint = ticks_ms()
+        
+        super().__init__()
+        self.apply(0, 0)
+    
+    def set_motor(self, left_speed, right_speed):
+        """Define o alvo (a rampa é aplicada em update)"""
+        self.target_left = left_speed
+        self.target_right = right_speed
+        self.last_setpoint = ticks_ms()
+    
+    def emergency_stop(self):
+        """Para imediatamente, sem rampa"""
+        self.target_left = self.target_right = 0
+        self.current_left = self.current_right = 0
+        super().emergency_stop()
+    
+    def update(self, dt_ms):
+        """Um passo do laço de controle (dt_ms desde o passo anterior)"""
+        # Sem setpoints novos: decai o alvo até zero
+        if self.hold_ms and ticks_diff(ticks_ms(), self.last_setpoint) > self.hold_ms:
+            decay = self.decay_rate * dt_ms / 1000
+            self.target_left = approach(self.target_left, 0, decay)
+            self.target_right = approach(self.target_right, 0, decay)
+        
+        step = self.slew_rate * dt_ms / 1000
+        left = approach(self.current_left, self.target_left, step)
+        right = approach(self.current_right, self.target_right, step)
+        
+        if left != self.current_left or right != self.current_right:
+            self.current_left = left
+            self.current_right = right
+            self.apply(left, right)
 
 def connect_wifi():
     """Conecta ao WiFi"""
@@ -127,47 +317,149 @@ def connect_wifi():
     print('IP:', wlan.ifconfig()[0])
     return wlan.ifconfig()[0]
 
-def parse_websocket_frame(data):
-    """Parse simples de frame WebSocket"""
-    if len(data) < 2:
-        return None
+def unmask_payload(buf, start, end, mask_key):
+    """
+    Desmascara buf[start:end] no próprio buffer
+    O XOR é feito de uma vez sobre inteiros grandes, em vez de byte a byte
+    """
+    length = end - start
+    if length <= 0:
+        return
     
-    # Ignora frames de controle
-    opcode = data[0] & 0x0F
-    if opcode == 0x08:  # Close frame
+    key = int.from_bytes((mask_key * ((length + 3) // 4))[:length], 'big')
+    data = int.from_bytes(buf[start:end], 'big') ^ key
+    buf[start:end] = data.to_bytes(length, 'big')
+
+def parse_frame_header(buf, offset, end):
+    """
+    Lê o cabeçalho do frame que começa em buf[offset]
+    Retorna: (opcode, máscara ou None, início do payload, fim do payload)
+    ou None se os bytes disponíveis ainda não formam um frame completo
+    """
+    if end - offset < 2:
         return None
-    if opcode == 0x09:  # Ping frame
-        return 'PING'
     
-    # Verifica se tem máscara
-    masked = data[1] & 0x80
-    payload_length = data[1] & 0x7F
+    opcode = buf[offset] & 0x0F
+    masked = buf[offset + 1] & 0x80
+    payload_length = buf[offset + 1] & 0x7F
+    pos = offset + 2
     
     if payload_length == 126:
-        mask_start = 4
+        if end - pos < 2:
+            return None
+        payload_length = (buf[pos] << 8) | buf[pos + 1]
+        pos += 2
     elif payload_length == 127:
-        mask_start = 10
-    else:
-        mask_start = 2
+        if end - pos < 8:
+            return None
+        payload_length = int.from_bytes(bytes(buf[pos:pos + 8]), 'big')
+        pos += 8
     
+    mask_key = None
     if masked:
-        mask_key = data[mask_start:mask_start + 4]
-        payload_start = mask_start + 4
-        payload = bytearray(data[payload_start:payload_start + payload_length])
-        
-        # Desmascara os dados
-        for i in range(len(payload)):
-            payload[i] ^= mask_key[i % 4]
-        
-        return payload.decode('utf-8')
-    else:
-        return data[mask_start:].decode('utf-8')
+        if end - pos < 4:
+            return None
+        mask_key = bytes(buf[pos:pos + 4])
+        pos += 4
+    
+    if end - pos < payload_length:
+        return None
+    return opcode, mask_key, pos, pos + payload_length
+
+class FrameReassembler:
+    """
+    Remonta frames WebSocket a partir do fluxo TCP
+    Um read pode trazer vários frames coalescidos ou só parte de um frame;
+    os bytes de um frame incompleto ficam no buffer até a próxima leitura
+    """
+    
+    def __init__(self, size=WS_BUFFER_SIZE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # Primeiro byte ainda não processado
+        self.end = 0    # Fim dos dados válidos
+    
+    def _compact(self):
+        """Move o frame parcial para o início do buffer"""
+        if self.start == 0:
+            return
+        remaining = self.end - self.start
+        if remaining:
+            self.buffer[0:remaining] = bytes(self.view[self.start:self.end])
+        self.start = 0
+        self.end = remaining
+    
+    def free_space(self):
+        """Região livre do buffer, para uso com readinto/recv_into"""
+        self._compact()
+        if self.end == len(self.buffer):
+            raise ValueError('Frame maior que o buffer de recepção')
+        return self.view[self.end:]
+    
+    def commit(self, count):
+        """Confirma count bytes escritos em free_space()"""
+        self.end += count
+    
+    def feed(self, data):
+        """Copia um bloco de bytes recebido para o buffer"""
+        count = len(data)
+        self.free_space()
+        if self.end + count > len(self.buffer):
+            raise ValueError('Frame maior que o buffer de recepção')
+        self.view[self.end:self.end + count] = data
+        self.end += count
+    
+    def frames(self):
+        """
+        Gera (opcode, payload) para cada frame completo no buffer
+        Texto vira str; os demais são memoryview do buffer, válidos só até a
+        próxima leitura
+        """
+        while True:
+            header = parse_frame_header(self.buffer, self.start, self.end)
+            if header is None:
+                return
+            
+            opcode, mask_key, payload_start, payload_end = header
+            if mask_key:
+                unmask_payload(self.buffer, payload_start, payload_end, mask_key)
+            self.start = payload_end
+            
+            payload = self.view[payload_start:payload_end]
+            if opcode == WS_OPCODE_TEXT:
+                payload = str(payload, 'utf-8')
+            yield opcode, payload
+
+def parse_websocket_frame(data):
+    """
+    Parse de um único frame WebSocket completo
+    Para fluxos com frames coalescidos ou partidos use FrameReassembler
+    """
+    header = parse_frame_header(data, 0, len(data))
+    if header is None:
+        return None
+    
+    # Ignora frames de controle
+    # Retorna str para frames de texto e bytes para frames binários
+    opcode, mask_key, payload_start, payload_end = header
+    if opcode == WS_OPCODE_CLOSE:
+        return None
+    if opcode == WS_OPCODE_PING:
+        return 'PING'
+    
+    payload = bytearray(data[payload_start:payload_end])
+    if mask_key:
+        unmask_payload(payload, 0, len(payload), mask_key)
+    
+    if opcode == WS_OPCODE_BINARY:
+        return bytes(payload)
+    return payload.decode('utf-8')
 
-def create_websocket_frame(message):
-    """Cria um frame WebSocket simples"""
-    payload = message.encode('utf-8')
+def create_websocket_frame(message, opcode=WS_OPCODE_TEXT):
+    """Cria um frame WebSocket simples (texto ou binário)"""
+    payload = message.encode('utf-8') if isinstance(message, str) else message
     frame = bytearray()
-    frame.append(0x81)  # Text frame, FIN bit set
+    frame.append(0x80 | opcode)  # FIN bit set
     
     length = len(payload)
     if length < 126:
@@ -182,43 +474,532 @@ def create_websocket_frame(message):
     frame.extend(payload)
     return bytes(frame)
 
-def handle_command(command_str, motor_control):
-    """Processa comando recebido"""
+# Ações JSON -> opcodes do protocolo binário
+ACTION_OPCODES = {
+    'stop': OP_STOP,
+    'forward': OP_FORWARD,
+    'backward': OP_BACKWARD,
+    'left': OP_LEFT,
+    'right': OP_RIGHT,
+    'sharp_left': OP_SHARP_LEFT,
+    'sharp_right': OP_SHARP_RIGHT,
+    'custom': OP_CUSTOM,
+    'line': OP_LINE,
+    'gains': OP_GAINS,
+}
+
+def handle_line(motor_control, error, heading, flags):
+    """Repassa o erro da linha (escala int8) ao controlador local"""
+    steering = motor_control.steering
+    if steering:
+        steering.set_error(error / LINE_SCALE, heading / LINE_SCALE,
+                           (flags >> 1) / LINE_SCALE)
+
+def handle_gains(motor_control, gains, right, flags):
+    """Atualiza ganhos (o dict vem no campo esquerdo)"""
+    if motor_control.steering:
+        motor_control.steering.set_gains(gains)
+
+# Tabela de despacho: opcode -> função(motor_control, esquerda, direita, flags)
+# Ações nomeadas recebem a velocidade no campo esquerdo
+COMMAND_HANDLERS = {
+    OP_STOP: lambda mc, left, right, flags: mc.stop(),
+    OP_FORWARD: lambda mc, left, right, flags: mc.forward(left),
+    OP_BACKWARD: lambda mc, left, right, flags: mc.backward(left),
+    OP_LEFT: lambda mc, left, right, flags: mc.turn_left(left),
+    OP_RIGHT: lambda mc, left, right, flags: mc.turn_right(left),
+    OP_SHARP_LEFT: lambda mc, left, right, flags: mc.sharp_left(left),
+    OP_SHARP_RIGHT: lambda mc, left, right, flags: mc.sharp_right(left),
+    OP_CUSTOM: lambda mc, left, right, flags: mc.set_motor(left, right),
+    OP_LINE: handle_line,
+    OP_GAINS: handle_gains,
+}
+
+# Comandos que não tiram o controle do controlador de direção local
+STEERING_OPCODES = (OP_LINE, OP_GAINS)
+
+def dispatch_command(command, motor_control):
+    """Executa um comando decodificado"""
+    opcode, seq, left, right, flags = command[:5]
+    
+    # Qualquer comando manual desliga o controlador local
+    steering = motor_control.steering
+    if steering and steering.active and opcode not in STEERING_OPCODES:
+        steering.release()
+    
+    handler = COMMAND_HANDLERS.get(opcode)
+    if handler:
+        handler(motor_control, left, right, flags)
+
+def decode_command(payload):
+    """
+    Decodifica um comando binário (bytes) ou JSON (str)
+    Retorna: (opcode, seq, esquerda, direita, flags) - seq é None em JSON sem seq
+    """
+    if not isinstance(payload, str):
+        return struct.unpack(COMMAND_FORMAT, payload)
+    
+    command = json.loads(payload)
+    action = command.get('action', 'stop')
+    opcode = ACTION_OPCODES.get(action)
+    flags = FLAG_ACK_REQUESTED
+    
+    if opcode == OP_CUSTOM:
+        left = command.get('left', 0)
+        right = command.get('right', 0)
+    elif opcode == OP_LINE:
+        # Mesma escala do formato binário
+        left = int(command.get('error', 0) * LINE_SCALE)
+        right = int(command.get('heading', 0) * LINE_SCALE)
+        flags |= int(command.get('confidence', 1) * LINE_SCALE) << 1
+    elif opcode == OP_GAINS:
+        left = command
+        right = 0
+    else:
+        left = command.get('speed', 50)
+        right = 0
+    
+    return opcode, command.get('seq'), left, right, flags
+
+def handle_command(payload, motor_control):
+    """
+    Processa comando recebido (JSON ou binário)
+    Retorna o comando decodificado (opcode, seq, esquerda, direita, flags)
+    ou None em caso de erro
+    """
     try:
-        command = json.loads(command_str)
-        action = command.get('action', 'stop')
-        speed = command.get('speed', 50)
-        
-        print(f'Comando recebido: {action} (velocidade: {speed})')
+        command = decode_command(payload)
+        opcode, seq, left, right, flags = command
         
-        if action == 'forward':
-            motor_control.forward(speed)
-        elif action == 'backward':
-            motor_control.backward(speed)
-        elif action == 'left':
-            motor_control.turn_left(speed)
-        elif action == 'right':
-            motor_control.turn_right(speed)
-        elif action == 'sharp_left':
-            motor_control.sharp_left(speed)
-        elif action == 'sharp_right':
-            motor_control.sharp_right(speed)
-        elif action == 'stop':
-            motor_control.stop()
-        elif action == 'custom':
-            # Permite controle customizado dos motores
-            left = command.get('left', 0)
-            right = command.get('right', 0)
-            motor_control.set_motor(left, right)
+        if VERBOSE:
+            print('Comando recebido:', opcode, left, right)
         
-        return True
+        dispatch_command(command, motor_control)
+        return command
     except Exception as e:
         print('Erro ao processar comando:', e)
+        return None
+
+def create_ack_frame(payload, command, timing=None):
+    """
+    Cria o frame de confirmação no mesmo formato do comando recebido
+    timing: (recepção, PWM aplicado) em timing_us(), para a latência medida no PC
+    Retorna None se o comando não pediu ack
+    """
+    if not isinstance(payload, str):
+        if command is None:
+            return None
+        opcode, seq, left, right, flags = command
+        if not flags & FLAG_ACK_REQUESTED:
+            return None
+        if timing:
+            ack = struct.pack(ACK_TIMING_FORMAT, OP_ACK, seq, STATUS_OK, timing[0], timing[1])
+        else:
+            ack = struct.pack(ACK_FORMAT, OP_ACK, seq, STATUS_OK)
+        return create_websocket_frame(ack, WS_OPCODE_BINARY)
+    
+    # Ecoa o seq para o PC medir o RTT
+    ack = {'status': 'ok' if command else 'error'}
+    if command and command[1] is not None:
+        ack['seq'] = command[1]
+    if timing:
+        ack['rx'] = timing[0]
+        ack['pwm'] = timing[1]
+    return create_websocket_frame(json.dumps(ack))
+
+class SteeringController:
+    """
+    PID + feed-forward de direção rodando no ESP32
+    O PC envia o erro normalizado da linha (positivo = linha à direita); o laço
+    continua corrigindo em taxa fixa entre as atualizações da câmera
+    """
+    
+    GAINS = ('kp', 'ki', 'kd', 'kff', 'base_speed', 'max_correction')
+    
+    def __init__(self, motor_control):
+        self.motor_control = motor_control
+        self.kp = STEER_KP
+        self.ki = STEER_KI
+        self.kd = STEER_KD
+        self.kff = STEER_KFF
+        self.base_speed = STEER_BASE_SPEED
+        self.max_correction = STEER_MAX_CORRECTION
+        
+        self.active = False
+        self.error = 0.0
+        self.heading = 0.0
+        self.confidence = 0.0
+        self.derivative = 0.0
+        self.integral = 0.0
+        self.last_update = ticks_ms()
+    
+    def set_error(self, error, heading=0.0, confidence=1.0):
+        """Nova medição da câmera"""
+        now = ticks_ms()
+        # Derivada calculada entre medições (o erro é constante entre elas)
+        if self.active:
+            dt = ticks_diff(now, self.last_update) / 1000
+            if dt > 0:
+                self.derivative = (error - self.error) / dt
+        else:
+            self.derivative = 0.0
+            self.integral = 0.0
+        
+        self.error = error
+        self.heading = heading
+        self.confidence = confidence
+        self.last_update = now
+        self.active = True
+    
+    def set_gains(self, gains):
+        """Atualiza os ganhos recebidos pelo canal de controle"""
+        for name in self.GAINS:
+            if name in gains:
+                setattr(self, name, float(gains[name]))
+    
+    def release(self):
+        """Desliga o controlador (comando manual, parada, watchdog)"""
+        self.active = False
+        self.integral = 0.0
+        self.derivative = 0.0
+    
+    def update(self, dt_ms):
+        """Um passo do laço de controle"""
+        if not self.active:
+            return
+        
+        if ticks_diff(ticks_ms(), self.last_update) > STEER_TIMEOUT_MS:
+            self.release()
+            self.motor_control.stop()
+            return
+        
+        output = (self.kp * self.error + self.ki * self.integral +
+                  self.kd * self.derivative + self.kff * self.heading)
+        
+        # Saturação com anti-windup: só integra quando não está saturado
+        if -self.max_correction < output < self.max_correction:
+            self.integral += self.error * dt_ms / 1000
+            if self.integral > STEER_INTEGRAL_LIMIT:
+                self.integral = STEER_INTEGRAL_LIMIT
+            elif self.integral < -STEER_INTEGRAL_LIMIT:
+                self.integral = -STEER_INTEGRAL_LIMIT
+        output = max(-self.max_correction, min(self.max_correction, output))
+        
+        # Reduz a velocidade quando a detecção é pouco confiável
+        speed = self.base_speed * (0.5 + 0.5 * self.confidence)
+        left = max(-100, min(100, speed + output))
+        right = max(-100, min(100, speed - output))
+        self.motor_control.set_motor(left, right)
+
+class ServerState:
+    """Estado compartilhado entre as tarefas do servidor"""
+    
+    def __init__(self, motor_control):
+        self.motor_control = motor_control
+        self.writer = None  # Cliente WebSocket atual
+        self.moving = False
+        self.last_command = ticks_ms()
+        self.started = ticks_ms()
+        
+        # Canal UDP: último seq aceito e menor atraso (chegada - envio) observado
+        self.udp_last_seq = None
+        self.udp_min_delay = None
+        self.udp_stale_run = 0
+        
+        # Estatísticas
+        self.commands = 0
+        self.errors = 0
+        self.watchdog_stops = 0
+        self.udp_received = 0
+        self.udp_out_of_order = 0
+        self.udp_stale = 0
+    
+    def on_command(self, command):
+        """Registra um comando processado (alimenta o watchdog)"""
+        self.last_command = ticks_ms()
+        if command is None:
+            self.errors += 1
+            return
+        self.commands += 1
+        self.moving = command[0] != OP_STOP
+    
+    def stop(self):
+        """Para os motores imediatamente"""
+        if self.motor_control.steering:
+            self.motor_control.steering.release()
+        self.motor_control.emergency_stop()
+        self.moving = False
+
+async def websocket_handshake(reader, writer):
+    """Lê a requisição HTTP de upgrade e responde o handshake WebSocket"""
+    request = b''
+    while b'\r\n\r\n' not in request:
+        chunk = await reader.read(512)
+        if not chunk or len(request) > 4096:
+            return False
+        request += chunk
+    
+    # Extrai a chave do WebSocket
+    key = None
+    for line in request.decode('utf-8').split('\r\n'):
+        if line.lower().startswith('sec-websocket-key:'):
+            key = line.split(':', 1)[1].strip()
+            break
+    
+    if not key:
         return False
+    
+    magic = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    accept_key = hashlib.sha1((key + magic).encode()).digest()
+    accept_key = binascii.b2a_base64(accept_key).strip().decode()
+    
+    response = (
+        'HTTP/1.1 101 Switching Protocols\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Accept: {accept_key}\r\n'
+        '\r\n'
+    )
+    writer.write(response.encode())
+    await writer.drain()
+    return True
+
+async def read_into(reader, buf):
+    """Lê direto no buffer quando o stream suporta readinto (uasyncio)"""
+    if hasattr(reader, 'readinto'):
+        return await reader.readinto(buf)
+    
+    data = await reader.read(len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+async def handle_client(reader, writer, state):
+    """Tarefa de um cliente: acorda assim que chegam dados"""
+    print('Cliente conectado')
+    try:
+        if not await websocket_handshake(reader, writer):
+            print('Handshake WebSocket inválido')
+            return
+        print('WebSocket handshake completo')
+        
+        state.writer = writer
+        state.last_command = ticks_ms()
+        # Novo cliente: seq e atraso do canal UDP recomeçam
+        state.udp_last_seq = None
+        state.udp_min_delay = None
+        
+        # Loop de mensagens: cada leitura pode conter vários frames
+        frames = FrameReassembler()
+        while True:
+            count = await read_into(reader, frames.free_space())
+            if count is None:
+                continue
+            if not count:
+                break
+            frames.commit(count)
+            received_us = timing_us()
+            
+            closing = False
+            for opcode, payload in frames.frames():
+                if opcode == WS_OPCODE_PING:
+                    # Responde com PONG
+                    writer.write(b'\x8a\x00')
+                elif opcode == WS_OPCODE_CLOSE:
+                    writer.write(b'\x88\x00')
+                    closing = True
+                    break
+                elif opcode in (WS_OPCODE_TEXT, WS_OPCODE_BINARY):
+                    command = handle_command(payload, state.motor_control)
+                    # Com rampa (SmoothMotorControl) o PWM muda no próximo passo do laço
+                    applied_us = timing_us()
+                    state.on_command(command)
+                    # Envia confirmação
+                    response = create_ack_frame(payload, command, (received_us, applied_us))
+                    if response:
+                        writer.write(response)
+            await writer.drain()
+            
+            if closing:
+                break
+    
+    except Exception as e:
+        print('Erro:', e)
+    
+    finally:
+        if state.writer is writer:
+            state.writer = None
+        state.stop()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        print('Cliente desconectado')
+
+async def motor_task(state):
+    """
+    Laço de controle em taxa fixa: roda o controlador de direção local e
+    aplica a rampa até o setpoint mais recente
+    """
+    motor_control = state.motor_control
+    steering = motor_control.steering
+    ramp = hasattr(motor_control, 'update')
+    last = ticks_ms()
+    while True:
+        await asyncio.sleep(CONTROL_PERIOD_MS / 1000)
+        now = ticks_ms()
+        dt_ms = ticks_diff(now, last)
+        last = now
+        
+        if steering:
+            steering.update(dt_ms)
+        if ramp:
+            motor_control.update(dt_ms)
+
+async def watchdog_task(state):
+    """Para o carrinho se os comandos pararem de chegar"""
+    while True:
+        await asyncio.sleep(WATCHDOG_TIMEOUT_MS / 4000)
+        if state.moving and ticks_diff(ticks_ms(), state.last_command) > WATCHDOG_TIMEOUT_MS:
+            print('Watchdog: sem comandos, parando motores')
+            state.stop()
+            state.watchdog_stops += 1
+
+async def telemetry_task(state):
+    """Envia estatísticas periódicas ao cliente conectado"""
+    while True:
+        await asyncio.sleep(TELEMETRY_INTERVAL_MS / 1000)
+        writer = state.writer
+        if writer is None:
+            continue
+        
+        telemetry = {
+            'type': 'telemetry',
+            'uptime_ms': ticks_diff(ticks_ms(), state.started),
+            'commands': state.commands,
+            'errors': state.errors,
+            'watchdog_stops': state.watchdog_stops,
+        }
+        if UDP_PORT:
+            telemetry['udp_received'] = state.udp_received
+            telemetry['udp_out_of_order'] = state.udp_out_of_order
+            telemetry['udp_stale'] = state.udp_stale
+        if hasattr(gc, 'mem_free'):
+            telemetry['mem_free'] = gc.mem_free()
+        
+        try:
+            writer.write(create_websocket_frame(json.dumps(telemetry)))
+            await writer.drain()
+        except Exception as e:
+            print('Erro na telemetria:', e)
+
+def accept_datagram(state, data):
+    """
+    Valida um datagrama UDP de comando
+    Retorna o comando decodificado ou None se for inválido, fora de ordem ou atrasado
+    """
+    if len(data) != UDP_COMMAND_SIZE:
+        state.errors += 1
+        return None
+    
+    command = struct.unpack(UDP_COMMAND_FORMAT, data)
+    seq = command[1]
+    state.udp_received += 1
+    
+    # Fora de ordem ou duplicado (seq de 16 bits com wrap)
+    if state.udp_last_seq is not None:
+        diff = (seq - state.udp_last_seq) & 0xFFFF
+        if diff == 0 or diff >= 0x8000:
+            state.udp_out_of_order += 1
+            return None
+    
+    # Os relógios são diferentes: compara o atraso com o menor atraso já visto
+    delay = ticks_ms() - command[5]
+    if state.udp_min_delay is None or delay < state.udp_min_delay:
+        state.udp_min_delay = delay
+    if delay - state.udp_min_delay > UDP_STALE_MS:
+        state.udp_stale += 1
+        state.udp_stale_run += 1
+        if state.udp_stale_run >= UDP_STALE_RESYNC:
+            state.udp_min_delay = None
+            state.udp_stale_run = 0
+        return None
+    
+    state.udp_stale_run = 0
+    state.udp_last_seq = seq
+    return command
+
+def wait_readable(sock):
+    """MicroPython: a tarefa dorme na fila de E/S do uasyncio até chegar um datagrama"""
+    yield asyncio.core._io_queue.queue_read(sock)
+
+async def recvfrom(sock, size):
+    """Espera um datagrama pelo laço de eventos, sem polling"""
+    if hasattr(asyncio, 'core'):
+        await wait_readable(sock)
+        return sock.recvfrom(size)
+    return await asyncio.get_running_loop().sock_recvfrom(sock, size)
+
+async def udp_task(state, host, port):
+    """Canal de controle UDP: só o setpoint mais novo importa"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(socket.getaddrinfo(host, port)[0][-1])
+    sock.setblocking(False)
+    
+    while True:
+        try:
+            data, addr = await recvfrom(sock, 64)
+        except OSError:
+            continue
+        received_us = timing_us()
+        
+        command = accept_datagram(state, data)
+        if command is None:
+            continue
+        
+        opcode, seq, left, right, flags, sent_ms = command
+        try:
+            dispatch_command(command, state.motor_control)
+        except Exception as e:
+            print('Erro ao processar comando:', e)
+            state.on_command(None)
+            continue
+        applied_us = timing_us()
+        state.on_command(command)
+        
+        if flags & FLAG_ACK_REQUESTED:
+            try:
+                sock.sendto(struct.pack(UDP_ACK_FORMAT, OP_ACK, seq, STATUS_OK, sent_ms,
+                                        received_us, applied_us), addr)
+            except OSError:
+                pass
+
+async def serve(motor_control, host='0.0.0.0', port=PORT, udp_port=UDP_PORT):
+    """Servidor WebSocket orientado a eventos (roda também em CPython)"""
+    state = ServerState(motor_control)
+    if STEERING_ENABLED and motor_control.steering is None:
+        motor_control.steering = SteeringController(motor_control)
+    
+    await asyncio.start_server(
+        lambda reader, writer: handle_client(reader, writer, state), host, port)
+    
+    if motor_control.steering or hasattr(motor_control, 'update'):
+        asyncio.create_task(motor_task(state))
+    if WATCHDOG_TIMEOUT_MS:
+        asyncio.create_task(watchdog_task(state))
+    if TELEMETRY_INTERVAL_MS:
+        asyncio.create_task(telemetry_task(state))
+    if udp_port:
+        asyncio.create_task(udp_task(state, host, udp_port))
+    
+    # Mantém o servidor vivo
+    while True:
+        await asyncio.sleep(3600)
 
 def start_websocket_server():
     """Inicia o servidor WebSocket"""
-    motor_control = MotorControl()
+    motor_control = SmoothMotorControl() if SLEW_RATE else MotorControl()
     
     # Conecta ao WiFi
     ip = connect_wifi()
@@ -226,80 +1007,14 @@ def start_websocket_server():
         print('Não foi possível iniciar o servidor sem WiFi')
         return
     
-    # Cria socket
-    addr = socket.getaddrinfo('0.0.0.0', PORT)[0][-1]
-    s = socket.socket()
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(addr)
-    s.listen(1)
-    
     print(f'Servidor WebSocket aguardando conexões em ws://{ip}:{PORT}')
+    if UDP_PORT:
+        print(f'Canal de controle UDP em {ip}:{UDP_PORT}')
     
-    while True:
-        try:
-            client, addr = s.accept()
-            print('Cliente conectado:', addr)
-            client.settimeout(0.1)
-            
-            # Handshake WebSocket
-            request = client.recv(1024).decode('utf-8')
-            if 'Upgrade: websocket' in request:
-                # Extrai a chave do WebSocket
-                for line in request.split('\r\n'):
-                    if line.startswith('Sec-WebSocket-Key:'):
-                        key = line.split(': ')[1]
-                        break
-                
-                # Resposta do handshake
-                import hashlib
-                import binascii
-                magic = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
-                accept_key = hashlib.sha1((key + magic).encode()).digest()
-                accept_key = binascii.b2a_base64(accept_key).strip().decode()
-                
-                response = (
-                    'HTTP/1.1 101 Switching Protocols\r\n'
-                    'Upgrade: websocket\r\n'
-                    'Connection: Upgrade\r\n'
-                    f'Sec-WebSocket-Accept: {accept_key}\r\n'
-                    '\r\n'
-                )
-                client.send(response.encode())
-                print('WebSocket handshake completo')
-                
-                # Loop de mensagens
-                while True:
-                    try:
-                        data = client.recv(1024)
-                        if not data:
-                            break
-                        
-                        message = parse_websocket_frame(data)
-                        if message == 'PING':
-                            # Responde com PONG
-                            pong_frame = bytearray([0x8A, 0x00])
-                            client.send(bytes(pong_frame))
-                        elif message:
-                            handle_command(message, motor_control)
-                            # Envia confirmação
-                            response = create_websocket_frame('{"status": "ok"}')
-                            client.send(response)
-                    
-                    except OSError:
-                        # Timeout - continua aguardando
-                        time.sleep(0.01)
-                    except Exception as e:
-                        print('Erro:', e)
-                        break
-            
-            motor_control.stop()
-            client.close()
-            print('Cliente desconectado')
-        
-        except Exception as e:
-            print('Erro no servidor:', e)
-            motor_control.stop()
-            time.sleep(1)
+    try:
+        asyncio.run(serve(motor_control))
+    finally:
+        motor_control.stop()
 
 # Inicia o servidor
 if __name__ == '__main__':
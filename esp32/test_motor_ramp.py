@@ -0,0 +1,140 @@
+"""
+Testes da rampa de PWM do firmware (SmoothMotorControl) com relógio simulado:
+taxa de variação, HOLD_MS sem setpoints novos e decaimento até parar
+"""
+
+import pytest
+
+from emulator import load_firmware
+
+firmware = load_firmware()
+PERIOD = firmware.CONTROL_PERIOD_MS
+# Variação máxima por passo do laço de controle
+SLEW_STEP = firmware.SLEW_RATE * PERIOD / 1000
+
+
+class FakeClock:
+    """ticks_ms controlado pelo teste"""
+
+    def __init__(self, now=1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(firmware, 'ticks_ms', clock)
+    return clock
+
+
+def run(motor, clock, duration_ms):
+    """Roda o laço de controle por duration_ms em passos de CONTROL_PERIOD_MS"""
+    for _ in range(duration_ms // PERIOD):
+        clock.now += PERIOD
+        motor.update(PERIOD)
+
+
+def written(motor):
+    """(direção, duty) escritos nos pinos de cada motor"""
+    return tuple(motor.left_state), tuple(motor.right_state)
+
+
+def test_starts_stopped(clock):
+    motor = firmware.SmoothMotorControl()
+    assert written(motor) == ((0, 0), (0, 0))
+
+
+def test_slew_limits_each_step(clock):
+    motor = firmware.SmoothMotorControl()
+    motor.set_motor(100, -60)
+
+    run(motor, clock, PERIOD)
+    assert (motor.current_left, motor.current_right) == (SLEW_STEP, -SLEW_STEP)
+
+    # 100 ms: SLEW_RATE * 0.1 = 40 pontos, ainda longe do alvo
+    run(motor, clock, 100 - PERIOD)
+    assert motor.current_left == pytest.approx(40)
+    assert motor.current_right == pytest.approx(-40)
+    table = motor.duty_table
+    assert written(motor) == ((1, table[40]), (-1, table[40]))
+
+    # Cada lado para no próprio alvo
+    run(motor, clock, 100)
+    assert motor.current_left == pytest.approx(80)
+    assert motor.current_right == -60
+    # Setpoint repetido antes do HOLD_MS: a rampa continua
+    motor.set_motor(100, -60)
+    run(motor, clock, 100)
+    assert (motor.current_left, motor.current_right) == (100, -60)
+    assert written(motor) == ((1, table[100]), (-1, table[60]))
+
+
+def test_reversal_ramps_through_zero(clock):
+    motor = firmware.SmoothMotorControl()
+    motor.set_motor(20, 20)
+    run(motor, clock, 50)
+    assert motor.current_left == 20
+
+    motor.set_motor(-20, -20)
+    speeds = []
+    for _ in range(20):
+        run(motor, clock, PERIOD)
+        speeds.append(motor.current_left)
+    steps = [abs(b - a) for a, b in zip([20] + speeds, speeds)]
+    assert max(steps) <= SLEW_STEP + 1e-9
+    assert speeds[-1] == -20
+
+
+def test_setpoint_held_for_hold_ms(clock):
+    motor = firmware.SmoothMotorControl()
+    motor.set_motor(50, 50)
+    run(motor, clock, 150)
+    assert motor.current_left == 50
+
+    # Até HOLD_MS desde o último setpoint o alvo não muda
+    run(motor, clock, firmware.HOLD_MS - 150)
+    assert (motor.target_left, motor.current_left) == (50, 50)
+
+    # Depois decai na DECAY_RATE
+    run(motor, clock, 100)
+    expected = 50 - firmware.DECAY_RATE * 0.1
+    assert motor.target_left == pytest.approx(expected)
+    assert motor.current_left == pytest.approx(expected)
+
+
+def test_new_setpoint_restarts_hold(clock):
+    motor = firmware.SmoothMotorControl()
+    motor.set_motor(50, 50)
+    for _ in range(4):
+        run(motor, clock, firmware.HOLD_MS - 50)
+        motor.set_motor(50, 50)
+    assert (motor.target_left, motor.current_left) == (50, 50)
+
+
+def test_decays_to_zero_and_stops(clock):
+    motor = firmware.SmoothMotorControl()
+    motor.set_motor(60, -30)
+    run(motor, clock, firmware.HOLD_MS)
+    assert (motor.current_left, motor.current_right) == (60, -30)
+
+    # 60 pontos a DECAY_RATE, mais uma margem de alguns passos
+    run(motor, clock, int(60 / firmware.DECAY_RATE * 1000) + 4 * PERIOD)
+    assert (motor.target_left, motor.target_right) == (0, 0)
+    assert (motor.current_left, motor.current_right) == (0, 0)
+    assert written(motor) == ((0, 0), (0, 0))
+
+
+def test_emergency_stop_skips_ramp(clock):
+    motor = firmware.SmoothMotorControl()
+    motor.set_motor(80, 80)
+    run(motor, clock, 200)
+    assert motor.current_left == 80
+
+    motor.emergency_stop()
+    assert (motor.target_left, motor.current_left) == (0, 0)
+    assert written(motor) == ((0, 0), (0, 0))
+    run(motor, clock, 50)
+    assert written(motor) == ((0, 0), (0, 0))
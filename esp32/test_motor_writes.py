@@ -0,0 +1,128 @@
+"""
+Testes das escritas nos pinos do firmware (MotorControl): só o que mudou é
+escrito, e o duty vem de DUTY_TABLE (duty) ou DUTY_TABLE_U16 (duty_u16)
+"""
+
+import json
+import struct
+
+import pytest
+
+from emulator import WriteLog, load_firmware
+
+log = WriteLog()
+firmware = load_firmware(log)
+
+
+class DutyPWM:
+    """Port com PWM de 10 bits (sem duty_u16): guarda cada escrita"""
+
+    def __init__(self, pin, freq=None, **kwargs):
+        self.writes = []
+
+    def duty(self, value=None):
+        if value is None:
+            return self.writes[-1] if self.writes else 0
+        self.writes.append(value)
+
+
+class U16PWM(DutyPWM):
+    """Port com duty_u16 (MicroPython >= 1.19)"""
+
+    def duty_u16(self, value=None):
+        return self.duty(value)
+
+
+def pin_writes():
+    """Escritas nos pinos de direção registradas até agora"""
+    return [(name, value) for _, name, value in log.entries if name.startswith('pin')]
+
+
+def binary(opcode, left, right, seq=1):
+    return struct.pack(firmware.COMMAND_FORMAT, opcode, seq, left, right,
+                       firmware.FLAG_ACK_REQUESTED)
+
+
+@pytest.fixture(params=[(DutyPWM, 'DUTY_TABLE'), (U16PWM, 'DUTY_TABLE_U16')],
+                ids=['duty', 'duty_u16'])
+def motor(request, monkeypatch):
+    pwm_class, table = request.param
+    monkeypatch.setattr(firmware, 'PWM', pwm_class)
+    motor = firmware.MotorControl()
+    assert motor.duty_table is getattr(firmware, table)
+    return motor
+
+
+def test_tables():
+    assert firmware.DUTY_TABLE[0] == firmware.DUTY_TABLE_U16[0] == 0
+    assert firmware.DUTY_TABLE[100] == 1023
+    assert firmware.DUTY_TABLE_U16[100] == 65535
+    for table in (firmware.DUTY_TABLE, firmware.DUTY_TABLE_U16):
+        assert len(table) == 101
+        assert all(a < b for a, b in zip(table, table[1:]))
+
+
+def test_duty_from_table(motor):
+    table = motor.duty_table
+    # Inicialização: uma escrita de parada em cada motor
+    assert motor.left_pwm.writes == motor.right_pwm.writes == [0]
+
+    motor.set_motor(30, -75)
+    assert motor.left_pwm.writes == [0, table[30]]
+    assert motor.right_pwm.writes == [0, table[75]]
+
+    # Arredonda metade para longe do zero, como protocol._clamp_speed no PC
+    motor.set_motor(30.5, -75.4)
+    assert motor.left_pwm.writes[-1] == table[31]
+    assert len(motor.right_pwm.writes) == 2
+    motor.set_motor(150, -150)
+    assert motor.left_pwm.writes[-1] == motor.right_pwm.writes[-1] == table[100]
+
+
+def test_same_command_written_once(motor):
+    motor.set_motor(0, 0)
+    log.entries.clear()
+    left, right = len(motor.left_pwm.writes), len(motor.right_pwm.writes)
+
+    for payload in (json.dumps({'action': 'custom', 'left': 40, 'right': -20, 'seq': 1}),
+                    json.dumps({'action': 'custom', 'left': 40, 'right': -20, 'seq': 2}),
+                    binary(firmware.OP_CUSTOM, 40, -20, seq=3)):
+        assert firmware.handle_command(payload, motor) is not None
+
+    # Direção: 2 pinos por motor, escritos uma vez só
+    assert sorted(pin_writes()) == sorted([
+        (f'pin{firmware.MOTOR_LEFT_PIN1}', 1), (f'pin{firmware.MOTOR_LEFT_PIN2}', 0),
+        (f'pin{firmware.MOTOR_RIGHT_PIN1}', 0), (f'pin{firmware.MOTOR_RIGHT_PIN2}', 1)])
+    assert motor.left_pwm.writes[left:] == [motor.duty_table[40]]
+    assert motor.right_pwm.writes[right:] == [motor.duty_table[20]]
+
+
+def test_only_changed_part_written(motor):
+    motor.set_motor(40, 40)
+    log.entries.clear()
+    left, right = len(motor.left_pwm.writes), len(motor.right_pwm.writes)
+
+    # Mesma direção, velocidade nova: só o duty do motor que mudou
+    motor.set_motor(40, 60)
+    assert pin_writes() == []
+    assert len(motor.left_pwm.writes) == left
+    assert motor.right_pwm.writes[right:] == [motor.duty_table[60]]
+
+    # Mesma velocidade, direção nova: só os pinos de direção
+    motor.set_motor(-40, 60)
+    assert sorted(pin_writes()) == [(f'pin{firmware.MOTOR_LEFT_PIN1}', 0),
+                                    (f'pin{firmware.MOTOR_LEFT_PIN2}', 1)]
+    assert len(motor.left_pwm.writes) == left
+
+
+def test_emergency_stop_rewrites_everything(motor):
+    motor.stop()
+    log.entries.clear()
+    left = len(motor.left_pwm.writes)
+
+    # Parada repetida não escreve; a de emergência reescreve todos os pinos
+    motor.stop()
+    assert pin_writes() == [] and len(motor.left_pwm.writes) == left
+    motor.emergency_stop()
+    assert len(pin_writes()) == 4
+    assert motor.left_pwm.writes[left:] == [0]
@@ -0,0 +1,145 @@
+"""
+Testes do servidor do firmware rodando em asyncio no CPython: handshake,
+comando aplicado nos pinos simulados, watchdog e desconexão
+"""
+
+import asyncio
+import base64
+import json
+import os
+import socket
+
+from emulator import WriteLog, load_firmware
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def masked_text_frame(message, mask_key=b'\x12\x34\x56\x78'):
+    """Frame de texto mascarado como o enviado por um cliente WebSocket"""
+    payload = message.encode('utf-8')
+    masked = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
+    return bytes([0x81, 0x80 | len(payload)]) + mask_key + masked
+
+
+async def open_client(port):
+    """Conecta e faz o handshake WebSocket"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f'GET / HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+                  'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                  f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n').encode())
+    response = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 1.0)
+    assert response.startswith(b'HTTP/1.1 101')
+    return reader, writer
+
+
+async def read_text(reader):
+    """Lê um frame de texto curto (sem máscara) enviado pelo servidor"""
+    header = await asyncio.wait_for(reader.readexactly(2), 1.0)
+    assert header[0] == 0x81 and header[1] < 126
+    return json.loads(await reader.readexactly(header[1]))
+
+
+async def start_server(firmware, motor):
+    port = free_port()
+    task = asyncio.create_task(firmware.serve(motor, '127.0.0.1', port, 0))
+    # Deixa o servidor abrir a porta
+    await asyncio.sleep(0.05)
+    return task, port
+
+
+async def stop_server(task, writer):
+    writer.close()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def load_server_firmware(monkeypatch, watchdog_ms=1000):
+    """Firmware sem telemetria (só acks chegam ao cliente) e com watchdog curto"""
+    firmware = load_firmware(WriteLog(), name='esp32_server')
+    monkeypatch.setattr(firmware, 'WATCHDOG_TIMEOUT_MS', watchdog_ms)
+    monkeypatch.setattr(firmware, 'TELEMETRY_INTERVAL_MS', 0)
+    return firmware
+
+
+def assert_forward(motor):
+    for pin1, pin2, pwm in ((motor.left_pin1, motor.left_pin2, motor.left_pwm),
+                            (motor.right_pin1, motor.right_pin2, motor.right_pwm)):
+        assert (pin1.value(), pin2.value()) == (1, 0)
+        assert pwm.duty() > 0
+
+
+def assert_stopped(motor):
+    for pin1, pin2, pwm in ((motor.left_pin1, motor.left_pin2, motor.left_pwm),
+                            (motor.right_pin1, motor.right_pin2, motor.right_pwm)):
+        assert (pin1.value(), pin2.value()) == (0, 0)
+        assert pwm.duty() == 0
+
+
+def test_command_applied_and_watchdog_stops(monkeypatch):
+    firmware = load_server_firmware(monkeypatch, watchdog_ms=200)
+    motor = firmware.MotorControl()
+
+    async def scenario():
+        task, port = await start_server(firmware, motor)
+        reader, writer = await open_client(port)
+        try:
+            writer.write(masked_text_frame(json.dumps(
+                {'action': 'forward', 'speed': 60, 'seq': 7})))
+            ack = await read_text(reader)
+            assert ack['status'] == 'ok' and ack['seq'] == 7
+            assert_forward(motor)
+
+            # Ainda dentro do prazo do watchdog: continua andando
+            await asyncio.sleep(0.1)
+            assert_forward(motor)
+
+            # Cliente conectado mas em silêncio: o watchdog para os motores
+            await asyncio.sleep(0.25)
+            assert_stopped(motor)
+        finally:
+            await stop_server(task, writer)
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_stops_motors(monkeypatch):
+    firmware = load_server_firmware(monkeypatch)
+    motor = firmware.MotorControl()
+
+    async def scenario():
+        task, port = await start_server(firmware, motor)
+        reader, writer = await open_client(port)
+        try:
+            writer.write(masked_text_frame(json.dumps({'action': 'forward', 'speed': 60})))
+            assert (await read_text(reader))['status'] == 'ok'
+            assert_forward(motor)
+
+            writer.close()
+            await asyncio.sleep(0.05)
+            assert_stopped(motor)
+        finally:
+            await stop_server(task, writer)
+
+    asyncio.run(scenario())
+
+
+def test_invalid_handshake_rejected(monkeypatch):
+    firmware = load_server_firmware(monkeypatch)
+    motor = firmware.MotorControl()
+
+    async def scenario():
+        task, port = await start_server(firmware, motor)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            # Sem Sec-WebSocket-Key: o servidor fecha a conexão sem responder
+            writer.write(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n')
+            assert await asyncio.wait_for(reader.read(), 1.0) == b''
+        finally:
+            await stop_server(task, writer)
+
+    asyncio.run(scenario())
@@ -0,0 +1,168 @@
+"""
+Testes do controlador de direção do firmware (SteeringController) com
+relógio simulado: PID + feed-forward, limite do integrador, saturação da
+correção e liberação após STEER_TIMEOUT_MS sem medições
+"""
+
+import json
+
+import pytest
+
+from emulator import load_firmware
+
+firmware = load_firmware()
+PERIOD = firmware.CONTROL_PERIOD_MS
+BASE = firmware.STEER_BASE_SPEED
+
+
+class FakeClock:
+    """ticks_ms controlado pelo teste"""
+
+    def __init__(self, now=1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMotor:
+    """Registra só o último set_motor e as paradas"""
+
+    steering = None
+
+    def __init__(self):
+        self.speeds = None
+        self.stops = 0
+
+    def set_motor(self, left, right):
+        self.speeds = (left, right)
+
+    def stop(self):
+        self.stops += 1
+        self.speeds = (0, 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(firmware, 'ticks_ms', clock)
+    return clock
+
+
+@pytest.fixture
+def steering(clock):
+    motor = FakeMotor()
+    motor.steering = firmware.SteeringController(motor)
+    return motor.steering
+
+
+def run(steering, clock, duration_ms):
+    for _ in range(duration_ms // PERIOD):
+        clock.now += PERIOD
+        steering.update(PERIOD)
+
+
+def test_inactive_until_first_error(steering, clock):
+    run(steering, clock, 50)
+    assert steering.motor_control.speeds is None
+
+
+def test_proportional_and_feed_forward(steering, clock):
+    steering.set_error(0.2, heading=0.1)
+    run(steering, clock, PERIOD)
+    # Primeiro passo: integral e derivada ainda zeradas
+    output = firmware.STEER_KP * 0.2 + firmware.STEER_KFF * 0.1
+    left, right = steering.motor_control.speeds
+    assert left == pytest.approx(BASE + output)
+    assert right == pytest.approx(BASE - output)
+
+
+def test_derivative_between_measurements(steering, clock):
+    steering.set_error(0.0)
+    clock.now += 50
+    steering.set_error(0.1)
+    assert steering.derivative == pytest.approx(0.1 / 0.05)
+
+    steering.update(PERIOD)
+    output = firmware.STEER_KP * 0.1 + firmware.STEER_KD * 2.0
+    assert steering.motor_control.speeds[0] == pytest.approx(BASE + output)
+
+
+def test_integral_clamped(steering, clock):
+    for sign in (1, -1):
+        steering.release()
+        # Erro constante realimentado pela câmera por 3 s (integra 1.5 > limite)
+        for _ in range(60):
+            steering.set_error(0.5 * sign)
+            run(steering, clock, 50)
+        assert steering.integral == sign * firmware.STEER_INTEGRAL_LIMIT
+
+        output = sign * (firmware.STEER_KP * 0.5 +
+                         firmware.STEER_KI * firmware.STEER_INTEGRAL_LIMIT)
+        assert steering.motor_control.speeds[0] == pytest.approx(BASE + output)
+
+
+def test_correction_saturates_without_windup(steering, clock):
+    steering.set_error(1.0, heading=1.0)
+    run(steering, clock, 100)
+    # kp + kff = 80 > STEER_MAX_CORRECTION: saturado, o integrador não cresce
+    assert steering.integral == 0.0
+    left, right = steering.motor_control.speeds
+    assert left == min(100, BASE + firmware.STEER_MAX_CORRECTION)
+    assert right == BASE - firmware.STEER_MAX_CORRECTION
+
+    steering.set_error(-1.0, heading=-1.0)
+    run(steering, clock, PERIOD)
+    assert steering.motor_control.speeds == (BASE - firmware.STEER_MAX_CORRECTION,
+                                             min(100, BASE + firmware.STEER_MAX_CORRECTION))
+
+
+def test_low_confidence_slows_down(steering, clock):
+    steering.set_error(0.0, confidence=0.0)
+    run(steering, clock, PERIOD)
+    assert steering.motor_control.speeds == (BASE / 2, BASE / 2)
+
+
+def test_released_after_timeout(steering, clock):
+    motor = steering.motor_control
+    steering.set_error(0.3)
+    run(steering, clock, firmware.STEER_TIMEOUT_MS)
+    assert steering.active and motor.stops == 0
+
+    run(steering, clock, PERIOD)
+    assert not steering.active
+    assert motor.stops == 1 and motor.speeds == (0, 0)
+    assert steering.integral == 0.0
+
+    # Solto: não volta a comandar os motores até um erro novo
+    run(steering, clock, 100)
+    assert motor.stops == 1 and motor.speeds == (0, 0)
+    steering.set_error(0.0)
+    run(steering, clock, PERIOD)
+    assert motor.speeds == (BASE, BASE)
+
+
+def test_gains_update(steering, clock):
+    steering.set_gains({'kp': 10, 'kff': 0, 'max_correction': 5})
+    steering.set_error(0.4, heading=1.0)
+    run(steering, clock, PERIOD)
+    assert steering.motor_control.speeds == (BASE + 4, BASE - 4)
+
+    steering.set_error(1.0)
+    run(steering, clock, PERIOD)
+    assert steering.motor_control.speeds == (BASE + 5, BASE - 5)
+
+
+def test_manual_command_releases_steering(clock):
+    motor = firmware.MotorControl()
+    motor.steering = firmware.SteeringController(motor)
+
+    firmware.handle_command(json.dumps({'action': 'line', 'error': 0.5}), motor)
+    assert motor.steering.active
+    assert motor.steering.error == pytest.approx(63 / firmware.LINE_SCALE)
+
+    # Ganhos não tiram o controle; um comando manual sim
+    firmware.handle_command(json.dumps({'action': 'gains', 'kp': 30}), motor)
+    assert motor.steering.active and motor.steering.kp == 30.0
+    firmware.handle_command(json.dumps({'action': 'forward', 'speed': 40}), motor)
+    assert not motor.steering.active
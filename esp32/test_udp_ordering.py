@@ -0,0 +1,123 @@
+"""
+Testes do canal UDP do firmware em CPython: descarte de datagramas fora de
+ordem, duplicados e atrasados, e os contadores com o proxy do emulador
+"""
+
+import asyncio
+import socket
+import struct
+
+from emulator import EmulatedESP32, load_firmware
+
+firmware = load_firmware()
+
+
+def datagram(seq, sent_ms, left=30, right=30, flags=None):
+    if flags is None:
+        flags = firmware.FLAG_ACK_REQUESTED
+    return struct.pack(firmware.UDP_COMMAND_FORMAT, firmware.OP_CUSTOM, seq & 0xFFFF,
+                       left, right, flags, sent_ms & 0xFFFFFFFF)
+
+
+def accepted(state, seqs, sent_ms=None):
+    """seqs aceitos (todos com o mesmo atraso, salvo sent_ms)"""
+    now = firmware.ticks_ms()
+    return [seq for seq in seqs
+            if firmware.accept_datagram(state, datagram(seq, now if sent_ms is None else sent_ms))]
+
+
+def test_out_of_order_and_duplicates_dropped():
+    state = firmware.ServerState(None)
+    assert accepted(state, [1, 2, 5, 3, 5, 6, 4, 7]) == [1, 2, 5, 6, 7]
+    assert state.udp_received == 8
+    assert state.udp_out_of_order == 3
+    assert state.udp_stale == 0
+
+
+def test_seq_wraparound():
+    state = firmware.ServerState(None)
+    assert accepted(state, [0xFFFE, 0xFFFF, 0, 1, 0xFFFF]) == [0xFFFE, 0xFFFF, 0, 1]
+    assert state.udp_out_of_order == 1
+
+
+def test_invalid_size_counts_as_error():
+    state = firmware.ServerState(None)
+    assert firmware.accept_datagram(state, datagram(1, 0)[:-1]) is None
+    assert state.errors == 1 and state.udp_received == 0
+
+
+def test_stale_datagrams_dropped_and_resynced():
+    state = firmware.ServerState(None)
+    now = firmware.ticks_ms()
+    assert accepted(state, [1], sent_ms=now)
+
+    # Atraso acima do menor já visto + UDP_STALE_MS: descartado sem avançar o seq
+    late = now - firmware.UDP_STALE_MS - 50
+    assert not accepted(state, [2], sent_ms=late)
+    assert state.udp_stale == 1 and state.udp_last_seq == 1
+
+    # Um datagrama em dia zera a sequência de atrasados
+    assert accepted(state, [3], sent_ms=firmware.ticks_ms())
+    assert state.udp_stale_run == 0
+
+    # Atraso persistente (relógio do PC saltou): após UDP_STALE_RESYNC a
+    # referência é refeita e os comandos voltam a ser aceitos
+    seqs = range(4, 4 + firmware.UDP_STALE_RESYNC + 1)
+    assert accepted(state, seqs, sent_ms=late) == [seqs[-1]]
+    assert state.udp_stale == 1 + firmware.UDP_STALE_RESYNC
+
+
+def free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_emulator_counters_with_jitter_and_loss():
+    count = 300
+    states = []
+
+    class RecordingState(firmware.ServerState):
+        def __init__(self, motor_control):
+            super().__init__(motor_control)
+            states.append(self)
+
+    async def scenario():
+        emulator = EmulatedESP32(port=free_port(socket.SOCK_STREAM),
+                                 udp_port=free_port(socket.SOCK_DGRAM),
+                                 latency_ms=2, jitter_ms=10, loss=0.05, seed=7,
+                                 internal_offset=1)
+        emulator.firmware.ServerState = RecordingState
+        await emulator.start()
+
+        loop = asyncio.get_running_loop()
+        acks = []
+
+        class Client(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                acks.append(struct.unpack(firmware.UDP_ACK_FORMAT, data)[1])
+
+        transport, _ = await loop.create_datagram_endpoint(
+            Client, remote_addr=('127.0.0.1', emulator.udp_port))
+        try:
+            for seq in range(count):
+                transport.sendto(datagram(seq, firmware.ticks_ms()))
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.3)
+        finally:
+            transport.close()
+            await emulator.stop()
+        return emulator, acks
+
+    emulator, acks = asyncio.run(scenario())
+    state = states[0]
+
+    # Tudo que o proxy entregou chegou ao firmware
+    assert emulator.uplink.forwarded + emulator.uplink.dropped == count
+    assert state.udp_received == emulator.uplink.forwarded
+    # Jitter maior que o intervalo entre envios troca a ordem
+    assert state.udp_out_of_order > 0
+    # Cada datagrama entregue foi aceito (com ack) ou contado como descartado
+    assert state.commands == state.udp_received - state.udp_out_of_order - state.udp_stale
+    assert len(acks) + emulator.downlink.dropped == state.commands
+    assert len(set(acks)) == len(acks)
@@ -0,0 +1,123 @@
+"""
+Testes do FrameReassembler em CPython: fluxos TCP com frames partidos e
+coalescidos, comprimentos estendidos e frames de controle no meio dos dados
+"""
+
+import os
+import struct
+
+import pytest
+
+from emulator import load_firmware
+
+firmware = load_firmware()
+
+
+def client_frame(payload, opcode=None, mask_key=b'\x37\xfa\x21\x3d'):
+    """Frame mascarado como o enviado por um cliente WebSocket"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+        opcode = firmware.WS_OPCODE_TEXT if opcode is None else opcode
+    elif opcode is None:
+        opcode = firmware.WS_OPCODE_BINARY
+
+    length = len(payload)
+    if length < 126:
+        header = bytes([0x80 | opcode, 0x80 | length])
+    elif length < 65536:
+        header = bytes([0x80 | opcode, 0x80 | 126]) + struct.pack('>H', length)
+    else:
+        header = bytes([0x80 | opcode, 0x80 | 127]) + struct.pack('>Q', length)
+    masked = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
+    return header + mask_key + masked
+
+
+def feed_chunks(reassembler, stream, sizes):
+    """Entrega o fluxo em leituras dos tamanhos dados e junta os frames remontados"""
+    frames = []
+    position = 0
+    for size in sizes:
+        reassembler.feed(stream[position:position + size])
+        position += size
+        frames += [(opcode, payload if isinstance(payload, str) else bytes(payload))
+                   for opcode, payload in reassembler.frames()]
+    assert position == len(stream)
+    return frames
+
+
+def test_header_split_across_reads():
+    stream = client_frame('{"action": "stop"}')
+    frames = feed_chunks(firmware.FrameReassembler(), stream, [1, len(stream) - 1])
+    assert frames == [(firmware.WS_OPCODE_TEXT, '{"action": "stop"}')]
+
+
+def test_mask_split_across_reads():
+    stream = client_frame(b'\x01\x02\x03\x04\x05')
+    # 2 bytes de cabeçalho + 2 dos 4 bytes da máscara na primeira leitura
+    frames = feed_chunks(firmware.FrameReassembler(), stream, [4, 3, len(stream) - 7])
+    assert frames == [(firmware.WS_OPCODE_BINARY, b'\x01\x02\x03\x04\x05')]
+
+
+def test_byte_by_byte_stream():
+    stream = client_frame('a' * 40) + client_frame(b'\xff' * 3)
+    frames = feed_chunks(firmware.FrameReassembler(), stream, [1] * len(stream))
+    assert frames == [(firmware.WS_OPCODE_TEXT, 'a' * 40),
+                      (firmware.WS_OPCODE_BINARY, b'\xff\xff\xff')]
+
+
+def test_16bit_extended_length():
+    payload = os.urandom(300)
+    stream = client_frame(payload)
+    assert stream[1] & 0x7F == 126
+    # Corta no meio do comprimento estendido
+    frames = feed_chunks(firmware.FrameReassembler(), stream, [3, 100, len(stream) - 103])
+    assert frames == [(firmware.WS_OPCODE_BINARY, payload)]
+
+
+def test_64bit_extended_length():
+    payload = os.urandom(70000)
+    stream = client_frame(payload)
+    assert stream[1] & 0x7F == 127
+    reassembler = firmware.FrameReassembler(size=80000)
+    frames = feed_chunks(reassembler, stream, [5, 8, 30000, len(stream) - 30013])
+    assert frames == [(firmware.WS_OPCODE_BINARY, payload)]
+
+
+def test_several_frames_in_one_read():
+    messages = ['{"action": "forward", "speed": %d}' % speed for speed in range(5)]
+    stream = b''.join(client_frame(message) for message in messages)
+    frames = feed_chunks(firmware.FrameReassembler(), stream, [len(stream)])
+    assert frames == [(firmware.WS_OPCODE_TEXT, message) for message in messages]
+
+
+def test_control_frames_between_data_frames():
+    stream = (client_frame('primeiro')
+              + client_frame(b'ola', firmware.WS_OPCODE_PING)
+              + client_frame(b'\x10\x20')
+              + client_frame(struct.pack('>H', 1000), firmware.WS_OPCODE_CLOSE))
+    # Leituras que cortam cada frame em pontos diferentes
+    frames = feed_chunks(firmware.FrameReassembler(), stream, [5, 11, 9, len(stream) - 25])
+    assert frames == [(firmware.WS_OPCODE_TEXT, 'primeiro'),
+                      (firmware.WS_OPCODE_PING, b'ola'),
+                      (firmware.WS_OPCODE_BINARY, b'\x10\x20'),
+                      (firmware.WS_OPCODE_CLOSE, struct.pack('>H', 1000))]
+
+
+def test_frame_larger_than_buffer():
+    reassembler = firmware.FrameReassembler(size=64)
+    with pytest.raises(ValueError):
+        reassembler.feed(client_frame(b'x' * 100))
+
+
+@pytest.mark.parametrize('length', [0, 1, 3, 4, 5, 17, 126, 1000])
+@pytest.mark.parametrize('start', [0, 3])
+def test_unmask_matches_bytewise_xor(length, start):
+    mask_key = bytes([0xA5, 0x01, 0xFF, 0x5C])
+    data = os.urandom(start + length + 2)
+    expected = bytearray(data)
+    for i in range(length):
+        expected[start + i] ^= mask_key[i % 4]
+
+    buf = bytearray(data)
+    firmware.unmask_payload(buf, start, start + length, mask_key)
+    assert buf == expected
@@ -0,0 +1,349 @@
+"""
+Benchmark dos detectores de linha e suíte de desempenho
+Gera imagens sintéticas de pista e compara o custo por frame e o centro
+encontrado pelo detector HSV (contornos), pelo rápido e pelo de faixas,
+além do detector rápido com rastreamento (janela em torno da previsão)
+
+Com --suite mede os caminhos críticos (process_frame com e sem debug em
+várias resoluções e alturas de ROI, calculate_motor_speeds e, com um módulo
+machine simulado, o parse/criação de frames e handle_command do ESP32) e
+grava JSON para comparar versões:
+
+    python benchmark.py --suite --json atual.json --baseline anterior.json
+
+Com --probe mede cada modo da câmera (fourcc, resolução, fps): fps real,
+decodificação, CPU por frame e frames acumulados no buffer do driver:
+
+    python benchmark.py --probe 0 --json modos.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera import describe_mode, probe_modes
+from line_follower import LineFollower
+from protocol import encode_command
+
+ESP32_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'esp32')
+ESP32_EMULATOR = os.path.join(ESP32_DIR, 'emulator.py')
+
+
+def make_track_frame(width, height, offset=0.0, curvature=0.0, line_width=0.06, seed=0):
+    """
+    Cria um frame BGR de pista: fundo claro com ruído e linha preta
+    offset: posição da linha na base (-1 a 1, relativo à meia largura)
+    curvature: deslocamento extra da linha no topo (mesma escala)
+    """
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(150, 230, size=(height, width, 3), dtype=np.uint8)
+
+    # Linha como polilinha da base até o topo
+    ys = np.linspace(height - 1, 0, 20)
+    t = (height - 1 - ys) / max(1, height - 1)
+    xs = width / 2 * (1 + offset + curvature * t ** 2)
+    points = np.stack([xs, ys], axis=1).astype(np.int32)
+    thickness = max(2, int(width * line_width))
+    cv2.polylines(frame, [points], False, (20, 20, 20), thickness)
+    return frame
+
+
+def time_detector(follower, frames, repeat=3, fps=30.0):
+    """
+    Tempo médio por frame (ms) e centros encontrados
+    Os frames recebem timestamps de uma câmera a fps (previsão do rastreamento)
+    """
+    clock = iter(np.arange(len(frames) * (repeat + 1)) / fps)
+    centers = [follower.process_frame(frame, next(clock))[1] for frame in frames]
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            follower.process_frame(frame, next(clock))
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames) * 1000, centers
+
+
+def compare_detectors(resolutions, frame_count=50, debug=False):
+    """Compara os detectores 'hsv', 'fast', 'bands' e 'fast' com rastreamento"""
+    results = []
+    for width, height in resolutions:
+        # Movimento lento entre frames, como numa câmera a 30 fps
+        frames = [make_track_frame(width, height, offset=np.sin(i / 15) * 0.6,
+                                   curvature=np.cos(i / 23) * 0.4, seed=i)
+                  for i in range(frame_count)]
+
+        row = {"resolution": f"{width}x{height}"}
+        centers = {}
+        for detector in ('hsv', 'fast', 'bands'):
+            follower = LineFollower("0.0.0.0", debug=debug, detector=detector)
+            row[detector], centers[detector] = time_detector(follower, [f.copy() for f in frames])
+
+        # Diferença média da coordenada x entre os detectores
+        diffs = [abs(a[0] - b[0]) for a, b in zip(centers['hsv'], centers['fast']) if a and b]
+        row["speedup"] = row['hsv'] / row['fast']
+        row["x_diff"] = float(np.mean(diffs)) if diffs else float('nan')
+        row["bands_speedup"] = row['hsv'] / row['bands']
+
+        follower = LineFollower("0.0.0.0", debug=debug, detector='fast', tracking=True)
+        row["tracked"], _ = time_detector(follower, [f.copy() for f in frames])
+        row["window"] = follower.tracker.stats()["pixels_fraction"]
+        results.append(row)
+    return results
+
+
+def measure(func, number=None, rounds=7, min_time=0.02):
+    """
+    Tempo por chamada de func() em microssegundos
+    number: chamadas por rodada (calibrado para durar ao menos min_time)
+    Retorna: {"median_us", "min_us", "calls"}
+    """
+    if number is None:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            if time.perf_counter() - start >= min_time:
+                break
+            number *= 2
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - start) / number * 1e6)
+    return {"median_us": float(np.median(per_call)), "min_us": float(min(per_call)),
+            "calls": number * rounds}
+
+
+def suite_process_frame(resolutions, roi_heights, detectors=('hsv', 'fast', 'bands'),
+                        frame_count=20):
+    """process_frame por detector, resolução, altura da ROI e modo debug"""
+    results = []
+    for width, height in resolutions:
+        frames = [make_track_frame(width, height, offset=np.sin(i / 7) * 0.6,
+                                   curvature=np.cos(i / 11) * 0.4, seed=i)
+                  for i in range(frame_count)]
+        for roi_height in roi_heights:
+            for detector in detectors:
+                for debug in (False, True):
+                    follower = LineFollower("0.0.0.0", debug=debug, detector=detector)
+                    follower.roi_height = roi_height
+                    # O debug desenha no frame: cada chamada recebe uma cópia nova
+                    work = [f.copy() for f in frames]
+                    index = [0]
+
+                    def step():
+                        i = index[0] = (index[0] + 1) % frame_count
+                        np.copyto(work[i], frames[i])
+                        follower.process_frame(work[i], i / 30)
+
+                    copy_cost = measure(lambda: np.copyto(work[0], frames[0]))["median_us"]
+                    result = measure(step)
+                    # Desconta a restauração do frame, que não faz parte do caminho medido
+                    result["median_us"] -= copy_cost
+                    result["min_us"] -= copy_cost
+                    results.append(dict(name="process_frame", detector=detector, debug=debug,
+                                        resolution=f"{width}x{height}", roi=roi_height, **result))
+    return results
+
+
+def suite_controllers():
+    """calculate_motor_speeds para cada controlador do PC"""
+    results = []
+    deviations = np.sin(np.arange(256) / 9) * 200
+    for mode in ('pid', 'pi', 'p', 'bangbang'):
+        follower = LineFollower("0.0.0.0", controller=mode)
+        index = [0]
+
+        def step():
+            i = index[0] = (index[0] + 1) & 255
+            follower.calculate_motor_speeds(deviations[i], 640, i / 30, 0.1)
+
+        results.append(dict(name="calculate_motor_speeds", controller=mode, **measure(step)))
+    return results
+
+
+def load_esp32_module():
+    """
+    Importa esp32/main.py no CPython com o machine simulado de esp32/emulator.py
+    (sem registrar escritas, para não pesar na medição)
+    """
+    spec = importlib.util.spec_from_file_location('esp32_emulator', ESP32_EMULATOR)
+    emulator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(emulator)
+    return emulator.load_firmware()
+
+
+def mask_frame(esp32, payload, opcode):
+    """Frame WebSocket mascarado, como o cliente (PC) envia"""
+    frame = bytearray(esp32.create_websocket_frame(payload, opcode))
+    mask_key = b'\x12\x34\x56\x78'
+    header_size = len(frame) - len(payload)
+    frame[1] |= 0x80
+    masked = bytes(b ^ mask_key[i % 4] for i, b in enumerate(frame[header_size:]))
+    return bytes(frame[:header_size]) + mask_key + masked
+
+
+def suite_esp32():
+    """Funções do ESP32 rodando no CPython (custo relativo entre versões)"""
+    esp32 = load_esp32_module()
+    motor_control = esp32.MotorControl()
+
+    json_command = json.dumps({"action": "custom", "left": 50, "right": 40, "seq": 7})
+    binary_command = encode_command({"action": "custom", "left": 50, "right": 40}, 7)
+    json_frame = mask_frame(esp32, json_command.encode(), esp32.WS_OPCODE_TEXT)
+    binary_frame = mask_frame(esp32, binary_command, esp32.WS_OPCODE_BINARY)
+    json_ack = json.dumps({"status": "ok", "seq": 7})
+
+    cases = [
+        ("parse_websocket_frame", "json", lambda: esp32.parse_websocket_frame(json_frame)),
+        ("parse_websocket_frame", "binary", lambda: esp32.parse_websocket_frame(binary_frame)),
+        ("create_websocket_frame", "json", lambda: esp32.create_websocket_frame(json_ack)),
+        ("create_websocket_frame", "binary",
+         lambda: esp32.create_websocket_frame(binary_command, esp32.WS_OPCODE_BINARY)),
+        ("handle_command", "json", lambda: esp32.handle_command(json_command, motor_control)),
+        ("handle_command", "binary", lambda: esp32.handle_command(binary_command, motor_control)),
+    ]
+    return [dict(name=f"esp32.{name}", encoding=encoding, **measure(func))
+            for name, encoding, func in cases]
+
+
+def environment():
+    """Versões e commit, para saber o que cada JSON mediu"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=ESP32_DIR).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "opencv": cv2.__version__, "machine": platform.machine(),
+            "platform": platform.platform(), "commit": commit,
+            "date": time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def case_key(result):
+    """Identifica o caso pelos parâmetros (tudo menos as medições)"""
+    return tuple(sorted((k, str(v)) for k, v in result.items()
+                        if k not in ("median_us", "min_us", "calls")))
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """Casos que ficaram mais lentos que baseline por mais de threshold (fração)"""
+    previous = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(case_key(result))
+        if before and result["median_us"] > before["median_us"] * (1 + threshold):
+            regressions.append((result, before["median_us"]))
+    return regressions
+
+
+def describe(result):
+    params = ", ".join(f"{k}={v}" for k, v in result.items()
+                       if k not in ("name", "median_us", "min_us", "calls"))
+    return f"{result['name']}({params})"
+
+
+def run_suite(resolutions, roi_heights, frame_count):
+    results = suite_process_frame(resolutions, roi_heights, frame_count=frame_count)
+    results += suite_controllers()
+    results += suite_esp32()
+    return {"environment": environment(), "results": results}
+
+
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos detectores de linha')
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+',
+                        default=[(320, 240), (640, 480), (1280, 720)],
+                        help='Resoluções LxA (padrão: 320x240 640x480 1280x720)')
+    parser.add_argument('--frames', type=int, default=50,
+                        help='Frames sintéticos por resolução (padrão: 50)')
+    parser.add_argument('--debug', action='store_true',
+                        help='Inclui o custo das visualizações de debug')
+    parser.add_argument('--probe', type=str, default=None, metavar='CAMERA',
+                        help='Mede latência e CPU de cada modo da câmera (índice ou URL)')
+    parser.add_argument('--suite', action='store_true',
+                        help='Roda a suíte completa (visão, controle e ESP32)')
+    parser.add_argument('--roi-heights', type=float, nargs='+', default=[0.2, 0.3, 0.5],
+                        help='Alturas de ROI da suíte (padrão: 0.2 0.3 0.5)')
+    parser.add_argument('--json', type=str, default=None,
+                        help='Arquivo JSON com os resultados da suíte')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='JSON de uma versão anterior para apontar regressões')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Piora relativa considerada regressão (padrão: 0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.probe:
+        source = int(args.probe) if args.probe.isdigit() else args.probe
+        modes = probe_modes(source, args.frames)
+        if not modes:
+            print(f"✗ Nenhum modo disponível em {args.probe}")
+            sys.exit(1)
+
+        print(f"{'Modo':<55} {'FPS':>6} {'Grab (ms)':>10} {'Decod. (ms)':>12} "
+              f"{'CPU (ms)':>9} {'Buffer':>7} {'Atraso (ms)':>12}")
+        for mode in modes:
+            print(f"{describe_mode(mode):<55} {mode['real_fps']:>6.1f} {mode['grab_ms']:>10.2f} "
+                  f"{mode['decode_ms']:>12.2f} {mode['cpu_ms']:>9.2f} {mode['buffered']:>7} "
+                  f"{mode['latency_ms']:>12.1f}")
+        best = min(modes, key=lambda mode: mode['latency_ms'])
+        print(f"\n✓ Menor atraso: {describe_mode(best)} ({best['latency_ms']:.1f} ms)")
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({"environment": environment(), "source": args.probe, "modes": modes},
+                          f, indent=2)
+            print(f"✓ Resultados em {args.json}")
+        return
+
+    if args.suite:
+        report = run_suite(args.resolutions, args.roi_heights, min(args.frames, 20))
+        for result in report["results"]:
+            print(f"{describe(result):<75} {result['median_us']:>10.1f} µs")
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n✓ Resultados em {args.json}")
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            regressions = compare_results(report, baseline, args.threshold)
+            for result, before in regressions:
+                print(f"⚠ Regressão: {describe(result)} {before:.1f} -> "
+                      f"{result['median_us']:.1f} µs")
+            if not regressions:
+                print("✓ Nenhuma regressão em relação ao baseline")
+            sys.exit(1 if regressions else 0)
+        return
+
+    print(f"{'Resolução':>12} {'HSV (ms)':>10} {'Fast (ms)':>10} {'Ganho':>7} {'Δx (px)':>8} "
+          f"{'Bands (ms)':>11} {'Ganho':>7} {'Track (ms)':>11} {'Janela':>7}")
+    for row in compare_detectors(args.resolutions, args.frames, args.debug):
+        print(f"{row['resolution']:>12} {row['hsv']:>10.3f} {row['fast']:>10.3f} "
+              f"{row['speedup']:>6.1f}x {row['x_diff']:>8.1f} "
+              f"{row['bands']:>11.3f} {row['bands_speedup']:>6.1f}x "
+              f"{row['tracked']:>11.3f} {row['window'] * 100:>6.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,230 @@
 """
 Ferramenta de calibração HSV
 Use este script para encontrar os valores ideais de HSV para detectar a linha
+
+Com --auto amostra N frames, monta os histogramas da ROI e escolhe o limiar
+que separa linha e fundo (Otsu ou k-means de 2 classes); com --headless roda
+sem janela, inclusive sobre vídeos e gravações (recording.py). O resultado
+vai para um perfil JSON que o line_follower.py carrega ao iniciar:
+
+    python calibrate_hsv.py --auto --headless --camera corrida1
 """
 
 import cv2
 import numpy as np
 import argparse
+import json
+import os
+import time
+
+from camera import open_source
+
+# Perfil carregado pelo line_follower.py quando existe
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hsv_profile.json')
+
+# Folga acima da saturação da linha branca (o fundo claro também satura pouco)
+SATURATION_MARGIN = 10
+
+# Separabilidade mínima: uma única classe gaussiana já dá 2/π ≈ 0.64
+MIN_SEPARABILITY = 0.8
 
 def nothing(x):
     """Callback vazio para trackbars"""
     pass
 
-def calibrate_hsv(camera_url=None):
+def otsu_threshold(hist):
     """
-    Abre uma janela com trackbars para ajustar valores HSV em tempo real
+    Limiar de Otsu sobre um histograma (valores <= limiar formam a 1ª classe)
+    Maximiza a variância entre classes, calculada para todos os limiares de uma vez.
+    Sem pixels entre as classes o máximo é um patamar: usa o meio dele, e não
+    a borda colada na linha
+    """
+    p = hist / hist.sum()
+    levels = np.arange(len(hist))
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = np.nan_to_num((mu[-1] * omega - mu) ** 2 / (omega * (1 - omega)))
+    best = np.flatnonzero(between >= between.max() * (1 - 1e-9))
+    return int(best[0] + best[-1]) // 2
+
+def kmeans_threshold(hist, iterations=100):
+    """
+    K-means com 2 classes em 1D sobre o histograma (isodata): o limiar é o
+    ponto médio entre as médias das classes, repetido até estabilizar
     """
-    # Abre câmera
-    if camera_url:
-        cap = cv2.VideoCapture(camera_url)
+    levels = np.arange(len(hist))
+    threshold = int((levels * hist).sum() / hist.sum())
+    for _ in range(iterations):
+        low, high = hist[:threshold + 1], hist[threshold + 1:]
+        if not low.sum() or not high.sum():
+            break
+        mean_low = (levels[:threshold + 1] * low).sum() / low.sum()
+        mean_high = (levels[threshold + 1:] * high).sum() / high.sum()
+        new = int((mean_low + mean_high) / 2)
+        if new == threshold:
+            break
+        threshold = new
+    return threshold
+
+def separability(hist, threshold):
+    """Variância entre classes / variância total (0 a 1; perto de 1 = bem separado)"""
+    p = hist / hist.sum()
+    levels = np.arange(len(hist))
+    mean = (p * levels).sum()
+    total = (p * (levels - mean) ** 2).sum()
+    omega = p[:threshold + 1].sum()
+    if total == 0 or omega in (0, 1):
+        return 0.0
+    mean_low = (p[:threshold + 1] * levels[:threshold + 1]).sum() / omega
+    mean_high = (p[threshold + 1:] * levels[threshold + 1:]).sum() / (1 - omega)
+    return float(omega * (1 - omega) * (mean_low - mean_high) ** 2 / total)
+
+def sample_rois(source, frames=30, step=5, roi_height=0.3, blur_kernel=(5, 5)):
+    """
+    Lê frames da fonte (câmera, vídeo ou gravação) e guarda a ROI em HSV,
+    com o mesmo blur do detector HSV
+    step: frames lidos por amostra (espalha as amostras pela pista)
+    Retorna: array (amostras, altura, largura, 3) ou None
+    """
+    cap = open_source(source, replay_realtime=False)
+    if not cap.isOpened():
+        print("✗ Erro ao abrir câmera")
+        return None
+    
+    samples = []
+    try:
+        index = 0
+        while len(samples) < frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            index += 1
+            if (index - 1) % step:
+                continue
+            
+            if frame.ndim == 2:
+                print("✗ Frames em tons de cinza: a calibração HSV precisa de cor")
+                return None
+            
+            height = frame.shape[0]
+            roi = frame[int(height * (1 - roi_height)):height]
+            hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+            samples.append(cv2.GaussianBlur(hsv, blur_kernel, 0))
+    finally:
+        cap.release()
+    
+    if not samples:
+        print("✗ Nenhum frame lido")
+        return None
+    return np.stack(samples)
+
+def estimate_thresholds(samples, line='black', method='otsu'):
+    """
+    Limiares HSV da linha a partir das ROIs amostradas
+    O brilho (V) separa linha e fundo; na linha branca a saturação máxima
+    vem dos próprios pixels da linha
+    Retorna: perfil (dict) com lower_hsv/upper_hsv, o limiar do detector
+    rápido (linha preta) e a qualidade da separação
+    """
+    value = samples[..., 2].ravel()
+    hist = np.bincount(value, minlength=256).astype(np.float64)
+    threshold = otsu_threshold(hist) if method == 'otsu' else kmeans_threshold(hist)
+    
+    profile = {"line": line, "method": method, "frames": len(samples),
+               "separability": round(separability(hist, threshold), 3)}
+    if line == 'black':
+        line_pixels = value <= threshold
+        profile.update(lower_hsv=[0, 0, 0], upper_hsv=[180, 255, threshold],
+                       fast_threshold=threshold, fast_channel='v')
     else:
-        cap = cv2.VideoCapture(0)
+        line_pixels = value > threshold
+        saturation = samples[..., 1].ravel()[line_pixels]
+        s_max = 255
+        if saturation.size:
+            s_max = min(255, int(np.percentile(saturation, 99)) + SATURATION_MARGIN)
+        profile.update(lower_hsv=[0, 0, threshold + 1], upper_hsv=[180, s_max, 255],
+                       fast_threshold=None, fast_channel=None)
+    profile["line_fraction"] = round(float(line_pixels.mean()), 4)
+    return profile
+
+def check_profile(profile):
+    """Avisos sobre um perfil automático suspeito"""
+    warnings = []
+    if profile["line_fraction"] > 0.5:
+        warnings.append(f"a linha ocupa {profile['line_fraction'] * 100:.0f}% da ROI "
+                        f"(confira --line)")
+    if profile["line_fraction"] < 0.005:
+        warnings.append("quase nenhum pixel de linha (a linha estava na ROI?)")
+    if profile["separability"] < MIN_SEPARABILITY:
+        warnings.append(f"contraste baixo entre linha e fundo "
+                        f"(separabilidade {profile['separability']:.2f})")
+    return warnings
+
+def save_profile(profile, path=PROFILE_PATH):
+    profile = dict(profile, created=time.strftime('%Y-%m-%d %H:%M:%S'))
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+def load_profile(path=PROFILE_PATH):
+    """Perfil salvo pela calibração (None se o arquivo não existe)"""
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def auto_calibrate(camera_url=None, frames=30, step=5, roi_height=0.3, line='black',
+                   method='otsu'):
+    """Amostra frames e estima os limiares (None se não há frames)"""
+    samples = sample_rois(camera_url or 0, frames, step, roi_height)
+    if samples is None:
+        return None
+    
+    profile = estimate_thresholds(samples, line, method)
+    profile["roi_height"] = roi_height
+    
+    print("\n=== CALIBRAÇÃO AUTOMÁTICA ===")
+    print(f"Frames: {profile['frames']}  Método: {method}  Linha: {line}")
+    print(f"LOWER_HSV = {profile['lower_hsv']}")
+    print(f"UPPER_HSV = {profile['upper_hsv']}")
+    if profile["fast_threshold"] is not None:
+        print(f"Detector rápido: limiar {profile['fast_threshold']} no canal V")
+    print(f"Linha: {profile['line_fraction'] * 100:.1f}% da ROI, "
+          f"separabilidade {profile['separability']:.2f}")
+    for warning in check_profile(profile):
+        print(f"⚠ {warning}")
+    return profile
+
+def calibrate_hsv(camera_url=None, initial=None, output=PROFILE_PATH):
+    """
+    Abre uma janela com trackbars para ajustar valores HSV em tempo real
+    initial: perfil para posicionar os trackbars (ex.: da calibração automática)
+    """
+    # Abre câmera (ou vídeo/gravação)
+    cap = open_source(camera_url or 0)
     
     if not cap.isOpened():
         print("Erro ao abrir câmera")
         return
     
+    lower = (initial or {}).get("lower_hsv", [0, 0, 0])
+    upper = (initial or {}).get("upper_hsv", [180, 255, 50])
+    
     # Cria janela
     window_name = 'Calibracao HSV'
     cv2.namedWindow(window_name)
     
     # Cria trackbars
-    cv2.createTrackbar('H Min', window_name, 0, 180, nothing)
-    cv2.createTrackbar('H Max', window_name, 180, 180, nothing)
-    cv2.createTrackbar('S Min', window_name, 0, 255, nothing)
-    cv2.createTrackbar('S Max', window_name, 255, 255, nothing)
-    cv2.createTrackbar('V Min', window_name, 0, 255, nothing)
-    cv2.createTrackbar('V Max', window_name, 50, 255, nothing)
+    cv2.createTrackbar('H Min', window_name, lower[0], 180, nothing)
+    cv2.createTrackbar('H Max', window_name, upper[0], 180, nothing)
+    cv2.createTrackbar('S Min', window_name, lower[1], 255, nothing)
+    cv2.createTrackbar('S Max', window_name, upper[1], 255, nothing)
+    cv2.createTrackbar('V Min', window_name, lower[2], 255, nothing)
+    cv2.createTrackbar('V Max', window_name, upper[2], 255, nothing)
     
     print("\n=== CALIBRAÇÃO HSV ===")
     print("Ajuste os trackbars até que apenas a linha apareça em branco")
-    print("Pressione ESC ou Q para sair e ver os valores")
+    print("Pressione ESC ou Q para sair e salvar os valores")
     print("\nDica: Para linha PRETA, mantenha V Max baixo (~50)")
     print("      Para linha BRANCA, mantenha V Min alto (~200)\n")
     
@@ -73,7 +258,7 @@ def calibrate_hsv(camera_url=None):
         
         # Adiciona texto com valores atuais
         text = f"HSV: [{h_min}, {s_min}, {v_min}] - [{h_max}, {s_max}, {v_max}]"
-        cv2.putText(combined, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
+        cv2.putText(combined, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
                    0.7, (0, 255, 0), 2)
         
         cv2.imshow(window_name, combined)
@@ -93,7 +278,15 @@ def calibrate_hsv(camera_url=None):
     print("\n=== VALORES CALIBRADOS ===")
     print(f"LOWER_HSV = [{h_min}, {s_min}, {v_min}]")
     print(f"UPPER_HSV = [{h_max}, {s_max}, {v_max}]")
-    print("\nCopie estes valores para o arquivo config.py")
+    
+    # Ajuste manual a partir do automático: o detector rápido segue o V Max
+    method = f"{initial['method']} + manual" if initial else "manual"
+    profile = dict(initial or {"line": "black"}, method=method,
+                   lower_hsv=[h_min, s_min, v_min], upper_hsv=[h_max, s_max, v_max])
+    if profile.get("fast_threshold") is not None:
+        profile["fast_threshold"] = v_max
+    save_profile(profile, output)
+    print(f"\n✓ Perfil salvo em {output} (carregado pelo line_follower.py)")
     
     cap.release()
     cv2.destroyAllWindows()
@@ -101,8 +294,40 @@ def calibrate_hsv(camera_url=None):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Calibração HSV')
     parser.add_argument('--camera', type=str, default=None,
-                       help='URL da câmera IP')
+                       help='URL da câmera IP, vídeo ou pasta de gravação')
+    parser.add_argument('--auto', action='store_true',
+                       help='Estima os limiares pelos histogramas da ROI')
+    parser.add_argument('--headless', action='store_true',
+                       help='Sem janela: só a calibração automática (exige --auto)')
+    parser.add_argument('--method', choices=['otsu', 'kmeans'], default='otsu',
+                       help='Separação linha/fundo no histograma de brilho (padrão: otsu)')
+    parser.add_argument('--line', choices=['black', 'white'], default='black',
+                       help='Cor da linha (padrão: black)')
+    parser.add_argument('--frames', type=int, default=30,
+                       help='Frames amostrados (padrão: 30)')
+    parser.add_argument('--step', type=int, default=5,
+                       help='Uma amostra a cada N frames lidos (padrão: 5)')
+    parser.add_argument('--roi', type=float, default=0.3,
+                       help='Altura da ROI amostrada (padrão: 0.3)')
+    parser.add_argument('--output', type=str, default=PROFILE_PATH,
+                       help='Arquivo do perfil (padrão: hsv_profile.json ao lado do script)')
     args = parser.parse_args()
     
-    calibrate_hsv(args.camera)
-
+    if args.headless and not args.auto:
+        parser.error('--headless exige --auto')
+    
+    camera = int(args.camera) if args.camera and args.camera.isdigit() else args.camera
+    
+    if args.auto:
+        profile = auto_calibrate(camera, args.frames, max(1, args.step), args.roi,
+                                 args.line, args.method)
+        if profile is None:
+            raise SystemExit(1)
+        if args.headless:
+            save_profile(profile, args.output)
+            print(f"\n✓ Perfil salvo em {args.output} (carregado pelo line_follower.py)")
+        else:
+            # Refinamento manual a partir dos valores automáticos
+            calibrate_hsv(camera, profile, args.output)
+    else:
+        calibrate_hsv(camera, output=args.output)
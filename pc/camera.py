@@ -0,0 +1,373 @@
+"""
+Captura de frames da câmera em uma thread dedicada
+Mantém apenas o frame mais recente (slot único) para que o loop de controle
+sempre processe a imagem mais nova sem bloquear o loop asyncio
+
+Câmeras ao vivo abrem em CameraCapture, que negocia o modo de menor latência
+(MJPG, resolução/fps pedidos, buffer de 1 frame) e registra o modo obtido;
+probe_modes mede cada modo suportado (python benchmark.py --probe 0)
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from mjpeg_stream import MjpegStream
+from recording import ReplaySource, is_recording
+
+
+# MJPG comprimido: menos banda USB, então mais fps nas resoluções altas
+DEFAULT_FOURCC = 'MJPG'
+
+# Modos testados por probe_modes em câmeras locais
+PROBE_FOURCCS = ('MJPG', 'YUYV')
+PROBE_RESOLUTIONS = ((320, 240), (640, 480), (800, 600), (1280, 720), (1920, 1080))
+PROBE_FPS = (30, 60)
+
+
+def is_device(source):
+    """Câmera local: índice ou /dev/video*"""
+    return isinstance(source, int) or (isinstance(source, str)
+                                       and (source.isdigit() or source.startswith('/dev/video')))
+
+
+def is_live(source):
+    """Câmera local ou de rede (arquivos de vídeo e gravações não são ao vivo)"""
+    return is_device(source) or (isinstance(source, str) and '://' in source)
+
+
+def decode_fourcc(value):
+    code = int(value)
+    if code <= 0:
+        return None
+    return ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ') or None
+
+
+def describe_mode(mode):
+    """Modo de captura em uma linha para o console"""
+    if not mode:
+        return "desconhecido"
+    text = f"{mode['fourcc'] or '?'} {mode['width']}x{mode['height']}"
+    if mode['fps']:
+        text += f" @ {mode['fps']:.0f} fps"
+    text += f", buffer {mode['buffer_size'] or 'não ajustável'}"
+    return f"{text} ({mode['backend']})"
+
+
+class CameraCapture:
+    """
+    cv2.VideoCapture de câmera ao vivo com o modo negociado (mesma interface)
+    Câmeras locais usam V4L2 no Linux e pedem fourcc, resolução e fps; todas
+    pedem buffer interno de buffer_size frames. O OpenCV ignora em silêncio o
+    que o driver não suporta, então mode guarda o que foi realmente obtido.
+    Se o buffer não pôde ser reduzido, drain_frames > 0: o leitor descarta
+    frames antigos com drain_stale
+    """
+
+    def __init__(self, source, width=None, height=None, fps=None, fourcc=DEFAULT_FOURCC,
+                 buffer_size=1):
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        backend = cv2.CAP_ANY
+        if is_device(source) and sys.platform.startswith('linux'):
+            backend = cv2.CAP_V4L2
+        self.cap = cv2.VideoCapture(source, backend)
+        self.source = source
+        self.requested = {"fourcc": fourcc, "width": width, "height": height, "fps": fps,
+                          "buffer_size": buffer_size}
+        self.mode = None
+        self.drain_frames = 0
+        self.drain_threshold = 0.005
+        if self.cap.isOpened():
+            self.negotiate()
+
+    def negotiate(self):
+        """Pede o modo e lê de volta o que o driver aceitou"""
+        cap = self.cap
+        requested = self.requested
+        if is_device(self.source):
+            # Fourcc antes da resolução: alguns drivers só aceitam o tamanho no formato certo
+            if requested["fourcc"]:
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*requested["fourcc"]))
+            if requested["width"] and requested["height"]:
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, requested["width"])
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, requested["height"])
+            if requested["fps"]:
+                cap.set(cv2.CAP_PROP_FPS, requested["fps"])
+        if requested["buffer_size"]:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, requested["buffer_size"])
+
+        buffer_size = int(cap.get(cv2.CAP_PROP_BUFFERSIZE))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.mode = {"fourcc": decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC)),
+                     "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                     "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                     "fps": fps if fps > 0 else None,
+                     "buffer_size": buffer_size if buffer_size > 0 else None,
+                     "backend": cap.getBackendName()}
+
+        # Buffer maior que 1 (ou desconhecido): descarta o que vier acumulado.
+        # Um grab() servido do buffer volta bem antes do período de um frame
+        if self.mode["buffer_size"] != 1:
+            self.drain_frames = self.mode["buffer_size"] or 4
+        if self.mode["fps"]:
+            self.drain_threshold = 0.25 / self.mode["fps"]
+        return self.mode
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+def drain_stale(source, max_frames, threshold):
+    """
+    grab() que descarta frames acumulados no buffer do driver
+    Enquanto grab() volta em menos de threshold segundos o frame já estava no
+    buffer (antigo): pega o próximo, até max_frames descartados
+    Retorna: (ok, frames descartados)
+    """
+    drained = 0
+    while True:
+        start = time.monotonic()
+        ok = source.grab()
+        if not ok or drained >= max_frames or time.monotonic() - start >= threshold:
+            return ok, drained
+        drained += 1
+
+
+def open_source(source, mjpeg=False, decode_scale=1, grayscale=False, replay_realtime=True,
+                width=None, height=None, fps=None, fourcc=DEFAULT_FOURCC, buffer_size=1):
+    """
+    Abre a fonte de frames
+    mjpeg: usa o leitor MJPEG nativo (URLs http), com decodificação reduzida
+    decode_scale/grayscale: repassados ao leitor MJPEG
+    width/height/fps/fourcc/buffer_size: modo pedido à câmera ao vivo (CameraCapture)
+    Uma pasta de gravação (recording.py) é reproduzida no lugar da câmera,
+    em tempo real ou, com replay_realtime=False, o mais rápido possível
+    """
+    if is_recording(source):
+        return ReplaySource(source, realtime=replay_realtime)
+    if mjpeg:
+        return MjpegStream(source, decode_scale, grayscale)
+    if is_live(source):
+        return CameraCapture(source, width, height, fps, fourcc, buffer_size)
+    return cv2.VideoCapture(source)
+
+
+def probe_mode(source, fourcc, width, height, fps, frames=60, idle=0.5):
+    """
+    Mede um modo de captura
+    Retorna o modo obtido com: fps real, espera do grab() e decodificação
+    (p50, ms), CPU do processo por frame (ms) e frames acumulados no buffer
+    após idle segundos sem ler - cada um soma um período de atraso
+    """
+    cap = CameraCapture(source, width, height, fps, fourcc)
+    try:
+        if not cap.isOpened() or not cap.read()[0]:
+            return None
+        # Aquecimento (exposição automática, primeiros frames lentos)
+        for _ in range(5):
+            cap.read()
+
+        # Frames acumulados: espera sem ler e conta os grab() instantâneos
+        time.sleep(idle)
+        _, buffered = drain_stale(cap, 64, cap.drain_threshold)
+
+        grabs = np.zeros(frames)
+        decodes = np.zeros(frames)
+        cpu_start = time.process_time()
+        start = time.monotonic()
+        count = 0
+        for i in range(frames):
+            t0 = time.monotonic()
+            if not cap.grab():
+                break
+            t1 = time.monotonic()
+            if not cap.retrieve()[0]:
+                break
+            grabs[i] = t1 - t0
+            decodes[i] = time.monotonic() - t1
+            count += 1
+        elapsed = time.monotonic() - start
+        cpu = time.process_time() - cpu_start
+        if not count:
+            return None
+
+        real_fps = count / elapsed
+        decode_ms = float(np.median(decodes[:count]) * 1000)
+        return {**cap.mode, "requested": cap.requested, "real_fps": real_fps,
+                "grab_ms": float(np.median(grabs[:count]) * 1000), "decode_ms": decode_ms,
+                "cpu_ms": cpu / count * 1000, "buffered": buffered,
+                # Atraso além da exposição: frames no buffer + decodificação
+                "latency_ms": buffered * 1000 / real_fps + decode_ms}
+    finally:
+        cap.release()
+
+
+def probe_modes(source, frames=60):
+    """
+    Mede todos os modos que a câmera aceita (modos repetidos após a
+    negociação são medidos uma vez); câmeras de rede têm um único modo
+    """
+    if not is_device(source):
+        candidates = [(None, None, None, None)]
+    else:
+        candidates = [(fourcc, width, height, fps) for fourcc in PROBE_FOURCCS
+                      for width, height in PROBE_RESOLUTIONS for fps in PROBE_FPS]
+
+    results = []
+    seen = set()
+    for fourcc, width, height, fps in candidates:
+        result = probe_mode(source, fourcc, width, height, fps, frames)
+        if result is None:
+            continue
+        key = (result["fourcc"], result["width"], result["height"], result["fps"])
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append(result)
+    return results
+
+
+class FrameGrabber:
+    """
+    Lê frames de uma fonte (cv2.VideoCapture ou compatível) em uma thread própria
+    lockstep: só lê o próximo frame depois que o anterior foi consumido
+    (reprodução o mais rápido possível sem descartar frames)
+    clock: função que dá o horário do frame lido (padrão: time.monotonic;
+    ReplaySource.frame_time usa o horário gravado)
+    Com CameraCapture sem buffer de 1 frame, os frames acumulados no driver
+    são descartados antes do retrieve() (drain_stale)
+    read_times: (captura, fim da decodificação) do último frame lido, em
+    time.monotonic - com VideoCapture a captura é o fim de grab(); com o
+    leitor MJPEG, a chegada do JPEG
+    """
+
+    def __init__(self, source, lockstep=False, clock=None):
+        self.source = source
+        self.lockstep = lockstep
+        self.clock = clock or time.monotonic
+        self.running = False
+        self.failed = False
+
+        # Slot único com o frame mais recente
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._times = (0.0, 0.0)
+        self._seq = 0
+        self._consumed_seq = 0
+        self._thread = None
+        self.read_times = (0.0, 0.0)
+
+        # grab() + retrieve() separam a captura da decodificação
+        self._split = hasattr(source, 'grab') and hasattr(source, 'retrieve')
+        self._drain = getattr(source, 'drain_frames', 0)
+
+        # Estatísticas
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.drained_frames = 0
+
+    def start(self):
+        """Inicia a thread de captura"""
+        self.running = True
+        self.failed = False
+        self._thread = threading.Thread(target=self._run, name='FrameGrabber', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a thread de captura (não libera a fonte)"""
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        """Loop da thread: lê continuamente e sobrescreve o slot"""
+        while self.running:
+            if self.lockstep:
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self._consumed_seq == self._seq or not self.running)
+                if not self.running:
+                    break
+
+            if self._split:
+                if self._drain:
+                    ret, drained = drain_stale(self.source, self._drain,
+                                               self.source.drain_threshold)
+                    self.drained_frames += drained
+                else:
+                    ret = self.source.grab()
+                captured = time.monotonic()
+                frame = None
+                if ret:
+                    ret, frame = self.source.retrieve()
+            else:
+                ret, frame = self.source.read()
+                captured = getattr(self.source, 'last_arrival', None)
+            decoded = time.monotonic()
+            timestamp = self.clock()
+
+            with self._condition:
+                if not ret:
+                    self.failed = True
+                    self.running = False
+                    self._condition.notify_all()
+                    break
+
+                # Frame anterior nunca foi consumido - descartado
+                if self._seq > self._consumed_seq:
+                    self.dropped_frames += 1
+
+                self._frame = frame
+                self._timestamp = timestamp
+                self._times = (captured or decoded, decoded)
+                self._seq += 1
+                self.captured_frames += 1
+                self._condition.notify_all()
+
+    def read(self, last_seq=0, timeout=1.0):
+        """
+        Aguarda um frame mais novo que last_seq
+        Retorna: (frame, timestamp de captura, seq) ou None em timeout/falha
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > last_seq or not self.running, timeout)
+
+            if self._seq <= last_seq:
+                return None
+
+            self._consumed_seq = self._seq
+            self.read_times = self._times
+            self._condition.notify_all()
+            return self._frame, self._timestamp, self._seq
+
+    async def read_async(self, last_seq=0, timeout=1.0):
+        """Versão de read() que não bloqueia o loop asyncio"""
+        return await asyncio.to_thread(self.read, last_seq, timeout)
@@ -0,0 +1,266 @@
+"""
+Canal de comandos não bloqueante para o ESP32
+O loop de frames apenas deposita o comando mais recente; o envio e a leitura
+das confirmações (acks) acontecem em tarefas separadas
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+
+import protocol
+
+
+class CommandChannel:
+    """Fila de saída com coalescência (o mais recente vence), números de sequência e acks"""
+
+    def __init__(self, connection, encoding='json', ack_timeout=0.5, max_in_flight=4,
+                 latency=None, on_message=None):
+        """
+        connection: conexão WebSocket ou UdpTransport (send + iteração assíncrona)
+        encoding: 'json', 'binary' (struct) ou 'datagram' (struct + timestamp, para UDP)
+        latency: LatencyMonitor que recebe os horários ecoados nos acks
+        on_message: chamada com as mensagens que não são acks (ex.: telemetria)
+        """
+        self.connection = connection
+        self.encoding = encoding
+        self.ack_timeout = ack_timeout
+        self.max_in_flight = max_in_flight
+        self.latency = latency
+        self.on_message = on_message
+        self.connected = True
+
+        self._pending = None  # Slot único: comando mais recente ainda não enviado
+        self._pending_stamps = None  # FrameStamps do frame que gerou o comando pendente
+        self._config = []     # Comandos de configuração: nunca substituídos, sempre em JSON
+        self._wakeup = asyncio.Event()
+        self._in_flight = OrderedDict()  # seq -> (horário de envio, FrameStamps)
+        # Último setpoint enviado (seq, chave, horário) e seq do último setpoint confirmado
+        self._last_setpoint = None
+        self._acked_setpoint_seq = None
+        self._seq = 0
+        self._tasks = []
+
+        # Estatísticas
+        self.sent = 0
+        self.coalesced = 0
+        self.acked = 0
+        self.missed_acks = 0
+        self.rtt_last = None
+        self.rtt_avg = None
+        self.rtt_max = 0.0
+
+    def start(self):
+        """Inicia as tarefas de envio e de leitura de acks"""
+        self._tasks = [
+            asyncio.create_task(self._sender()),
+            asyncio.create_task(self._reader()),
+        ]
+
+    def submit(self, command, stamps=None):
+        """
+        Agenda um comando sem esperar pela rede (substitui o pendente)
+        stamps: FrameStamps do frame que originou o comando (latência)
+        """
+        if not self.connected:
+            return False
+
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = command
+        self._pending_stamps = stamps
+        if stamps is not None:
+            stamps.submitted = time.monotonic()
+        self._wakeup.set()
+        return True
+
+    def submit_config(self, command):
+        """Agenda um comando de configuração (ex.: ganhos), enviado antes dos setpoints"""
+        if not self.connected:
+            return False
+
+        self._config.append(command)
+        self._wakeup.set()
+        return True
+
+    def is_confirmed(self, command, max_age):
+        """
+        O comando é igual ao último setpoint enviado, que o ESP32 já confirmou,
+        há menos de max_age segundos e sem outro comando pendente
+        """
+        last = self._last_setpoint
+        if last is None or self._pending is not None:
+            return False
+        seq, key, sent_at = last
+        if seq != self._acked_setpoint_seq or time.monotonic() - sent_at >= max_age:
+            return False
+        try:
+            return protocol.setpoint_key(command, self.encoding) == key
+        except (KeyError, ValueError):
+            return False
+
+    @property
+    def backlog(self):
+        """Comandos aguardando ack, mais o pendente ainda não enviado"""
+        return len(self._in_flight) + (self._pending is not None)
+
+    async def close(self, flush_timeout=0.5):
+        """Envia o último comando pendente e encerra as tarefas"""
+        deadline = time.monotonic() + flush_timeout
+        while ((self._pending is not None or self._config) and self.connected
+               and time.monotonic() < deadline):
+            await asyncio.sleep(0.005)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFFFF
+        return self._seq
+
+    def _expire_acks(self):
+        """Conta como perdidos os acks que passaram do timeout"""
+        now = time.monotonic()
+        while self._in_flight:
+            seq, (sent_at, _) = next(iter(self._in_flight.items()))
+            if now - sent_at < self.ack_timeout:
+                break
+            del self._in_flight[seq]
+            self.missed_acks += 1
+
+    def _next_deadline(self):
+        """Segundos até o ack mais antigo em voo expirar (ack_timeout sem acks pendentes)"""
+        if not self._in_flight:
+            return self.ack_timeout
+        sent_at, _ = next(iter(self._in_flight.values()))
+        return max(0.0, sent_at + self.ack_timeout - time.monotonic())
+
+    async def _sender(self):
+        """Tarefa de envio: transmite sempre o comando mais recente"""
+        while self.connected:
+            # Acorda com um comando novo, um ack ou quando o ack mais antigo vence
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_deadline())
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            self._expire_acks()
+
+            # Janela cheia - espera um ack ou o vencimento do mais antigo
+            if len(self._in_flight) >= self.max_in_flight:
+                continue
+
+            stamps = None
+            setpoint = False
+            if self._config:
+                command = self._config.pop(0)
+                seq = self._next_seq()
+                message = self._encode_json(command, seq)
+            elif self._pending is not None:
+                command = self._pending
+                stamps = self._pending_stamps
+                self._pending = None
+                self._pending_stamps = None
+                setpoint = True
+                seq = self._next_seq()
+                message = self._encode(command, seq)
+            else:
+                continue
+
+            try:
+                await self.connection.send(message)
+            except Exception as e:
+                print(f"✗ Erro ao enviar comando: {e}")
+                self.connected = False
+                break
+
+            sent_at = time.monotonic()
+            self._in_flight[seq] = (sent_at, stamps)
+            self.sent += 1
+            if setpoint:
+                self._last_setpoint = (seq, protocol.setpoint_key(command, self.encoding), sent_at)
+
+            # Ainda há comandos na fila de configuração ou um setpoint novo
+            if self._config or self._pending is not None:
+                self._wakeup.set()
+
+    async def _reader(self):
+        """Tarefa de leitura: processa acks à medida que chegam"""
+        try:
+            async for message in self.connection:
+                self._handle_ack(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Conexão com o ESP32 perdida: {e}")
+        self.connected = False
+        self._wakeup.set()
+
+    def _encode(self, command, seq):
+        """Binário (frame WebSocket binário ou datagrama) ou JSON (frame de texto)"""
+        if self.encoding == 'datagram':
+            return protocol.encode_datagram(command, seq, time.monotonic() * 1000)
+        if self.encoding == 'binary':
+            return protocol.encode_command(command, seq)
+        return self._encode_json(command, seq)
+
+    def _encode_json(self, command, seq):
+        command = dict(command)
+        command["seq"] = seq
+        return json.dumps(command)
+
+    def _decode_ack(self, message):
+        """
+        Retorna (seq confirmado ou None se não houver seq, horários do ESP32 ou None)
+        ou False se não for um ack
+        """
+        if isinstance(message, bytes):
+            ack = protocol.decode_ack(message)
+            return False if ack is None else (ack[0], protocol.decode_ack_timing(message))
+
+        try:
+            ack = json.loads(message)
+        except (TypeError, ValueError):
+            return False
+
+        if not isinstance(ack, dict) or "status" not in ack:
+            return False
+        timing = (ack["rx"], ack["pwm"]) if "rx" in ack and "pwm" in ack else None
+        return ack.get("seq"), timing
+
+    def _handle_ack(self, message):
+        ack = self._decode_ack(message)
+        if ack is False:
+            if self.on_message is not None:
+                self.on_message(message)
+            return
+        seq, timing = ack
+
+        # Firmware antigo não devolve seq - associa ao mais antigo em voo
+        if seq is None and self._in_flight:
+            seq = next(iter(self._in_flight))
+
+        entry = self._in_flight.pop(seq, None)
+        if entry is None:
+            return
+
+        sent_at, stamps = entry
+        now = time.monotonic()
+        if self._last_setpoint is not None and self._last_setpoint[0] == seq:
+            self._acked_setpoint_seq = seq
+        rtt = now - sent_at
+        self.acked += 1
+        self.rtt_last = rtt
+        self.rtt_avg = rtt if self.rtt_avg is None else 0.9 * self.rtt_avg + 0.1 * rtt
+        self.rtt_max = max(self.rtt_max, rtt)
+
+        if self.latency is not None and timing is not None:
+            self.latency.on_ack(stamps, sent_at, now, timing)
+
+        # Libera a janela para um comando que esteja aguardando
+        if self._pending is not None or self._config:
+            self._wakeup.set()
@@ -18,7 +18,7 @@ ROI_HEIGHT = 0.3  # Altura da região de interesse (0.1 a 0.5)
 BLUR_KERNEL_SIZE = 5  # Tamanho do kernel de blur (ímpar)
 
 # Limites HSV para detecção de linha preta
-# Formato: [H, S, V]
+# Formato: [H, S, V] (o line_follower.py usa o perfil de calibrate_hsv.py)
 LOWER_BLACK = [0, 0, 0]
 UPPER_BLACK = [180, 255, 50]
 
@@ -33,7 +33,7 @@ SHARP_TURN_THRESHOLD = 150  # Pixels de desvio para curva brusca
 
 # Parâmetros de processamento
 MIN_CONTOUR_AREA = 100  # Área mínima do contorno para ser considerado
-COMMAND_INTERVAL = 0.05  # Intervalo entre comandos (segundos)
+COMMAND_INTERVAL = 0.05  # Intervalo nominal entre comandos (segundos, ver scheduler.py)
 
 # Modo debug
 DEBUG_MODE = False  # True para mostrar visualizações extras
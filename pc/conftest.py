@@ -0,0 +1,16 @@
+import importlib.util
+import os
+import sys
+
+# test_connection.py é o teste manual de conexão com o ESP32 e a câmera (script)
+collect_ignore = ["test_connection.py"]
+
+# pc/ e esp32/ têm cada um o seu config.py e rodam na mesma sessão do pytest,
+# que põe os dois diretórios no sys.path: registra o do PC como 'config' antes
+# de qualquer teste importá-lo, para scheduler.py e line_follower.py nunca
+# pegarem o do firmware
+PC_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.py')
+if getattr(sys.modules.get('config'), '__file__', None) != PC_CONFIG:
+    spec = importlib.util.spec_from_file_location('config', PC_CONFIG)
+    sys.modules['config'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['config'])
@@ -0,0 +1,156 @@
+"""
+Controladores de direção para o seguidor de linha
+O desvio é normalizado pela largura real da ROI e o dt vem dos timestamps
+dos frames, então os ganhos não dependem da resolução nem da taxa da câmera
+"""
+
+import numpy as np
+
+
+class PIDController:
+    """
+    PID com filtro passa-baixa na derivada, anti-windup e saturação da saída
+    error pode ser escalar ou array NumPy (vários cenários avaliados de uma vez);
+    os ganhos também aceitam arrays, com broadcasting
+    """
+
+    def __init__(self, kp, ki=0.0, kd=0.0, derivative_tau=0.05,
+                 output_limit=70.0, integral_limit=None):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.derivative_tau = derivative_tau
+        self.output_limit = output_limit
+        # Limite do termo integral (em unidades de saída)
+        self.integral_limit = output_limit * 0.5 if integral_limit is None else integral_limit
+        self.reset()
+
+    def reset(self):
+        """Zera o estado (ex.: linha perdida)"""
+        self.integral = 0.0
+        self.derivative = 0.0
+        self._last_error = None
+        self._last_time = None
+
+    def update(self, error, timestamp):
+        """
+        Calcula a saída para um novo erro
+        timestamp: horário da medição em segundos (ex.: captura do frame)
+        """
+        error = np.asarray(error, dtype=np.float64)
+
+        if self._last_time is None:
+            dt = 0.0
+        else:
+            dt = max(0.0, timestamp - self._last_time)
+
+        if dt > 0:
+            raw_derivative = (error - self._last_error) / dt
+            alpha = dt / (self.derivative_tau + dt)
+            self.derivative = self.derivative + alpha * (raw_derivative - self.derivative)
+
+            # Anti-windup condicional: só integra se isso não aprofundar a saturação
+            candidate = np.clip(self.integral + self.ki * error * dt,
+                                -self.integral_limit, self.integral_limit)
+            unsaturated = self.kp * error + candidate + self.kd * self.derivative
+            saturated = np.abs(unsaturated) > self.output_limit
+            winding = np.sign(unsaturated) == np.sign(error)
+            self.integral = np.where(saturated & winding, self.integral, candidate)
+
+        self._last_error = error
+        self._last_time = timestamp
+
+        output = self.kp * error + self.integral + self.kd * self.derivative
+        return np.clip(output, -self.output_limit, self.output_limit)
+
+
+class SteeringController:
+    """Converte o desvio da linha em velocidades dos motores usando um PID"""
+
+    def __init__(self, kp=60.0, ki=10.0, kd=8.0, max_correction=70.0, derivative_tau=0.05,
+                 kff=0.0):
+        self.pid = PIDController(kp, ki, kd, derivative_tau=derivative_tau,
+                                 output_limit=max_correction)
+        # Feed-forward do heading da linha à frente (detector por faixas)
+        self.kff = kff
+        self.max_correction = max_correction
+
+    @classmethod
+    def from_gains(cls, gains, mode='pid'):
+        """Cria o controlador a partir de um dict de ganhos ('p', 'pi' ou 'pid')"""
+        return cls(kp=gains.get("kp", 60.0),
+                   ki=gains.get("ki", 10.0) if mode in ('pi', 'pid') else 0.0,
+                   kd=gains.get("kd", 8.0) if mode == 'pid' else 0.0,
+                   max_correction=gains.get("max_correction", 70.0),
+                   kff=gains.get("kff", 0.0))
+
+    def reset(self):
+        self.pid.reset()
+
+    def compute(self, deviation, roi_width, timestamp, base_speed, heading=0.0):
+        """
+        deviation: desvio em pixels (positivo = linha à direita)
+        roi_width: largura real da ROI em pixels
+        heading: direção normalizada da linha à frente (-1 a 1, positivo = direita)
+        Retorna: (velocidade_esquerda, velocidade_direita)
+        """
+        error = deviation / (roi_width / 2)
+        correction = float(self.pid.update(error, timestamp)) + self.kff * heading
+        correction = max(-self.max_correction, min(self.max_correction, correction))
+
+        left = int(max(-100, min(100, base_speed + correction)))
+        right = int(max(-100, min(100, base_speed - correction)))
+        return left, right
+
+
+class BangBangController:
+    """
+    Lógica original: proporcional suave e curva brusca acima de um limiar
+    O limiar é uma fração da meia largura (150 px em 640 px ≈ 0.47)
+    """
+
+    def __init__(self, turn_speed=55, sharp_turn_threshold=150 / 320):
+        self.turn_speed = turn_speed
+        self.sharp_turn_threshold = sharp_turn_threshold
+
+    def reset(self):
+        pass
+
+    def compute(self, deviation, roi_width, timestamp, base_speed, heading=0.0):
+        if deviation == 0:
+            # Linha no centro - segue em frente
+            return base_speed, base_speed
+
+        # Normaliza o desvio (-1 a 1)
+        normalized_deviation = max(-1, min(1, deviation / (roi_width / 2)))
+
+        if abs(normalized_deviation) > self.sharp_turn_threshold:
+            # Curva brusca - um motor para frente, outro para trás
+            if deviation > 0:
+                return self.turn_speed, -int(self.turn_speed * 0.3)
+            return -int(self.turn_speed * 0.3), self.turn_speed
+
+        # Curva suave - ajusta proporcionalmente
+        slow = int(base_speed * (1 - abs(normalized_deviation) * 0.8))
+        if deviation > 0:
+            return base_speed, slow
+        return slow, base_speed
+
+
+def evaluate_pid(errors, timestamps, kp, ki=0.0, kd=0.0, derivative_tau=0.05,
+                 output_limit=70.0):
+    """
+    Avaliação offline vetorizada sobre execuções gravadas
+    errors: array (T,) ou (T, N) de erros normalizados
+    timestamps: array (T,) em segundos
+    Os ganhos podem ser arrays (N,) para comparar várias sintonias de uma vez
+    Retorna: array (T, ...) de saídas, com o formato combinado de erros e ganhos
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    pid = PIDController(kp, ki, kd, derivative_tau=derivative_tau, output_limit=output_limit)
+
+    step_shape = np.broadcast(errors[0], np.asarray(kp), np.asarray(ki), np.asarray(kd)).shape
+    outputs = np.empty((len(timestamps),) + step_shape, dtype=np.float64)
+    for i, timestamp in enumerate(timestamps):
+        outputs[i] = pid.update(errors[i], timestamp)
+    return outputs
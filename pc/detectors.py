@@ -0,0 +1,130 @@
+"""
+Detectores rápidos de linha
+Trabalham sobre um único canal e encontram a linha pelo histograma de colunas
+da máscara, sem conversão HSV, morfologia ou contornos
+"""
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+def dark_mask(roi, threshold, channel='gray', context=None):
+    """
+    Máscara (0/255) dos pixels escuros da ROI BGR (ou já em tons de cinza)
+    channel: 'gray' (luminância) ou 'v' (máximo dos canais, o V do HSV)
+    context: ProcessingContext opcional para reutilizar os buffers
+    """
+    shape = roi.shape[:2]
+    single = context.buffer('gray', shape) if context else None
+    mask = context.buffer('mask', shape) if context else None
+
+    if roi.ndim == 2:
+        # Frame decodificado só com a luminância (leitor MJPEG)
+        single = roi
+    elif channel == 'v':
+        planes = [context.buffer(name, shape) for name in ('b', 'g', 'r')] if context else None
+        b, g, r = cv2.split(roi, planes)
+        single = cv2.max(b, g, dst=single)
+        single = cv2.max(single, r, dst=single)
+    else:
+        single = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=single)
+
+    # Pixels com valor <= threshold viram 255
+    _, mask = cv2.threshold(single, threshold, 255, cv2.THRESH_BINARY_INV, dst=mask)
+    return mask
+
+
+def find_line_columns(mask, min_area=100, min_column_fraction=0.1, context=None):
+    """
+    Localiza a linha pelo histograma de colunas da máscara
+    Colunas com pelo menos min_column_fraction da altura formam trechos
+    contíguos; o trecho com mais pixels é a linha
+    Retorna: (cx, pixels, coluna inicial, coluna final) ou None
+    """
+    # Soma de cada coluna (máscara 0/255 -> pixels ocupados por coluna)
+    sums = context.buffer('column_sums', (1, mask.shape[1]), np.int32) if context else None
+    sums = cv2.reduce(mask, 0, cv2.REDUCE_SUM, dst=sums, dtype=cv2.CV_32S)
+    histogram = sums.ravel() // 255
+
+    # Trechos contíguos de colunas ocupadas
+    occupied = histogram >= max(1, int(mask.shape[0] * min_column_fraction))
+    if not occupied.any():
+        return None
+
+    edges = np.diff(occupied.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Pixels de cada trecho via soma acumulada
+    cumulative = np.concatenate(([0], np.cumsum(histogram)))
+    masses = cumulative[ends] - cumulative[starts]
+    best = int(np.argmax(masses))
+    if masses[best] <= min_area:
+        return None
+
+    start, end = int(starts[best]), int(ends[best])
+    weights = histogram[start:end]
+    cx = start + float(np.dot(np.arange(end - start), weights)) / masses[best]
+    return int(cx), int(masses[best]), start, end
+
+
+# Estimativa da linha por faixas: pontos (x, y) na ROI da base para o topo,
+# largura média em cada faixa, faixas válidas, heading (rad, positivo = linha
+# indo para a direita à frente) e curvatura normalizada pela largura da ROI
+LineEstimate = namedtuple('LineEstimate', 'points widths valid heading curvature')
+
+
+def detect_bands(mask, bands=6, min_band_fraction=0.02, context=None):
+    """
+    Divide a máscara em faixas horizontais e calcula centroide e largura de
+    todas as faixas de uma vez (soma sobre a máscara remodelada para (K, h, L))
+    Retorna: LineEstimate ou None se menos de duas faixas têm linha
+    """
+    height, width = mask.shape
+    band_height = height // bands
+    if band_height == 0:
+        return None
+
+    # Descarta as linhas de cima que não completam uma faixa
+    usable = mask[height - band_height * bands:]
+    stacked = usable.reshape(bands, band_height, width)
+    out = context.buffer('band_columns', (bands, width), np.int32) if context else None
+    columns = np.add.reduce(stacked, axis=1, dtype=np.int32, out=out)
+
+    if context:
+        xs = context.cached(('column_x', width), lambda: np.arange(width, dtype=np.float64))
+    else:
+        xs = np.arange(width, dtype=np.float64)
+    mass = columns.sum(axis=1)
+    valid = mass >= 255 * band_height * width * min_band_fraction
+    if np.count_nonzero(valid) < 2:
+        return None
+
+    safe_mass = np.where(valid, mass, 1)
+    centers = columns @ xs / safe_mass
+    widths = mass / (255.0 * band_height)
+
+    # Faixa 0 = base da ROI (mais próxima do carrinho)
+    centers = centers[::-1]
+    widths = widths[::-1]
+    valid = valid[::-1]
+    offset = height - band_height * bands
+    ys = offset + (bands - 1 - np.arange(bands)) * band_height + band_height / 2
+    points = np.stack([centers, ys], axis=1)
+
+    # Ajuste x(y) pelos centros válidos: reta com 2 faixas, parábola com 3+
+    vy = ys[valid]
+    vx = centers[valid]
+    degree = 2 if len(vy) >= 3 else 1
+    coeffs = np.polyfit(vy, vx, degree)
+    # Heading pela corda do ajuste entre a faixa válida mais baixa e a mais alta
+    # (y cresce para baixo: x aumentando à frente = linha indo para a direita)
+    bottom, top = np.polyval(coeffs, [vy[0], vy[-1]])
+    slope = (top - bottom) / (vy[0] - vy[-1])
+    heading = float(np.arctan(slope))
+    second = 2 * coeffs[0] if degree == 2 else 0.0
+    curvature = float(second / (1 + slope ** 2) ** 1.5 * width)
+    return LineEstimate(points, widths, valid, heading, curvature)
+
@@ -0,0 +1,128 @@
+"""
+Visualização de debug fora do caminho de controle
+Uma thread própria desenha as informações e chama imshow/waitKey a partir de
+cópias (snapshots) enviadas numa taxa limitada; o loop de controle nunca
+espera pela interface. As teclas voltam por uma fila
+Obs.: no macOS o highgui só funciona na thread principal
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def render_status(frame, status):
+    """Desenha estado, contadores e velocidade no frame (in-place)"""
+    paused = status.get("paused", False)
+    status_text = "PAUSADO" if paused else "ATIVO"
+    status_color = (0, 165, 255) if paused else (0, 255, 0)
+
+    cv2.putText(frame, status_text, (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
+
+    cv2.putText(frame, f"Frames: {status.get('frames', 0)}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    cv2.putText(frame, f"Deteccoes: {status.get('detections', 0)}", (10, 85),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    cv2.putText(frame, f"Velocidade: {status.get('speed', 0)}", (10, 110),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    if status.get("line"):
+        cv2.putText(frame, "Linha: DETECTADA", (10, 135),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    else:
+        cv2.putText(frame, "Linha: NAO DETECTADA", (10, 135),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+    if status.get("fps"):
+        cv2.putText(frame, f"FPS: {status['fps']}", (10, 160),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+
+class DebugDisplay:
+    """Janela de debug renderizada em thread própria, no máximo max_fps vezes por segundo"""
+
+    def __init__(self, window='Line Follower', max_fps=15.0):
+        self.window = window
+        self.interval = 1.0 / max_fps
+        self.running = False
+
+        # Snapshot pendente (buffer duplo: um é preenchido enquanto o outro é desenhado)
+        self._lock = threading.Lock()
+        self._pending = None
+        self._spare = None
+        self._status = None
+        self._last_submit = 0.0
+        self._thread = None
+        self._keys = queue.Queue()
+
+        # Estatísticas
+        self.submitted = 0
+        self.rendered = 0
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='DebugDisplay', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def due(self, now=None):
+        """Já passou o intervalo mínimo desde o último snapshot"""
+        if now is None:
+            now = time.monotonic()
+        return now - self._last_submit >= self.interval
+
+    def submit(self, frame, status):
+        """Copia o frame para o snapshot pendente (substitui um não desenhado)"""
+        self._last_submit = time.monotonic()
+        with self._lock:
+            snapshot = self._spare
+            if snapshot is None or snapshot.shape != frame.shape:
+                snapshot = np.empty_like(frame)
+            np.copyto(snapshot, frame)
+            self._spare = self._pending
+            self._pending = snapshot
+            self._status = dict(status)
+            self.submitted += 1
+
+    def keys(self):
+        """Teclas pressionadas desde a última chamada"""
+        pressed = []
+        while True:
+            try:
+                pressed.append(self._keys.get_nowait())
+            except queue.Empty:
+                return pressed
+
+    def _run(self):
+        while self.running:
+            with self._lock:
+                snapshot, status = self._pending, self._status
+                self._pending = None
+
+            if snapshot is not None:
+                render_status(snapshot, status)
+                cv2.imshow(self.window, snapshot)
+                self.rendered += 1
+                # Devolve o buffer para reuso
+                with self._lock:
+                    if self._spare is None:
+                        self._spare = snapshot
+
+            # waitKey também mantém a janela responsiva sem frames novos
+            key = cv2.waitKey(max(1, int(self.interval * 1000))) & 0xFF
+            if key != 0xFF:
+                self._keys.put(key)
+
+        if self.rendered:
+            cv2.destroyWindow(self.window)
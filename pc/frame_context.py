@@ -0,0 +1,80 @@
+"""
+Contexto de processamento com buffers pré-alocados
+Os buffers são dimensionados pela resolução da câmera e reutilizados a cada
+frame (funções do OpenCV com dst=), então um frame em regime não cria arrays
+do tamanho da imagem. Também mede o tempo de cada etapa
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class ProcessingContext:
+    """Buffers reutilizáveis, kernels em cache e estatísticas por etapa"""
+
+    def __init__(self):
+        self._buffers = {}
+        self._cache = {}
+        self._lap_start = 0.0
+
+        # Estatísticas por etapa
+        self.allocations = {}
+        self.timings = {}
+        self.calls = {}
+
+    def buffer(self, name, shape, dtype=np.uint8):
+        """
+        Retorna o buffer da etapa para o formato pedido
+        Guarda um buffer por formato, então alternar entre a janela de
+        rastreamento e a ROI inteira não realoca
+        """
+        key = (name, shape, np.dtype(dtype))
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype)
+            self._buffers[key] = buf
+            self.allocations[name] = self.allocations.get(name, 0) + 1
+        return buf
+
+    def copy(self, name, src):
+        """Copia src para o buffer da etapa (substitui src.copy())"""
+        dst = self.buffer(name, src.shape, src.dtype)
+        np.copyto(dst, src)
+        return dst
+
+    def cached(self, key, factory):
+        """Valor constante criado uma única vez (kernels, coordenadas)"""
+        value = self._cache.get(key)
+        if value is None:
+            value = factory()
+            self._cache[key] = value
+        return value
+
+    def kernel(self, size, shape=cv2.MORPH_RECT):
+        """Elemento estruturante criado uma única vez"""
+        return self.cached(('kernel', size, shape),
+                           lambda: cv2.getStructuringElement(shape, (size, size)))
+
+    def start(self):
+        """Marca o início da medição de etapas do frame"""
+        self._lap_start = time.perf_counter()
+
+    def lap(self, stage):
+        """Acumula o tempo desde a última marcação na etapa informada"""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._lap_start
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self._lap_start = now
+
+    def reset_stats(self):
+        self.timings.clear()
+        self.calls.clear()
+
+    def report(self):
+        """Retorna {etapa: {"avg_ms": ..., "calls": ...}} e {buffer: alocações}"""
+        stages = {stage: {"avg_ms": self.timings[stage] / self.calls[stage] * 1000,
+                          "calls": self.calls[stage]}
+                  for stage in self.timings}
+        return stages, dict(self.allocations)
@@ -0,0 +1,226 @@
+"""
+Latência de ponta a ponta: da captura do frame ao PWM aplicado no ESP32
+Cada frame leva os horários das etapas no PC (FrameStamps); o ESP32 ecoa no
+ack quando recebeu o comando e quando aplicou o PWM. ClockSync estima o
+offset entre os relógios (estilo NTP, pela amostra de menor RTT) e
+LatencyMonitor mantém janelas móveis por etapa (p50/p95/p99), exportadas
+periodicamente em CSV ou JSON Lines:
+
+    python line_follower.py 192.168.1.100 --latency-log latencia.csv
+"""
+
+import csv
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from protocol import TIMING_PERIOD_US
+
+# Etapas medidas (nome, descrição); rede_ida, rede_volta e total dependem do offset
+STAGES = (
+    ('decodificacao', 'captura -> frame decodificado'),
+    ('espera', 'frame pronto -> início do processamento'),
+    ('deteccao', 'process_frame'),
+    ('controle', 'detecção -> comando agendado'),
+    ('fila', 'comando agendado -> enviado'),
+    ('rede_ida', 'enviado -> recebido no ESP32'),
+    ('esp32', 'recebido -> PWM aplicado'),
+    ('rede_volta', 'PWM aplicado -> ack no PC'),
+    ('rtt', 'enviado -> ack'),
+    ('total', 'captura -> PWM aplicado'),
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameStamps:
+    """Horários (time.monotonic) de um frame ao longo do PC"""
+
+    __slots__ = ('capture', 'decoded', 'start', 'detected', 'submitted')
+
+    def __init__(self, capture, decoded, start):
+        self.capture = capture
+        self.decoded = decoded
+        self.start = start
+        self.detected = None
+        self.submitted = None
+
+
+class RollingWindow:
+    """Últimas size amostras de uma etapa (segundos) em um anel pré-alocado"""
+
+    def __init__(self, size=1024):
+        self.samples = np.zeros(size)
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def summary(self):
+        """Percentis e máximo da janela em ms (None sem amostras)"""
+        if not self.count:
+            return None
+        window = self.samples[:min(self.count, len(self.samples))] * 1000
+        p50, p95, p99 = np.percentile(window, PERCENTILES)
+        return {"count": self.count, "p50_ms": float(p50), "p95_ms": float(p95),
+                "p99_ms": float(p99), "max_ms": float(window.max())}
+
+
+def wrap_signed(value, period=TIMING_PERIOD_US):
+    """Diferença com wrap reduzida a [-period/2, period/2)"""
+    return (value + period // 2) % period - period // 2
+
+
+class ClockSync:
+    """
+    Offset entre o relógio do ESP32 (µs com wrap) e time.monotonic do PC
+    Usa a amostra de menor RTT entre as últimas window: nela a ida e a volta
+    são quase simétricas (erro de no máximo metade desse RTT)
+    """
+
+    def __init__(self, window=64):
+        self.samples = deque(maxlen=window)
+        self.offset_us = None  # relógio ESP32 = relógio PC (µs) + offset, com wrap
+        self.rtt = None        # RTT da amostra usada (segundos, sem o tempo no ESP32)
+
+    def update(self, sent, received_us, applied_us, acked):
+        """sent/acked: horários do PC (s); received_us/applied_us: horários ecoados"""
+        forward = (received_us - int(sent * 1e6)) % TIMING_PERIOD_US
+        backward = (applied_us - int(acked * 1e6)) % TIMING_PERIOD_US
+        offset = (forward + wrap_signed(backward - forward) // 2) % TIMING_PERIOD_US
+        esp_time = ((applied_us - received_us) % TIMING_PERIOD_US) / 1e6
+        self.samples.append((acked - sent - esp_time, offset))
+
+        self.rtt, self.offset_us = min(self.samples)
+
+    def to_pc(self, esp_us, reference):
+        """Horário do ESP32 convertido para o relógio do PC, perto de reference (s)"""
+        reference_esp = (int(reference * 1e6) + self.offset_us) % TIMING_PERIOD_US
+        return reference - wrap_signed(reference_esp - esp_us) / 1e6
+
+
+class LatencyMonitor:
+    """
+    Janelas por etapa e exportação periódica
+    log_path: .csv (uma linha por etapa a cada intervalo) ou .json/.jsonl
+    (um objeto por intervalo); None só mantém as estatísticas
+    """
+
+    def __init__(self, log_path=None, interval=1.0, window=1024):
+        self.windows = {name: RollingWindow(window) for name, _ in STAGES}
+        self.clock = ClockSync()
+        self.interval = interval
+        self.log_path = log_path
+        self._log = None
+        self._writer = None
+        self._last_export = time.monotonic()
+        self._start = self._last_export
+
+        if log_path:
+            self._log = open(log_path, 'w', newline='')
+            if not log_path.endswith(('.json', '.jsonl')):
+                self._writer = csv.writer(self._log)
+                self._writer.writerow(['t', 'stage', 'count', 'p50_ms', 'p95_ms', 'p99_ms',
+                                       'max_ms', 'clock_offset_ms', 'clock_rtt_ms'])
+
+    def frame(self, capture, decoded, start=None):
+        """Novo frame: horário de captura, de fim da decodificação e de início do processamento"""
+        return FrameStamps(capture, decoded, time.monotonic() if start is None else start)
+
+    def frame_done(self, stamps):
+        """Etapas do PC de um frame já processado (e do comando, se houve)"""
+        windows = self.windows
+        windows['decodificacao'].add(stamps.decoded - stamps.capture)
+        windows['espera'].add(stamps.start - stamps.decoded)
+        if stamps.detected is not None:
+            windows['deteccao'].add(stamps.detected - stamps.start)
+            if stamps.submitted is not None:
+                windows['controle'].add(stamps.submitted - stamps.detected)
+
+    def on_ack(self, stamps, sent, acked, timing):
+        """
+        Ack com os horários do ESP32 (timing = recepção, PWM aplicado)
+        stamps é None para comandos sem frame (configuração, parada final)
+        """
+        received_us, applied_us = timing
+        clock = self.clock
+        clock.update(sent, received_us, applied_us, acked)
+
+        windows = self.windows
+        received = clock.to_pc(received_us, sent)
+        applied = clock.to_pc(applied_us, acked)
+        windows['rtt'].add(acked - sent)
+        windows['rede_ida'].add(received - sent)
+        windows['esp32'].add(((applied_us - received_us) % TIMING_PERIOD_US) / 1e6)
+        windows['rede_volta'].add(acked - applied)
+
+        if stamps is not None:
+            if stamps.submitted is not None:
+                windows['fila'].add(sent - stamps.submitted)
+            windows['total'].add(applied - stamps.capture)
+
+    def summary(self):
+        """{etapa: percentis} das etapas com amostras, na ordem de STAGES"""
+        result = {}
+        for name, _ in STAGES:
+            stats = self.windows[name].summary()
+            if stats:
+                result[name] = stats
+        return result
+
+    def clock_info(self):
+        """(offset em ms, RTT da amostra usada em ms) ou (None, None)"""
+        if self.clock.offset_us is None:
+            return None, None
+        return (wrap_signed(self.clock.offset_us) / 1000, self.clock.rtt * 1000)
+
+    def brief(self):
+        """Resumo de uma linha para o console"""
+        summary = self.summary()
+        stage = 'total' if 'total' in summary else 'deteccao'
+        if stage not in summary:
+            return ""
+        stats = summary[stage]
+        return f"Latência {stage}: p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms"
+
+    def tick(self, now=None):
+        """Exporta as estatísticas se o intervalo passou (chamado a cada frame)"""
+        if self._log is None:
+            return
+        if now is None:
+            now = time.monotonic()
+        if now - self._last_export < self.interval:
+            return
+        self._last_export = now
+        self.export(now)
+
+    def export(self, now=None):
+        if self._log is None:
+            return
+        if now is None:
+            now = time.monotonic()
+
+        t = round(now - self._start, 3)
+        offset, rtt = self.clock_info()
+        summary = self.summary()
+        if self._writer:
+            for name, stats in summary.items():
+                self._writer.writerow([t, name, stats["count"],
+                                       *(round(stats[key], 3) for key in
+                                         ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')),
+                                       '' if offset is None else round(offset, 3),
+                                       '' if rtt is None else round(rtt, 3)])
+        else:
+            self._log.write(json.dumps({"t": t, "clock_offset_ms": offset,
+                                        "clock_rtt_ms": rtt, "stages": summary}) + "\n")
+        # Fluxo ao vivo: cada intervalo já fica visível no arquivo
+        self._log.flush()
+
+    def close(self):
+        if self._log:
+            self.export()
+            self._log.close()
+            self._log = None
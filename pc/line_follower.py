@@ -9,16 +9,72 @@ import asyncio
 import websockets
 import json
 import argparse
+import os
+import time
 from urllib.parse import urlparse
 
+from calibrate_hsv import PROFILE_PATH, load_profile
+from camera import DEFAULT_FOURCC, FrameGrabber, describe_mode, open_source
+from command_channel import CommandChannel
+from udp_transport import UdpTransport
+from controller import SteeringController, BangBangController
+from detectors import dark_mask, find_line_columns, detect_bands
+from frame_context import ProcessingContext
+from tracking import LineTracker
+from pipeline import VisionPipeline
+from display import DebugDisplay
+from recording import RunRecorder, is_recording
+from config import COMMAND_INTERVAL
+from latency import LatencyMonitor, STAGES
+from protocol import HOLD_MS
+from scheduler import CommandScheduler
+
 class LineFollower:
     """Classe principal para detecção e seguimento de linha"""
     
-    def __init__(self, esp32_ip, camera_url=None, debug=False):
+    def __init__(self, esp32_ip, camera_url=None, debug=False, protocol='json',
+                 transport='websocket', udp_port=8766, steering='pc', controller='bangbang',
+                 detector='hsv', tracking=False, pipeline=False, headless=False,
+                 display_fps=15.0, mjpeg=False, decode_scale=1, grayscale=False,
+                 record=None, replay_realtime=True, latency_log=None, resolution=None,
+                 camera_fps=None, fourcc=DEFAULT_FOURCC, profile=None):
         self.esp32_ip = esp32_ip
         self.camera_url = camera_url
-        self.debug = debug
+        # Leitor MJPEG nativo (--mjpeg): decodificação reduzida e/ou só luminância
+        # Câmera ao vivo: modo pedido (resolução, fps, fourcc) e buffer de 1 frame
+        width, height = resolution or (None, None)
+        self.source_options = {"mjpeg": mjpeg, "decode_scale": decode_scale,
+                               "grayscale": grayscale, "replay_realtime": replay_realtime,
+                               "width": width, "height": height, "fps": camera_fps,
+                               "fourcc": fourcc}
+        self.camera_mode = None  # Modo realmente obtido da câmera (negociado)
+        # Gravação da execução (--record) e reprodução de uma gravação (--replay)
+        self.record_path = record
+        self.recorder = None
+        # Latência por etapa, da captura ao PWM (--latency-log exporta ao vivo)
+        self.latency_log = latency_log
+        self.latency = LatencyMonitor()
+        # headless: nenhum desenho nem janela (máquinas de campo)
+        self.headless = headless
+        self.debug = debug and not headless
+        self.draw = self.debug  # Desenho do debug neste frame (decimado no loop)
+        self.display_fps = display_fps
+        self.display = None
+        self.paused = False
+        self.detector = detector
+        self.protocol = protocol
+        self.transport = transport
+        self.steering = steering
+        self.udp_port = udp_port
+        self.context = ProcessingContext()
         self.websocket = None
+        self.udp = None
+        self.channel = None
+        self.config_channel = None  # Configuração pelo WebSocket quando os setpoints vão por UDP
+        self.telemetry = None
+        self.grabber = None
+        self.pipeline_mode = pipeline
+        self.pipeline = None
         self.running = False
         
         # Parâmetros de processamento de imagem
@@ -29,14 +85,52 @@ class LineFollower:
         self.lower_black = np.array([0, 0, 0])
         self.upper_black = np.array([180, 255, 50])
         
+        # Detector rápido (--detector fast): limiar em um único canal
+        self.fast_threshold = 50   # Pixels com valor até este são "linha"
+        self.fast_channel = 'gray'  # 'gray' ou 'v'
+        self.min_contour_area = 100
+        
+        # Perfil da calibração (calibrate_hsv.py) substitui os limiares acima
+        self.profile_path = profile
+        if profile:
+            self.apply_profile(load_profile(profile))
+        
+        # Detector por faixas (--detector bands): centroides de K faixas da ROI
+        self.bands = 6
+        self.last_estimate = None  # LineEstimate do último frame (heading, curvatura)
+        
+        # Rastreamento (--tracking): detecção só numa janela em torno da previsão
+        self.tracker = LineTracker() if tracking else None
+        
         # Parâmetros de controle
         self.base_speed = 45
         self.turn_speed = 55
-        self.sharp_turn_threshold = 150  # pixels de desvio para curva brusca
+        # Desvio para curva brusca em fração da meia largura da ROI (150 px em 640 px)
+        self.sharp_turn_threshold = 150 / 320
+        
+        # Ganhos do controlador de direção (no PC ou no ESP32 com --steering esp32)
+        # Correção em pontos de velocidade por unidade de erro normalizado
+        self.gains = {"kp": 60.0, "ki": 10.0, "kd": 8.0, "kff": 20.0,
+                      "max_correction": 70}
+        self.controller_mode = controller
+        self.controller = self.create_controller()
+        
+        # Setpoint igual ao último confirmado pelo ESP32 não é reenviado, exceto
+        # como keepalive neste intervalo: metade do HOLD_MS da rampa deixa margem
+        # para o próximo frame e a latência do enlace antes de o alvo decair
+        self.setpoint_keepalive = HOLD_MS / 2 / 1000
+        
+        # Taxa de envio adaptativa: dinâmica da linha e capacidade do enlace,
+        # em torno do intervalo nominal entre comandos (segundos, config.py)
+        self.command_interval = COMMAND_INTERVAL
+        self.scheduler = CommandScheduler(base_interval=self.command_interval,
+                                          ceiling=self.setpoint_keepalive)
         
         # Estatísticas
         self.frame_count = 0
         self.detection_count = 0
+        self.suppressed_commands = 0
+        self.line_seen = None  # Estado da linha no último comando (mudança = envio urgente)
         
     async def connect_websocket(self):
         """Conecta ao servidor WebSocket do ESP32"""
@@ -44,66 +138,170 @@ class LineFollower:
         try:
             self.websocket = await websockets.connect(uri)
             print(f"✓ Conectado ao ESP32 em {uri}")
+            
+            # Envio e leitura de acks rodam em tarefas separadas
+            if self.transport == 'udp':
+                # Comandos via UDP; o WebSocket fica para configuração e telemetria
+                self.udp = UdpTransport()
+                await self.udp.connect(self.esp32_ip, self.udp_port)
+                print(f"✓ Canal de controle UDP em {self.esp32_ip}:{self.udp_port}")
+                self.channel = CommandChannel(self.udp, encoding='datagram',
+                                              latency=self.latency)
+                self.config_channel = CommandChannel(self.websocket, encoding='json',
+                                                     on_message=self._on_telemetry)
+                self.config_channel.start()
+            else:
+                self.channel = CommandChannel(self.websocket, encoding=self.protocol,
+                                              latency=self.latency, on_message=self._on_telemetry)
+            self.channel.start()
             return True
         except Exception as e:
             print(f"✗ Erro ao conectar ao ESP32: {e}")
             return False
     
-    async def send_command(self, action, speed=None, left=None, right=None):
-        """Envia comando para o carrinho via WebSocket"""
-        if not self.websocket:
+    def _on_telemetry(self, message):
+        """Mensagens do ESP32 que não são acks: guarda a última telemetria"""
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("type") == "telemetry":
+            self.telemetry = data
+    
+    def record_command(self, command):
+        """Registra o comando na gravação, se houver"""
+        if self.recorder:
+            self.recorder.write_command(command)
+    
+    def submit_setpoint(self, command, stamps=None, force=False):
+        """
+        Agenda um setpoint, exceto se o ESP32 já confirmou um igual há menos
+        de setpoint_keepalive (force: envia mesmo assim, ex.: parada final)
+        Retorna False se o comando não foi agendado (suprimido ou sem conexão)
+        """
+        if not force and self.channel.is_confirmed(command, self.setpoint_keepalive):
+            self.suppressed_commands += 1
             return False
         
-        try:
-            command = {"action": action}
-            
-            if speed is not None:
-                command["speed"] = speed
-            
-            if left is not None and right is not None:
-                command["action"] = "custom"
-                command["left"] = left
-                command["right"] = right
-            
-            await self.websocket.send(json.dumps(command))
-            
-            # Aguarda confirmação
-            response = await asyncio.wait_for(self.websocket.recv(), timeout=0.5)
-            return True
+        self.record_command(command)
+        return self.channel.submit(command, stamps)
+    
+    async def send_command(self, action, speed=None, left=None, right=None, stamps=None,
+                           force=False):
+        """
+        Agenda comando para o carrinho sem esperar pela rede
+        O comando mais recente substitui um pendente que ainda não foi enviado
+        stamps: FrameStamps do frame que originou o comando (latência)
+        """
+        if not self.channel:
+            return False
+        
+        command = {"action": action}
         
-        except asyncio.TimeoutError:
-            print("⚠ Timeout ao aguardar resposta do ESP32")
+        if speed is not None:
+            command["speed"] = speed
+        
+        if left is not None and right is not None:
+            command["action"] = "custom"
+            command["left"] = left
+            command["right"] = right
+        
+        return self.submit_setpoint(command, stamps, force)
+    
+    async def send_line_error(self, error, heading=0.0, confidence=1.0, stamps=None):
+        """
+        Envia só a medição da linha para o controlador do ESP32
+        error: desvio normalizado (-1 a 1, positivo = linha à direita)
+        """
+        if not self.channel:
             return False
-        except Exception as e:
-            print(f"✗ Erro ao enviar comando: {e}")
+        
+        command = {"action": "line", "error": error, "heading": heading,
+                   "confidence": confidence}
+        return self.submit_setpoint(command, stamps)
+    
+    async def send_config(self, command):
+        """
+        Agenda configuração pelo WebSocket (nunca substituída por setpoints)
+        Com --transport udp vai pelo canal de configuração: o UDP só carrega setpoints
+        """
+        self.record_command(command)
+        channel = self.config_channel or self.channel
+        if not channel:
             return False
+        return channel.submit_config(command)
     
-    def process_frame(self, frame):
+    async def send_gains(self):
+        """Envia os ganhos e a velocidade base ao controlador do ESP32"""
+        gains = dict(self.gains, base_speed=self.base_speed)
+        return await self.send_config(dict(gains, action="gains"))
+    
+    def process_frame(self, frame, timestamp=None):
         """
         Processa um frame para detectar a linha
+        timestamp: horário de captura (previsão do rastreamento)
         Retorna: (frame processado, centro da linha, ângulo de desvio)
         """
+        width = frame.shape[1]
+        if self.detector == 'fast':
+            detect = self.process_frame_fast
+        elif self.detector == 'bands':
+            detect = self.process_frame_bands
+        else:
+            detect = self.process_frame_hsv
+        
+        if self.tracker is None:
+            return detect(frame)
+        
+        # Janela de busca em torno da posição prevista (largura toda se perdida)
+        if timestamp is None:
+            timestamp = time.monotonic()
+        x0, x1 = self.tracker.window(width, timestamp)
+        result = detect(frame, x0, x1)
+        
+        line_center = result[1]
+        if line_center:
+            self.tracker.update(line_center[0], width)
+        else:
+            self.tracker.miss()
+        return result
+    
+    def process_frame_hsv(self, frame, x0=0, x1=None):
+        """
+        Detecção original: HSV, morfologia e maior contorno
+        x0, x1: colunas da janela de busca (padrão: largura toda)
+        """
+        ctx = self.context
+        ctx.start()
         height, width = frame.shape[:2]
+        if x1 is None:
+            x1 = width
         
         # Define região de interesse (ROI) - parte inferior da imagem
         roi_y = int(height * (1 - self.roi_height))
-        roi = frame[roi_y:height, 0:width]
+        roi = frame[roi_y:height, x0:x1]
+        roi_shape = roi.shape[:2]
         
-        # Converte para HSV
-        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        # Converte para HSV (buffers reutilizados entre frames)
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV, dst=ctx.buffer('hsv', roi.shape))
+        ctx.lap('hsv')
         
         # Aplica blur para reduzir ruído
-        blurred = cv2.GaussianBlur(hsv, self.blur_kernel, 0)
+        blurred = cv2.GaussianBlur(hsv, self.blur_kernel, 0, dst=ctx.buffer('blur', roi.shape))
+        ctx.lap('blur')
         
         # Cria máscara para detectar linha preta
-        mask = cv2.inRange(blurred, self.lower_black, self.upper_black)
+        mask = cv2.inRange(blurred, self.lower_black, self.upper_black,
+                           dst=ctx.buffer('mask', roi_shape))
+        ctx.lap('threshold')
         
         # Operações morfológicas para limpar a máscara
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.erode(mask, kernel, iterations=1)
-        mask = cv2.dilate(mask, kernel, iterations=2)
+        kernel = ctx.kernel(5)
+        eroded = cv2.erode(mask, kernel, dst=ctx.buffer('eroded', roi_shape), iterations=1)
+        mask = cv2.dilate(eroded, kernel, dst=mask, iterations=2)
+        ctx.lap('morphology')
         
-        # Encontra contornos
+        # Encontra contornos (o OpenCV aloca os pontos de cada contorno)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         line_center = None
@@ -113,7 +311,7 @@ class LineFollower:
             # Pega o maior contorno (assume que é a linha)
             largest_contour = max(contours, key=cv2.contourArea)
             
-            if cv2.contourArea(largest_contour) > 100:  # Filtra contornos muito pequenos
+            if cv2.contourArea(largest_contour) > self.min_contour_area:  # Filtra contornos muito pequenos
                 # Calcula o centro do contorno
                 M = cv2.moments(largest_contour)
                 if M["m00"] != 0:
@@ -121,85 +319,284 @@ class LineFollower:
                     cy = int(M["m01"] / M["m00"])
                     
                     # Ajusta coordenadas para o frame completo
-                    line_center = (cx, cy + roi_y)
+                    line_center = (cx + x0, cy + roi_y)
                     
                     # Calcula desvio do centro
-                    frame_center = width // 2
-                    deviation = cx - (width // 2)
+                    deviation = cx + x0 - (width // 2)
                     
                     # Desenha informações no frame (se debug)
-                    if self.debug:
+                    if self.draw:
                         # Desenha contorno
                         cv2.drawContours(roi, [largest_contour], -1, (0, 255, 0), 2)
-                        
-                        # Desenha centro da linha
-                        cv2.circle(roi, (cx, cy), 5, (0, 0, 255), -1)
-                        
-                        # Desenha linha central do frame
-                        cv2.line(roi, (width // 2, 0), (width // 2, roi.shape[0]), (255, 0, 0), 2)
-                        
-                        # Adiciona texto com informações
-                        cv2.putText(roi, f"Desvio: {deviation}px", (10, 30),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                        self.draw_roi_info(roi, cx, cy, deviation, width // 2 - x0)
+        ctx.lap('contours')
         
         # Monta frame de debug
-        if self.debug:
-            # Cria visualização com frame original, ROI e máscara
-            debug_frame = frame.copy()
-            
-            # Desenha retângulo da ROI
-            cv2.rectangle(debug_frame, (0, roi_y), (width, height), (0, 255, 0), 2)
-            
-            # Desenha centro da linha no frame completo
-            if line_center:
-                cv2.circle(debug_frame, line_center, 8, (0, 0, 255), -1)
-                cv2.line(debug_frame, (width // 2, 0), (width // 2, height), (255, 0, 0), 2)
-            
-            # Converte máscara para BGR para concatenar
-            mask_bgr = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+        if self.draw:
+            debug_frame = self.compose_debug_frame(frame, roi_y, mask, line_center, x0)
+            ctx.lap('debug')
+            return debug_frame, line_center, deviation
+        
+        return frame, line_center, deviation
+    
+    def process_frame_fast(self, frame, x0=0, x1=None):
+        """
+        Detecção rápida para linha escura em fundo claro
+        Limiar em um único canal e histograma de colunas da máscara
+        Retorna o mesmo (frame processado, centro da linha, desvio) de process_frame
+        """
+        ctx = self.context
+        ctx.start()
+        height, width = frame.shape[:2]
+        if x1 is None:
+            x1 = width
+        roi_y = int(height * (1 - self.roi_height))
+        roi = frame[roi_y:height, x0:x1]
+        
+        mask = dark_mask(roi, self.fast_threshold, self.fast_channel, ctx)
+        ctx.lap('threshold')
+        found = find_line_columns(mask, self.min_contour_area, context=ctx)
+        ctx.lap('columns')
+        
+        line_center = None
+        deviation = 0
+        
+        if found:
+            cx, pixels, start, end = found
+            cy = roi.shape[0] // 2
+            line_center = (cx + x0, cy + roi_y)
+            deviation = cx + x0 - (width // 2)
             
-            # Redimensiona para visualização lado a lado
-            combined = np.hstack([debug_frame, cv2.resize(mask_bgr, (width, height))])
+            if self.draw:
+                # Faixa de colunas ocupada pela linha
+                cv2.rectangle(roi, (start, 0), (end - 1, roi.shape[0] - 1), (0, 255, 0), 2)
+                self.draw_roi_info(roi, cx, cy, deviation, width // 2 - x0)
+        
+        if self.draw:
+            debug_frame = self.compose_debug_frame(frame, roi_y, mask, line_center, x0)
+            ctx.lap('debug')
+            return debug_frame, line_center, deviation
+        
+        return frame, line_center, deviation
+    
+    def process_frame_bands(self, frame, x0=0, x1=None):
+        """
+        Detecção com antecipação: divide a ROI em faixas horizontais e ajusta
+        uma curva pelos centroides (heading e curvatura em self.last_estimate)
+        O desvio vem da faixa válida mais próxima do carrinho
+        Retorna o mesmo (frame processado, centro da linha, desvio) de process_frame
+        """
+        ctx = self.context
+        ctx.start()
+        height, width = frame.shape[:2]
+        if x1 is None:
+            x1 = width
+        roi_y = int(height * (1 - self.roi_height))
+        roi = frame[roi_y:height, x0:x1]
+        
+        mask = dark_mask(roi, self.fast_threshold, self.fast_channel, ctx)
+        ctx.lap('threshold')
+        estimate = detect_bands(mask, self.bands, context=ctx)
+        ctx.lap('bands')
+        self.last_estimate = estimate
+        
+        line_center = None
+        deviation = 0
+        
+        if estimate:
+            points = estimate.points[estimate.valid]
+            cx, cy = int(points[0][0]), int(points[0][1])
+            line_center = (cx + x0, cy + roi_y)
+            deviation = cx + x0 - (width // 2)
             
-            return combined, line_center, deviation
+            if self.draw:
+                # Polilinha dos centroides das faixas
+                cv2.polylines(roi, [points.astype(np.int32)], False, (0, 255, 0), 2)
+                self.draw_roi_info(roi, cx, cy, deviation, width // 2 - x0)
+                cv2.putText(roi, f"Heading: {np.degrees(estimate.heading):.0f} graus", (10, 60),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        
+        if self.draw:
+            debug_frame = self.compose_debug_frame(frame, roi_y, mask, line_center, x0)
+            ctx.lap('debug')
+            return debug_frame, line_center, deviation
         
         return frame, line_center, deviation
     
-    def calculate_motor_speeds(self, deviation):
+    def apply_profile(self, profile):
+        """Limiares de um perfil de calibração (HSV e, na linha preta, do detector rápido)"""
+        self.lower_black = np.array(profile["lower_hsv"])
+        self.upper_black = np.array(profile["upper_hsv"])
+        if profile.get("fast_threshold") is not None:
+            self.fast_threshold = profile["fast_threshold"]
+            self.fast_channel = profile["fast_channel"]
+    
+    def vision_settings(self):
+        """Parâmetros de detecção repassados ao processo de visão (--pipeline)"""
+        return {"detector": self.detector, "tracking": self.tracker is not None,
+                "roi_height": self.roi_height, "blur_kernel": self.blur_kernel,
+                "lower_black": self.lower_black, "upper_black": self.upper_black,
+                "fast_threshold": self.fast_threshold, "fast_channel": self.fast_channel,
+                "min_contour_area": self.min_contour_area, "bands": self.bands}
+    
+    def line_heading(self):
+        """Heading normalizado (-1 a 1) da última estimativa por faixas, ou 0"""
+        if self.last_estimate is None:
+            return 0.0
+        return max(-1.0, min(1.0, self.last_estimate.heading / (np.pi / 2)))
+    
+    def draw_roi_info(self, roi, cx, cy, deviation, center_x=None):
+        """
+        Desenha centro da linha, linha central e desvio na ROI
+        center_x: coluna do centro do frame na ROI (difere com janela de busca)
+        """
+        if center_x is None:
+            center_x = roi.shape[1] // 2
+        
+        # Desenha centro da linha
+        cv2.circle(roi, (cx, cy), 5, (0, 0, 255), -1)
+        
+        # Desenha linha central do frame
+        cv2.line(roi, (center_x, 0), (center_x, roi.shape[0]), (255, 0, 0), 2)
+        
+        # Adiciona texto com informações
+        cv2.putText(roi, f"Desvio: {deviation}px", (10, 30),
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    
+    def compose_debug_frame(self, frame, roi_y, mask, line_center, x0=0):
+        """
+        Cria visualização com frame original, ROI e máscara lado a lado
+        x0: primeira coluna da janela de busca (a máscara cobre só a janela)
+        """
+        ctx = self.context
+        height, width = frame.shape[:2]
+        
+        # Quadro lado a lado reutilizado: frame à esquerda, máscara à direita
+        combined = ctx.buffer('debug', (height, width * 2, 3))
+        debug_frame = combined[:, :width]
+        if frame.ndim == 2:
+            # Frame em tons de cinza (leitor MJPEG com --grayscale)
+            cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=debug_frame)
+        else:
+            np.copyto(debug_frame, frame)
+        
+        # Desenha retângulo da ROI (ou da janela de busca)
+        x1 = x0 + mask.shape[1]
+        cv2.rectangle(debug_frame, (x0, roi_y), (x1, height), (0, 255, 0), 2)
+        
+        # Desenha centro da linha no frame completo
+        if line_center:
+            cv2.circle(debug_frame, line_center, 8, (0, 0, 255), -1)
+            cv2.line(debug_frame, (width // 2, 0), (width // 2, height), (255, 0, 0), 2)
+        
+        # Converte máscara para BGR para concatenar
+        mask_bgr = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR,
+                                dst=ctx.buffer('mask_bgr', mask.shape + (3,)))
+        
+        # Redimensiona direto na metade direita (só nas colunas da janela)
+        if x1 - x0 < width:
+            combined[:, width:] = 0
+        cv2.resize(mask_bgr, (x1 - x0, height), dst=combined[:, width + x0:width + x1])
+        return combined
+    
+    def create_controller(self):
+        """Cria o controlador de direção do PC ('p', 'pi', 'pid' ou 'bangbang')"""
+        if self.controller_mode == 'bangbang':
+            return BangBangController(self.turn_speed, self.sharp_turn_threshold)
+        return SteeringController.from_gains(self.gains, self.controller_mode)
+    
+    def calculate_motor_speeds(self, deviation, roi_width=640, timestamp=None, heading=0.0):
         """
         Calcula velocidades dos motores baseado no desvio da linha
+        roi_width: largura real da ROI (normaliza o desvio)
+        timestamp: horário de captura do frame (dt real do controlador)
+        heading: direção normalizada da linha à frente (detector por faixas)
         Retorna: (velocidade_esquerda, velocidade_direita)
         """
-        if deviation == 0:
-            # Linha no centro - segue em frente
-            return self.base_speed, self.base_speed
-        
-        # Normaliza o desvio (-1 a 1)
-        # Assume largura de frame de ~640px, ajuste se necessário
-        normalized_deviation = max(-1, min(1, deviation / 320))
-        
-        if abs(deviation) > self.sharp_turn_threshold:
-            # Curva brusca - reduz velocidade de um motor ou inverte
-            if deviation > 0:
-                # Linha à direita - vira para direita
-                left_speed = self.turn_speed
-                right_speed = -int(self.turn_speed * 0.3)
-            else:
-                # Linha à esquerda - vira para esquerda
-                left_speed = -int(self.turn_speed * 0.3)
-                right_speed = self.turn_speed
+        if timestamp is None:
+            timestamp = time.monotonic()
+        return self.controller.compute(deviation, roi_width, timestamp, self.base_speed,
+                                       heading)
+    
+    async def command_frame(self, line_center, deviation, roi_width, frame_time, heading=0.0,
+                            stamps=None):
+        """
+        Comando do frame: velocidades do controlador (ou o erro para o ESP32)
+        na taxa do agendador, ou parada se a linha sumiu
+        Só envios agendados de fato contam no agendador: um setpoint suprimido
+        deixa o próximo frame tentar de novo, e o keepalive sai logo que vence
+        """
+        if line_center:
+            self.detection_count += 1
+            
+            # O controlador do PC atualiza a cada frame (dt real da captura)
+            if self.steering != 'esp32':
+                left_speed, right_speed = self.calculate_motor_speeds(
+                    deviation, roi_width, frame_time, heading)
+            
+            # Taxa de envio adaptativa (ver scheduler.py)
+            self.scheduler.observe(deviation / (roi_width / 2), frame_time, heading)
+            urgent = self.line_seen is not True
+            if self.scheduler.due(urgent=urgent):
+                if self.steering == 'esp32':
+                    # O controlador roda no ESP32; envia só o erro normalizado
+                    sent = await self.send_line_error(deviation / (roi_width / 2), heading,
+                                                      stamps=stamps)
+                else:
+                    sent = await self.send_command("custom", left=left_speed, right=right_speed,
+                                                   stamps=stamps)
+                if sent:
+                    self.scheduler.mark_sent(urgent=urgent)
+                self.line_seen = True
         else:
-            # Curva suave - ajusta proporcionalmente
-            if deviation > 0:
-                # Linha à direita
-                left_speed = self.base_speed
-                right_speed = int(self.base_speed * (1 - abs(normalized_deviation) * 0.8))
+            # Linha não detectada - para (imediato na perda, depois na taxa do agendador)
+            self.controller.reset()
+            self.scheduler.reset()
+            urgent = self.line_seen is not False
+            if self.scheduler.due(urgent=urgent):
+                if await self.send_command("stop", stamps=stamps):
+                    self.scheduler.mark_sent(urgent=urgent)
+                self.line_seen = False
+    
+    def display_status(self, line_center):
+        """Informações desenhadas pela thread de visualização"""
+        status = {"paused": self.paused, "frames": self.frame_count,
+                  "detections": self.detection_count, "speed": self.base_speed,
+                  "line": line_center is not None}
+        if self.pipeline:
+            # FPS de cada etapa do pipeline
+            status["fps"] = "  ".join(f"{stage} {info['fps']:.0f}"
+                                      for stage, info in self.pipeline.stats.items())
+        return status
+    
+    async def handle_key(self, key):
+        """Trata uma tecla da janela; retorna False para encerrar"""
+        if key == 27 or key == ord('q'):  # ESC ou Q
+            print("\nEncerrando...")
+            self.running = False
+            return False
+        elif key == ord(' '):  # ESPAÇO
+            self.paused = not self.paused
+            if self.paused:
+                await self.send_command("stop")
+                print("⏸ Pausado")
             else:
-                # Linha à esquerda
-                left_speed = int(self.base_speed * (1 - abs(normalized_deviation) * 0.8))
-                right_speed = self.base_speed
-        
-        return left_speed, right_speed
+                print("▶ Retomado")
+        elif key == ord('r'):  # R
+            self.frame_count = 0
+            self.detection_count = 0
+            print("↻ Estatísticas resetadas")
+        elif key == ord('+') or key == ord('='):  # +
+            self.base_speed = min(100, self.base_speed + 5)
+            print(f"⬆ Velocidade: {self.base_speed}")
+            if self.steering == 'esp32':
+                await self.send_gains()
+        elif key == ord('-') or key == ord('_'):  # -
+            self.base_speed = max(20, self.base_speed - 5)
+            print(f"⬇ Velocidade: {self.base_speed}")
+            if self.steering == 'esp32':
+                await self.send_gains()
+        return True
     
     async def follow_line(self):
         """Loop principal de seguimento de linha"""
@@ -207,119 +604,175 @@ class LineFollower:
         if not await self.connect_websocket():
             return
         
-        # Abre conexão com câmera
-        if self.camera_url:
-            cap = cv2.VideoCapture(self.camera_url)
+        cap = None
+        if self.pipeline_mode:
+            # Captura e visão em processos próprios (anel em memória compartilhada)
+            self.pipeline = VisionPipeline(self.camera_url or 0, self.vision_settings(),
+                                           source_options=self.source_options)
+            if not self.pipeline.start():
+                return
+            self.camera_mode = self.pipeline.camera_mode
         else:
-            # Usa câmera padrão do PC
-            cap = cv2.VideoCapture(0)
-        
-        if not cap.isOpened():
-            print("✗ Erro ao abrir câmera")
-            return
+            # Abre conexão com câmera (sem URL usa a câmera padrão do PC)
+            cap = open_source(self.camera_url or 0, **self.source_options)
+            
+            if not cap.isOpened():
+                print("✗ Erro ao abrir câmera")
+                return
+            self.camera_mode = getattr(cap, 'mode', None)
+            
+            # Captura em thread dedicada (mantém só o frame mais recente)
+            # Reprodução rápida: um frame por vez, com o horário gravado
+            replay = is_recording(self.camera_url)
+            self.grabber = FrameGrabber(
+                cap, lockstep=replay and not self.source_options["replay_realtime"],
+                clock=cap.frame_time if replay else None)
+            self.grabber.start()
         
         print("✓ Câmera conectada")
-        print("\nControles:")
-        print("  ESC ou Q - Sair")
-        print("  ESPAÇO - Pausar/Retomar")
-        print("  R - Resetar estatísticas")
-        print("  + - Aumentar velocidade base")
-        print("  - - Diminuir velocidade base")
+        if self.camera_mode:
+            print(f"  Modo: {describe_mode(self.camera_mode)}")
+        
+        if self.record_path:
+            self.recorder = RunRecorder(self.record_path, {**self.vision_settings(),
+                                                           "camera_mode": self.camera_mode})
+            print(f"● Gravando em {self.record_path}")
+        
+        if self.latency_log:
+            self.latency = LatencyMonitor(self.latency_log)
+            if self.channel:
+                self.channel.latency = self.latency
+            print(f"● Latência exportada em {self.latency_log}")
+        
+        if self.headless:
+            print("\nModo headless: Ctrl+C para sair")
+        else:
+            # Janela desenhada em thread própria, fora do loop de controle
+            self.display = DebugDisplay(max_fps=self.display_fps)
+            self.display.start()
+            print("\nControles:")
+            print("  ESC ou Q - Sair")
+            print("  ESPAÇO - Pausar/Retomar")
+            print("  R - Resetar estatísticas")
+            print("  + - Aumentar velocidade base")
+            print("  - - Diminuir velocidade base")
+        
+        if self.steering == 'esp32':
+            await self.send_gains()
         
+        self.scheduler.channel = self.channel
         self.running = True
-        paused = False
-        last_command_time = 0
-        command_interval = 0.05  # Envia comandos a cada 50ms
+        self.paused = False
+        self.line_seen = None
+        last_seq = 0
+        last_status_time = time.monotonic()
+        status_interval = 5.0  # Resumo no console (headless)
         
         try:
             while self.running:
-                ret, frame = cap.read()
-                if not ret:
-                    print("✗ Erro ao capturar frame")
-                    break
-                
-                self.frame_count += 1
-                
-                # Processa frame
-                processed_frame, line_center, deviation = self.process_frame(frame)
-                
-                # Envia comando se não estiver pausado
-                if not paused and line_center:
-                    self.detection_count += 1
+                if self.pipeline:
+                    # Detecção mais nova do processo de visão
+                    received = await self.pipeline.read_async(
+                        copy_frame=(self.display is not None and self.display.due())
+                                   or self.recorder is not None)
+                    if received is None:
+                        if self.pipeline.failed:
+                            print("✗ Erro ao capturar frame")
+                            break
+                        continue
                     
-                    # Controla taxa de envio de comandos
-                    import time
-                    current_time = time.time()
-                    if current_time - last_command_time >= command_interval:
-                        left_speed, right_speed = self.calculate_motor_speeds(deviation)
-                        await self.send_command("custom", left=left_speed, right=right_speed)
-                        last_command_time = current_time
-                
-                elif not paused and not line_center:
-                    # Linha não detectada - para
-                    await self.send_command("stop")
-                
-                # Adiciona informações na tela
-                info_frame = processed_frame.copy()
-                status_text = "PAUSADO" if paused else "ATIVO"
-                status_color = (0, 165, 255) if paused else (0, 255, 0)
-                
-                cv2.putText(info_frame, status_text, (10, 30),
-                          cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
-                
-                cv2.putText(info_frame, f"Frames: {self.frame_count}", (10, 60),
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                cv2.putText(info_frame, f"Deteccoes: {self.detection_count}", (10, 85),
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                cv2.putText(info_frame, f"Velocidade: {self.base_speed}", (10, 110),
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                if line_center:
-                    cv2.putText(info_frame, "Linha: DETECTADA", (10, 135),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                    processed_frame, detection = received
+                    frame_time = detection.timestamp
+                    # A captura e a decodificação ficam no outro processo: a etapa
+                    # de detecção inclui a passagem pelo pipeline
+                    stamps = self.latency.frame(frame_time, frame_time, frame_time)
+                    stamps.detected = time.monotonic()
+                    line_center = detection.line_center
+                    deviation = detection.deviation
+                    heading = detection.heading
+                    roi_width = detection.width
+                    
+                    # Sem frame (slot sobrescrito no anel): a gravação pula a detecção
+                    if self.recorder and processed_frame is not None:
+                        self.recorder.write_frame(processed_frame, frame_time)
+                        self.recorder.write_detection(line_center, deviation, heading)
                 else:
-                    cv2.putText(info_frame, "Linha: NAO DETECTADA", (10, 135),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                    # Aguarda o frame mais novo sem bloquear o loop asyncio
+                    captured = await self.grabber.read_async(last_seq)
+                    if captured is None:
+                        if self.grabber.failed:
+                            print("✗ Erro ao capturar frame")
+                            break
+                        continue
+                    
+                    frame, frame_time, last_seq = captured
+                    stamps = self.latency.frame(*self.grabber.read_times)
+                    
+                    # Grava o frame bruto antes de qualquer desenho
+                    if self.recorder:
+                        self.recorder.write_frame(frame, frame_time)
+                    
+                    # Desenho de debug só nos frames que vão para a janela
+                    self.draw = self.debug and self.display is not None and self.display.due()
+                    
+                    # Processa frame
+                    processed_frame, line_center, deviation = self.process_frame(frame, frame_time)
+                    stamps.detected = time.monotonic()
+                    heading = self.line_heading()
+                    roi_width = frame.shape[1]
+                    
+                    if self.recorder:
+                        self.recorder.write_detection(line_center, deviation, heading)
                 
-                # Mostra frame
-                cv2.imshow('Line Follower', info_frame)
+                self.frame_count += 1
                 
-                # Processa teclas
-                key = cv2.waitKey(1) & 0xFF
+                # Envia comando se não estiver pausado
+                if not self.paused:
+                    await self.command_frame(line_center, deviation, roi_width, frame_time,
+                                             heading, stamps)
                 
-                if key == 27 or key == ord('q'):  # ESC ou Q
-                    print("\nEncerrando...")
-                    break
-                elif key == ord(' '):  # ESPAÇO
-                    paused = not paused
-                    if paused:
-                        await self.send_command("stop")
-                        print("⏸ Pausado")
-                    else:
-                        print("▶ Retomado")
-                elif key == ord('r'):  # R
-                    self.frame_count = 0
-                    self.detection_count = 0
-                    print("↻ Estatísticas resetadas")
-                elif key == ord('+') or key == ord('='):  # +
-                    self.base_speed = min(100, self.base_speed + 5)
-                    print(f"⬆ Velocidade: {self.base_speed}")
-                elif key == ord('-') or key == ord('_'):  # -
-                    self.base_speed = max(20, self.base_speed - 5)
-                    print(f"⬇ Velocidade: {self.base_speed}")
+                self.latency.frame_done(stamps)
+                self.latency.tick()
                 
-                # Pequeno delay para não sobrecarregar
-                await asyncio.sleep(0.01)
+                if self.display:
+                    # Snapshot para a thread de visualização, na taxa da janela
+                    if processed_frame is not None and self.display.due():
+                        self.display.submit(processed_frame, self.display_status(line_center))
+                    for key in self.display.keys():
+                        if not await self.handle_key(key):
+                            break
+                elif time.monotonic() - last_status_time >= status_interval:
+                    # Headless: resumo periódico no console
+                    last_status_time = time.monotonic()
+                    print(f"Frames: {self.frame_count}  Detecções: {self.detection_count}  "
+                          f"Linha: {'sim' if line_center else 'não'}  Desvio: {deviation}  "
+                          f"{self.latency.brief()}")
         
         finally:
             # Para o carrinho
-            await self.send_command("stop")
+            await self.send_command("stop", force=True)
             
             # Libera recursos
-            cap.release()
-            cv2.destroyAllWindows()
+            if self.grabber:
+                self.grabber.stop()
+            if cap:
+                cap.release()
+            if self.pipeline:
+                self.pipeline.stop()
+            if self.recorder:
+                self.recorder.close()
+            if self.display:
+                self.display.stop()
+            self.latency.close()
+            
+            if self.channel:
+                await self.channel.close()
+            
+            if self.udp:
+                await self.udp.close()
+            
+            if self.config_channel:
+                await self.config_channel.close()
             
             if self.websocket:
                 await self.websocket.close()
@@ -330,6 +783,64 @@ class LineFollower:
             if self.frame_count > 0:
                 detection_rate = (self.detection_count / self.frame_count) * 100
                 print(f"Taxa de detecção: {detection_rate:.1f}%")
+            if self.grabber:
+                print(f"Frames descartados (antigos): {self.grabber.dropped_frames}")
+                if self.grabber.drained_frames:
+                    print(f"Frames drenados do buffer da câmera: {self.grabber.drained_frames}")
+            if cap is not None and self.source_options["mjpeg"]:
+                print(f"MJPEG: {cap.received} recebidos, {cap.skipped} pulados sem decodificar, "
+                      f"{cap.decoded} decodificados")
+            if self.pipeline:
+                print(f"Pipeline: {self.pipeline.report()}")
+                for stage, info in self.pipeline.stats.items():
+                    print(f"  {stage}: {info['dropped']} descartados, "
+                          f"{info['torn']} sobrescritos")
+            if self.display:
+                print(f"Visualização: {self.display.rendered} de {self.display.submitted} "
+                      f"snapshots desenhados ({self.frame_count} frames)")
+            if self.recorder:
+                print(f"Gravação: {self.recorder.frames} frames e "
+                      f"{self.recorder.commands} comandos em {self.record_path}")
+            stages, allocations = self.context.report()
+            for stage, info in stages.items():
+                print(f"  {stage}: {info['avg_ms']:.2f} ms/frame")
+            print(f"Alocações de buffers: {sum(allocations.values())} "
+                  f"({len(allocations)} buffers)")
+            if self.tracker:
+                tracking = self.tracker.stats()
+                print(f"Rastreamento: {tracking['window_searches']} buscas em janela, "
+                      f"{tracking['full_searches']} completas "
+                      f"({tracking['pixels_fraction'] * 100:.0f}% das colunas em média)")
+            if self.channel:
+                print(f"Transporte: {self.transport}")
+                print(f"Comandos enviados: {self.channel.sent} "
+                      f"(substituídos: {self.channel.coalesced}, "
+                      f"repetidos suprimidos: {self.suppressed_commands})")
+                print(f"Acks perdidos: {self.channel.missed_acks}")
+                schedule = self.scheduler.stats()
+                if schedule["sent"]:
+                    print(f"Agendador: intervalo médio {schedule['avg_interval_ms']:.1f} ms, "
+                          f"{schedule['urgent']} envios imediatos, "
+                          f"{schedule['link_limited'] * 100:.0f}% limitados pelo enlace")
+                if self.channel.rtt_avg is not None:
+                    print(f"RTT médio: {self.channel.rtt_avg * 1000:.1f} ms "
+                          f"(máx: {self.channel.rtt_max * 1000:.1f} ms)")
+            latency = self.latency.summary()
+            if latency:
+                print("Latência (p50 / p95 / p99 ms):")
+                for stage, description in STAGES:
+                    if stage in latency:
+                        info = latency[stage]
+                        print(f"  {stage:<14} {info['p50_ms']:7.2f} {info['p95_ms']:7.2f} "
+                              f"{info['p99_ms']:7.2f}  ({description})")
+                offset, clock_rtt = self.latency.clock_info()
+                if offset is not None:
+                    print(f"  Relógio ESP32: offset {offset:.1f} ms "
+                          f"(incerteza até {clock_rtt / 2:.1f} ms)")
+            if self.telemetry and 'udp_received' in self.telemetry:
+                print(f"ESP32 UDP: {self.telemetry['udp_received']} recebidos, "
+                      f"{self.telemetry['udp_out_of_order']} fora de ordem, "
+                      f"{self.telemetry['udp_stale']} atrasados")
 
 def parse_arguments():
     """Parse argumentos da linha de comando"""
@@ -350,7 +861,115 @@ def parse_arguments():
     parser.add_argument('--roi', type=float, default=0.3,
                       help='Altura da região de interesse (0.1-0.5, padrão: 0.3)')
     
-    return parser.parse_args()
+    parser.add_argument('--protocol', choices=['json', 'binary'], default='json',
+                      help='Formato dos comandos: json (compatível) ou binary (compacto)')
+    
+    parser.add_argument('--detector', choices=['hsv', 'fast', 'bands'], default='hsv',
+                      help='Detecção da linha: hsv (contornos), fast (limiar em um canal + histograma) '
+                           'ou bands (faixas com heading e curvatura à frente)')
+    
+    parser.add_argument('--tracking', action='store_true',
+                      help='Busca a linha só numa janela em torno da posição prevista (Kalman)')
+    
+    parser.add_argument('--mjpeg', action='store_true',
+                      help='Leitor MJPEG nativo para a URL da câmera (pula JPEGs atrasados)')
+    
+    parser.add_argument('--decode-scale', type=int, choices=[1, 2, 4, 8], default=1,
+                      help='Decodifica o JPEG já reduzido 2, 4 ou 8 vezes (com --mjpeg)')
+    
+    parser.add_argument('--grayscale', action='store_true',
+                      help='Decodifica só a luminância (com --mjpeg; detectores fast e bands)')
+    
+    parser.add_argument('--resolution', type=str, default=None, metavar='LxA',
+                      help='Resolução pedida à câmera, ex.: 640x480 (o modo obtido é exibido)')
+    
+    parser.add_argument('--fps', type=float, default=None,
+                      help='Taxa de quadros pedida à câmera')
+    
+    parser.add_argument('--fourcc', type=str, default=DEFAULT_FOURCC,
+                      help='Formato pedido à câmera local (padrão: MJPG; auto: o do driver)')
+    
+    parser.add_argument('--profile', type=str, default=None, metavar='ARQUIVO',
+                      help='Perfil de calibração (padrão: hsv_profile.json, se existir)')
+    
+    parser.add_argument('--no-profile', action='store_true',
+                      help='Ignora o perfil de calibração (limiares padrão)')
+    
+    parser.add_argument('--record', type=str, default=None, metavar='PASTA',
+                      help='Grava frames, detecções e comandos da execução na pasta')
+    
+    parser.add_argument('--replay', type=str, default=None, metavar='PASTA',
+                      help='Usa uma gravação no lugar da câmera (em tempo real)')
+    
+    parser.add_argument('--replay-fast', action='store_true',
+                      help='Reproduz a gravação o mais rápido possível, sem pular frames')
+    
+    parser.add_argument('--headless', action='store_true',
+                      help='Sem janela nem desenhos (resumo no console a cada 5 s)')
+    
+    parser.add_argument('--display-fps', type=float, default=15.0,
+                      help='Taxa máxima da janela de debug, desenhada em thread própria (padrão: 15)')
+    
+    parser.add_argument('--latency-log', type=str, default=None, metavar='ARQUIVO',
+                      help='Exporta a latência por etapa (p50/p95/p99) a cada segundo em CSV '
+                           'ou JSON Lines (.json/.jsonl)')
+    
+    parser.add_argument('--pipeline', action='store_true',
+                      help='Captura, visão e controle em processos separados (memória compartilhada)')
+    
+    parser.add_argument('--controller', choices=['pid', 'pi', 'p', 'bangbang'], default='bangbang',
+                      help='Controlador de direção no PC (padrão: bangbang, a lógica original; '
+                           'pid ainda sem ganhos ajustados no carrinho)')
+    
+    parser.add_argument('--steering', choices=['pc', 'esp32'], default='pc',
+                      help='Onde roda o controlador de direção (esp32: PC envia só o erro da linha)')
+    
+    parser.add_argument('--transport', choices=['websocket', 'udp'], default='websocket',
+                      help='Canal dos comandos de motor (udp: sem bloqueio por retransmissão)')
+    
+    args = parser.parse_args()
+    
+    if args.replay:
+        if args.camera or args.mjpeg:
+            parser.error('--replay substitui --camera e --mjpeg')
+        if not is_recording(args.replay):
+            parser.error(f'{args.replay} não é uma gravação (falta meta.json)')
+        args.camera = args.replay
+    elif args.replay_fast:
+        parser.error('--replay-fast exige --replay')
+    
+    if (args.decode_scale != 1 or args.grayscale) and not args.mjpeg:
+        parser.error('--decode-scale e --grayscale exigem --mjpeg')
+    if args.mjpeg and not (args.camera or '').startswith('http'):
+        parser.error('--mjpeg exige --camera com uma URL http')
+    if args.grayscale and args.detector == 'hsv':
+        parser.error('--grayscale não funciona com o detector hsv (use fast ou bands)')
+    
+    if args.pipeline and args.debug:
+        parser.error('--debug não funciona com --pipeline: o processo de visão não desenha '
+                     'a sobreposição (rode sem --pipeline para depurar a detecção)')
+    
+    if (args.resolution or args.fps) and (args.mjpeg or args.replay):
+        parser.error('--resolution e --fps valem só para câmeras (sem --mjpeg e --replay)')
+    if args.resolution:
+        try:
+            width, height = args.resolution.lower().split('x')
+            args.resolution = (int(width), int(height))
+        except ValueError:
+            parser.error('--resolution deve ser LxA, ex.: 640x480')
+    if args.profile and args.no_profile:
+        parser.error('--profile e --no-profile são exclusivos')
+    if args.profile and not os.path.isfile(args.profile):
+        parser.error(f'perfil {args.profile} não encontrado')
+    if not args.profile and not args.no_profile and os.path.isfile(PROFILE_PATH):
+        args.profile = PROFILE_PATH
+    
+    if args.fourcc.lower() == 'auto':
+        args.fourcc = None
+    elif len(args.fourcc) != 4:
+        parser.error('--fourcc deve ter 4 caracteres (ex.: MJPG, YUYV) ou ser auto')
+    
+    return args
 
 async def main():
     """Função principal"""
@@ -365,7 +984,26 @@ async def main():
     follower = LineFollower(
         esp32_ip=args.esp32_ip,
         camera_url=args.camera,
-        debug=args.debug
+        debug=args.debug,
+        protocol=args.protocol,
+        transport=args.transport,
+        steering=args.steering,
+        controller=args.controller,
+        detector=args.detector,
+        tracking=args.tracking,
+        pipeline=args.pipeline,
+        headless=args.headless,
+        display_fps=args.display_fps,
+        mjpeg=args.mjpeg,
+        decode_scale=args.decode_scale,
+        grayscale=args.grayscale,
+        record=args.record,
+        replay_realtime=not args.replay_fast,
+        latency_log=args.latency_log,
+        resolution=args.resolution,
+        camera_fps=args.fps,
+        fourcc=args.fourcc,
+        profile=args.profile
     )
     
     # Ajusta parâmetros
@@ -374,9 +1012,29 @@ async def main():
     
     print(f"ESP32 IP: {args.esp32_ip}")
     print(f"Câmera: {args.camera if args.camera else 'Webcam padrão'}")
+    if args.replay:
+        print(f"Reprodução: {'o mais rápido possível' if args.replay_fast else 'tempo real'}")
+    if args.record:
+        print(f"Gravação: {args.record}")
+    if args.resolution or args.fps:
+        resolution = f"{args.resolution[0]}x{args.resolution[1]}" if args.resolution else "padrão"
+        print(f"Modo pedido: {args.fourcc or 'formato do driver'} {resolution}"
+              f"{f' @ {args.fps:.0f} fps' if args.fps else ''}")
+    if args.mjpeg:
+        print(f"MJPEG nativo: escala 1/{args.decode_scale}"
+              f"{', tons de cinza' if args.grayscale else ''}")
     print(f"Velocidade base: {follower.base_speed}")
     print(f"ROI: {int(follower.roi_height * 100)}% inferior")
-    print(f"Debug: {'Ativado' if args.debug else 'Desativado'}")
+    print(f"Debug: {'Ativado' if follower.debug else 'Desativado'}")
+    print(f"Janela: {'headless' if args.headless else f'até {args.display_fps:.0f} fps'}")
+    print(f"Detector: {args.detector}{' + rastreamento' if args.tracking else ''}")
+    if args.profile:
+        print(f"Perfil de calibração: {args.profile} "
+              f"(HSV {follower.lower_black.tolist()} - {follower.upper_black.tolist()})")
+    print(f"Protocolo: {args.protocol}")
+    print(f"Transporte: {args.transport}")
+    print(f"Pipeline: {'processos separados' if args.pipeline else 'processo único'}")
+    print(f"Controlador: {'ESP32' if args.steering == 'esp32' else 'PC (' + args.controller + ')'}")
     print()
     
     # Inicia seguimento
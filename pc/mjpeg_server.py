@@ -0,0 +1,148 @@
+"""
+Servidor MJPEG local que imita o app de câmera do celular
+Serve frames gravados (vídeo ou pasta de JPEGs) como multipart/x-mixed-replace
+na taxa pedida, para testar o seguidor sem o celular:
+
+    python mjpeg_server.py gravacao.avi --port 8080
+    python line_follower.py 127.0.0.1 --camera http://127.0.0.1:8080/video --mjpeg
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = 'frame'
+
+
+def load_frames(source, quality=80, limit=None):
+    """Lê os frames da fonte e já os codifica em JPEG (lista de bytes)"""
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, '*.jpg')) +
+                       glob.glob(os.path.join(source, '*.jpeg')))
+        frames = [open(path, 'rb').read() for path in paths[:limit]]
+    else:
+        cap = cv2.VideoCapture(source)
+        frames = []
+        while limit is None or len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok:
+                frames.append(encoded.tobytes())
+        cap.release()
+    return frames
+
+
+class MjpegServer:
+    """
+    Serve uma lista de JPEGs em loop
+    content_length=False omite o cabeçalho (como alguns apps), forçando a
+    busca pelo delimitador no leitor
+    """
+
+    def __init__(self, frames, host='127.0.0.1', port=8080, fps=30.0, loop=True,
+                 content_length=True):
+        if not frames:
+            raise ValueError("Nenhum frame para servir")
+
+        self.frames = frames
+        self.fps = fps
+        self.loop = loop
+        self.content_length = content_length
+        self.sent = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.stream(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/video"
+
+    def stream(self, handler):
+        """Envia os frames para um cliente até ele desconectar"""
+        handler.send_response(200)
+        handler.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+
+        interval = 1.0 / self.fps if self.fps > 0 else 0.0
+        next_time = time.monotonic()
+        index = 0
+        try:
+            while True:
+                jpeg = self.frames[index]
+                header = f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                if self.content_length:
+                    header += f"Content-Length: {len(jpeg)}\r\n"
+                handler.wfile.write(header.encode() + b"\r\n" + jpeg + b"\r\n")
+                self.sent += 1
+
+                index += 1
+                if index == len(self.frames):
+                    if not self.loop:
+                        break
+                    index = 0
+
+                # Mantém a taxa sem acumular atraso
+                next_time += interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def start(self):
+        """Serve em uma thread (uso em scripts de teste)"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor MJPEG com frames gravados')
+    parser.add_argument('source', help='Vídeo gravado ou pasta com JPEGs')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help='Taxa de envio (0 = o mais rápido possível)')
+    parser.add_argument('--quality', type=int, default=80,
+                        help='Qualidade JPEG ao converter vídeo (padrão: 80)')
+    parser.add_argument('--once', action='store_true', help='Não repete os frames')
+    parser.add_argument('--no-content-length', action='store_true',
+                        help='Omite Content-Length nas partes (como alguns apps)')
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.quality)
+    server = MjpegServer(frames, args.host, args.port, args.fps, loop=not args.once,
+                         content_length=not args.no_content_length)
+    print(f"✓ {len(frames)} frames em http://{args.host}:{args.port}/video")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✓ Servidor encerrado")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+Leitor nativo de MJPEG sobre HTTP (IP Webcam, DroidCam)
+Lê o stream multipart de um socket para buffers reutilizáveis, guarda só o
+JPEG completo mais recente (JPEGs inteiros são pulados sem decodificar) e
+decodifica em escala reduzida (IMREAD_REDUCED_*), com custo proporcional ao
+que o detector precisa. Reconecta sozinho se o app da câmera derrubar a
+conexão. Compatível com cv2.VideoCapture (read/isOpened/release)
+"""
+
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+# Flags de decodificação por escala (1, 2, 4 ou 8) e modo de cor
+DECODE_FLAGS = {
+    (1, False): cv2.IMREAD_COLOR,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+    (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+BOUNDARY_PATTERN = re.compile(rb'boundary="?([^";\r\n]+)"?', re.IGNORECASE)
+LENGTH_PATTERN = re.compile(rb'content-length:\s*(\d+)', re.IGNORECASE)
+
+# Intervalo entre tentativas de reconexão (segundos)
+RECONNECT_INTERVAL = 0.2
+
+
+class MjpegStream:
+    """
+    Fonte MJPEG com recepção em thread própria
+    decode_scale: 1, 2, 4 ou 8 (reduz a resolução já na decodificação)
+    grayscale: decodifica só a luminância (detectores 'fast' e 'bands')
+    reconnect_timeout: tempo tentando reconectar após a queda do stream (0 desativa)
+    """
+
+    def __init__(self, url, decode_scale=1, grayscale=False, timeout=5.0,
+                 buffer_size=1 << 20, reconnect_timeout=5.0):
+        if (decode_scale, grayscale) not in DECODE_FLAGS:
+            raise ValueError(f"Escala de decodificação inválida: {decode_scale}")
+
+        self.url = url
+        self.flags = DECODE_FLAGS[(decode_scale, grayscale)]
+        self.timeout = timeout
+        self.reconnect_timeout = reconnect_timeout
+        self.running = False
+        self.failed = False
+        self._reconnecting = False
+
+        # Buffer de recepção reutilizado (cresce se um JPEG não couber)
+        self._buf = bytearray(buffer_size)
+        self._fill = 0
+        self._sock = None
+        self._boundary = None
+
+        # Buffer triplo de JPEGs: um sendo escrito, um pronto e um sendo decodificado
+        self._condition = threading.Condition()
+        self._slots = [bytearray(), bytearray(), bytearray()]
+        self._lengths = [0, 0, 0]
+        self._arrivals = [0.0, 0.0, 0.0]
+        self._ready = None
+        self._reading = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self._thread = None
+
+        # Estatísticas
+        self.received = 0
+        self.skipped = 0
+        self.decoded = 0
+        self.bytes_received = 0
+        self.reconnects = 0
+        # Horário (time.monotonic) em que chegou o último byte do JPEG lido por read()
+        self.last_arrival = None
+
+        self.open()
+
+    def open(self):
+        """Conecta, lê o cabeçalho HTTP e inicia a thread de recepção"""
+        try:
+            self._connect()
+        except ConnectionError as e:
+            print(f"✗ {e}")
+            self.release()
+            return False
+
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='MjpegStream', daemon=True)
+        self._thread.start()
+        return True
+
+    def _connect(self):
+        """Abre o socket e lê o cabeçalho HTTP (ConnectionError se falhar)"""
+        parsed = urlparse(self.url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+
+        self._fill = 0
+        try:
+            self._sock = socket.create_connection((parsed.hostname, parsed.port or 80),
+                                                  timeout=self.timeout)
+            request = f"GET {path} HTTP/1.0\r\nHost: {parsed.hostname}\r\n\r\n"
+            self._sock.sendall(request.encode())
+            header = self._read_http_header()
+        except OSError as e:
+            self._close_socket()
+            raise ConnectionError(f"Erro ao conectar ao stream MJPEG: {e}") from e
+
+        status = header.split(b'\r\n', 1)[0]
+        match = BOUNDARY_PATTERN.search(header)
+        if b' 200' not in status or not match:
+            self._close_socket()
+            raise ConnectionError(
+                f"Resposta não é um stream MJPEG: {status.decode(errors='replace')}")
+
+        boundary = match.group(1)
+        if boundary.startswith(b'--'):
+            boundary = boundary[2:]
+        self._boundary = b'--' + boundary
+
+    def _reconnect(self):
+        """Tenta reconectar até reconnect_timeout; retorna True se conseguiu"""
+        self._close_socket()
+        deadline = time.monotonic() + self.reconnect_timeout
+        with self._condition:
+            self._reconnecting = True
+        try:
+            while self.running and time.monotonic() < deadline:
+                time.sleep(RECONNECT_INTERVAL)
+                try:
+                    self._connect()
+                except ConnectionError:
+                    continue
+                self.reconnects += 1
+                print("✓ Stream MJPEG reconectado")
+                return True
+            return False
+        finally:
+            with self._condition:
+                self._reconnecting = False
+                self._condition.notify_all()
+
+    def _close_socket(self):
+        if self._sock:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+
+    def _recv(self):
+        """Recebe direto no buffer; dobra o buffer se estiver cheio"""
+        if self._fill == len(self._buf):
+            self._buf.extend(bytes(len(self._buf)))
+        with memoryview(self._buf) as view:
+            received = self._sock.recv_into(view[self._fill:])
+        if received == 0:
+            raise ConnectionError("Stream encerrado pelo servidor")
+        self._fill += received
+        self.bytes_received += received
+
+    def _consume(self, count):
+        """Descarta os primeiros count bytes do buffer"""
+        remaining = self._fill - count
+        self._buf[:remaining] = self._buf[count:self._fill]
+        self._fill = remaining
+
+    def _read_http_header(self):
+        while True:
+            end = self._buf.find(b'\r\n\r\n', 0, self._fill)
+            if end >= 0:
+                header = bytes(self._buf[:end])
+                self._consume(end + 4)
+                return header
+            self._recv()
+
+    def _next_part(self):
+        """
+        Localiza a próxima parte do multipart no buffer
+        Retorna: (início, fim) do JPEG ou None se ainda faltam bytes
+        """
+        headers_end = self._buf.find(b'\r\n\r\n', 0, self._fill)
+        if headers_end < 0:
+            return None
+        start = headers_end + 4
+
+        match = LENGTH_PATTERN.search(self._buf, 0, headers_end)
+        if match:
+            end = start + int(match.group(1))
+            return (start, end) if end <= self._fill else None
+
+        # Sem Content-Length: o JPEG vai até o próximo delimitador
+        end = self._buf.find(self._boundary, start, self._fill)
+        if end < 0:
+            return None
+        # Remove o \r\n que precede o delimitador
+        while end > start and self._buf[end - 1] in b'\r\n':
+            end -= 1
+        return start, end
+
+    def _publish(self, start, end):
+        """Copia o JPEG para um slot livre e o marca como o mais recente"""
+        with self._condition:
+            slot = next(i for i in range(3) if i != self._ready and i != self._reading)
+
+        length = end - start
+        data = self._slots[slot]
+        if len(data) < length:
+            data.extend(bytes(length - len(data)))
+        with memoryview(self._buf) as view:
+            data[:length] = view[start:end]
+        self._lengths[slot] = length
+        self._arrivals[slot] = time.monotonic()
+
+        with self._condition:
+            if self._ready is not None:
+                # O JPEG pronto anterior nunca foi decodificado
+                self.skipped += 1
+            self._ready = slot
+            self._seq += 1
+            self.received += 1
+            self._condition.notify_all()
+
+    def _receive(self):
+        """Separa os JPEGs do stream até a conexão cair"""
+        try:
+            while self.running:
+                part = self._next_part()
+                if part is None:
+                    self._recv()
+                    continue
+                start, end = part
+                if end > start:
+                    self._publish(start, end)
+                self._consume(end)
+        except ConnectionError:
+            # Fim do stream: a última parte sem Content-Length não tem delimitador
+            # depois. Só é publicada se o JPEG chegou inteiro (termina no EOI)
+            headers_end = self._buf.find(b'\r\n\r\n', 0, self._fill)
+            if headers_end >= 0 and not LENGTH_PATTERN.search(self._buf, 0, headers_end):
+                end = self._fill
+                while end > headers_end + 4 and self._buf[end - 1] in b'\r\n':
+                    end -= 1
+                if self._buf[end - 2:end] == b'\xff\xd9':
+                    self._publish(headers_end + 4, end)
+            if self.running:
+                print("⚠ Stream MJPEG encerrado pelo servidor")
+        except OSError as e:
+            if self.running:
+                print(f"⚠ Stream MJPEG interrompido: {e}")
+
+    def _run(self):
+        try:
+            while self.running:
+                self._receive()
+                if not self.running:
+                    break
+                if self.reconnect_timeout <= 0 or not self._reconnect():
+                    if self.running:
+                        print("✗ Stream MJPEG perdido")
+                    break
+        finally:
+            # release() durante a reconexão pode ter chegado antes do socket novo
+            self._close_socket()
+            with self._condition:
+                self.failed = self.running
+                self.running = False
+                self._condition.notify_all()
+
+    def isOpened(self):
+        return self.running or self._ready is not None
+
+    def read(self, image=None):
+        """
+        Decodifica o JPEG mais recente ainda não lido
+        image: array de destino opcional (mesma interface do VideoCapture)
+        Retorna: (ok, frame)
+        """
+        with self._condition:
+            # Durante a reconexão continua esperando (a thread encerra se desistir)
+            while not self._condition.wait_for(
+                    lambda: self._seq > self._consumed_seq or not self.running, self.timeout):
+                if not self._reconnecting:
+                    break
+            if self._seq <= self._consumed_seq or self._ready is None:
+                return False, None
+            slot = self._reading = self._ready
+            self._ready = None
+            self._consumed_seq = self._seq
+            self.last_arrival = self._arrivals[slot]
+
+        try:
+            encoded = np.frombuffer(self._slots[slot], np.uint8, count=self._lengths[slot])
+            frame = cv2.imdecode(encoded, self.flags)
+        finally:
+            with self._condition:
+                self._reading = None
+
+        if frame is None:
+            return False, None
+        self.decoded += 1
+
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.running = False
+        self._close_socket()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
@@ -0,0 +1,394 @@
+"""
+Pipeline multiprocesso: captura, visão e controle em processos separados
+Os frames ficam num anel de memória compartilhada (multiprocessing.shared_memory):
+a captura escreve direto no slot e a visão lê o mesmo slot, sem pickle nem
+cópia. Entre os processos só trafegam registros pequenos (seq, timestamp) e
+o resultado da detecção; o controle (WebSocket/UDP e interface) fica no
+processo principal
+"""
+
+import asyncio
+import multiprocessing as mp
+import queue
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from camera import drain_stale, open_source
+
+# Resultado da visão enviado ao processo de controle
+Detection = namedtuple('Detection', 'seq timestamp line_center deviation heading width')
+
+# Intervalo entre relatórios de cada etapa (segundos)
+STATS_INTERVAL = 1.0
+
+
+class FrameRing:
+    """
+    Anel de frames em memória compartilhada
+    Cabeçalho com o seq de cada slot (int64; -1 durante a escrita) seguido dos
+    frames. O leitor confere o seq antes e depois de usar o slot para detectar
+    frames sobrescritos no meio do processamento
+    """
+
+    def __init__(self, shape, slots=4, dtype=np.uint8, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        header = slots * 8
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        # Sem name cria o bloco (e é responsável por removê-lo)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=header + slots * frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.seqs = np.ndarray((slots,), np.int64, self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, self.dtype, self.shm.buf, offset=header)
+        if self.owner:
+            self.seqs[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def slot(self, seq):
+        return seq % self.slots
+
+    def begin_write(self, seq):
+        """Marca o slot de seq como em escrita e retorna o array para preencher"""
+        slot = self.slot(seq)
+        self.seqs[slot] = -1
+        return self.frames[slot]
+
+    def commit(self, seq):
+        self.seqs[self.slot(seq)] = seq
+
+    def valid(self, seq):
+        """O slot ainda contém o frame seq (não foi sobrescrito)"""
+        return self.seqs[self.slot(seq)] == seq
+
+    def frame(self, seq):
+        """View (sem cópia) do slot de seq"""
+        return self.frames[self.slot(seq)]
+
+    def close(self):
+        # As views precisam ser liberadas antes de fechar o bloco
+        self.seqs = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def queue_depth(q):
+    """Tamanho aproximado da fila (-1 onde qsize não é suportado, ex.: macOS)"""
+    try:
+        return q.qsize()
+    except NotImplementedError:
+        return -1
+
+
+class StageMeter:
+    """Conta frames de uma etapa e publica FPS, fila e descartes periodicamente"""
+
+    def __init__(self, stage, stats_queue=None, interval=STATS_INTERVAL):
+        self.stage = stage
+        self.stats_queue = stats_queue
+        self.interval = interval
+        self.frames = 0
+        self.dropped = 0
+        self.torn = 0
+        self.last = {"fps": 0.0, "queue": 0, "dropped": 0, "torn": 0}
+        self._window_frames = 0
+        self._window_start = time.monotonic()
+
+    def tick(self, input_queue=None):
+        self.frames += 1
+        self._window_frames += 1
+        if time.monotonic() - self._window_start >= self.interval:
+            self.publish(input_queue)
+
+    def publish(self, input_queue=None):
+        """Calcula o FPS da janela atual e envia o relatório da etapa"""
+        now = time.monotonic()
+        elapsed = max(now - self._window_start, 1e-6)
+        self.last = {"fps": self._window_frames / elapsed,
+                     "queue": queue_depth(input_queue) if input_queue is not None else 0,
+                     "dropped": self.dropped,
+                     "torn": self.torn}
+        self._window_frames = 0
+        self._window_start = now
+
+        if self.stats_queue is not None:
+            try:
+                self.stats_queue.put_nowait((self.stage, self.last))
+            except queue.Full:
+                pass
+
+
+def put_latest(q, item):
+    """Coloca item numa fila limitada, descartando o mais antigo se estiver cheia"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def drain_latest(q, item, meter):
+    """Descarta os itens mais antigos da fila e retorna o mais novo"""
+    while True:
+        try:
+            newer = q.get_nowait()
+        except queue.Empty:
+            return item
+        if newer is None:
+            return None
+        meter.dropped += 1
+        item = newer
+
+
+def capture_process(source, source_options, slots, frame_queue, info_queue, stats_queue,
+                    stop_event):
+    """
+    Processo de captura: lê a câmera direto para o slot do anel
+    Cria o anel com o formato do primeiro frame e informa o nome (e o modo
+    negociado da câmera) ao processo principal
+    source_options: argumentos de camera.open_source (leitor MJPEG, modo da câmera)
+    """
+    cap = open_source(source, **source_options)
+    ok, first = cap.read() if cap.isOpened() else (False, None)
+    if not ok:
+        info_queue.put(('error', "Erro ao abrir câmera"))
+        cap.release()
+        return
+
+    ring = FrameRing(first.shape, slots)
+    info_queue.put(('ready', ring.name, first.shape, getattr(cap, 'mode', None)))
+    drain = getattr(cap, 'drain_frames', 0)
+    meter = StageMeter('captura', stats_queue)
+    seq = 0
+
+    try:
+        while not stop_event.is_set():
+            seq += 1
+            dst = ring.begin_write(seq)
+            if first is not None:
+                np.copyto(dst, first)
+                first = None
+            else:
+                # Decodifica direto na memória compartilhada
+                if drain:
+                    # Buffer do driver maior que 1 frame: descarta os antigos
+                    ok, _ = drain_stale(cap, drain, cap.drain_threshold)
+                    ok, frame = cap.retrieve(dst) if ok else (False, None)
+                else:
+                    ok, frame = cap.read(dst)
+                if not ok:
+                    break
+                if frame is not dst:
+                    np.copyto(dst, frame)
+            timestamp = time.monotonic()
+            ring.commit(seq)
+
+            # Fila limitada: se a visão atrasar, o registro mais antigo sai
+            if frame_queue.full():
+                try:
+                    frame_queue.get_nowait()
+                    meter.dropped += 1
+                except queue.Empty:
+                    pass
+            frame_queue.put((seq, timestamp))
+            meter.tick(frame_queue)
+    finally:
+        meter.publish(frame_queue)
+        put_latest(frame_queue, None)
+        # Não espera a fila esvaziar para sair
+        frame_queue.cancel_join_thread()
+        cap.release()
+        # Aguarda o processo principal liberar o anel antes de removê-lo
+        stop_event.wait(5)
+        ring.close()
+
+
+def vision_process(ring_name, shape, slots, settings, frame_queue, result_queue,
+                   stats_queue, stop_event):
+    """
+    Processo de visão: detecta a linha no slot indicado e envia só o resultado
+    settings: atributos do LineFollower (detector, rastreamento, limiares...)
+    """
+    # Import local: line_follower importa este módulo
+    from line_follower import LineFollower
+
+    settings = dict(settings)
+    follower = LineFollower("0.0.0.0", detector=settings.pop('detector'),
+                            tracking=settings.pop('tracking'))
+    for name, value in settings.items():
+        setattr(follower, name, value)
+
+    ring = FrameRing(shape, slots, name=ring_name)
+    meter = StageMeter('visao', stats_queue)
+
+    try:
+        while not stop_event.is_set():
+            try:
+                item = frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Sempre processa o frame mais novo disponível
+            item = drain_latest(frame_queue, item, meter) if item else None
+            if item is None:
+                break
+
+            seq, timestamp = item
+            if not ring.valid(seq):
+                meter.torn += 1
+                continue
+
+            frame = ring.frame(seq)
+            _, line_center, deviation = follower.process_frame(frame, timestamp)
+
+            # Slot sobrescrito durante o processamento: resultado descartado
+            if not ring.valid(seq):
+                meter.torn += 1
+                continue
+
+            result_queue.put(Detection(seq, timestamp, line_center, deviation,
+                                       follower.line_heading(), frame.shape[1]))
+            meter.tick(frame_queue)
+    finally:
+        meter.publish(frame_queue)
+        frame = None
+        result_queue.put(None)
+        result_queue.cancel_join_thread()
+        ring.close()
+
+
+class VisionPipeline:
+    """
+    Lado do processo principal: inicia captura e visão e entrega as detecções
+    read() retorna (frame, Detection) com o frame copiado do anel só para exibição
+    """
+
+    def __init__(self, source, settings, slots=4, source_options=None):
+        self.source = source
+        self.settings = settings
+        self.slots = slots
+        self.failed = False
+        self.stats = {}
+
+        ctx = mp.get_context('spawn')
+        self._stop = ctx.Event()
+        self._frames = ctx.Queue(maxsize=max(1, slots - 2))
+        self._results = ctx.Queue()
+        self._info = ctx.Queue()
+        self._stats = ctx.Queue(maxsize=64)
+        self._capture = ctx.Process(target=capture_process, name='captura', daemon=True,
+                                    args=(source, source_options or {}, slots,
+                                          self._frames, self._info,
+                                          self._stats, self._stop))
+        self._vision = None
+        self._ctx = ctx
+        self.ring = None
+        self.camera_mode = None
+        self._display = None
+        self.meter = StageMeter('controle')
+
+    def start(self, timeout=10.0):
+        """Inicia os processos; retorna False se a câmera não abrir"""
+        self._capture.start()
+        try:
+            message = self._info.get(timeout=timeout)
+        except queue.Empty:
+            message = ('error', "Câmera não respondeu")
+
+        if message[0] != 'ready':
+            print(f"✗ {message[1]}")
+            self.stop()
+            return False
+
+        _, name, shape, self.camera_mode = message
+        self.ring = FrameRing(shape, self.slots, name=name)
+        self._display = np.empty(shape, np.uint8)
+        self._vision = self._ctx.Process(target=vision_process, name='visao', daemon=True,
+                                         args=(name, shape, self.slots, self.settings,
+                                               self._frames, self._results, self._stats,
+                                               self._stop))
+        self._vision.start()
+        return True
+
+    def _collect_stats(self, final=False):
+        while True:
+            try:
+                stage, info = self._stats.get_nowait()
+            except queue.Empty:
+                break
+            self.stats[stage] = info
+        if final:
+            self.meter.publish(self._results)
+        self.stats['controle'] = self.meter.last
+
+    def read(self, timeout=1.0, copy_frame=True):
+        """
+        Aguarda a detecção mais nova
+        copy_frame: copia o frame para exibição (False: frame None, ex.: headless)
+        Retorna: (frame, Detection) ou None em timeout/fim da captura; frame é
+        None também quando o slot foi sobrescrito antes ou durante a cópia
+        """
+        self._collect_stats()
+        try:
+            detection = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        detection = drain_latest(self._results, detection, self.meter) if detection else None
+        if detection is None:
+            self.failed = True
+            return None
+
+        self.meter.tick(self._results)
+        if not copy_frame:
+            return None, detection
+
+        # Cópia só para a interface e a gravação; um frame que não é o da
+        # detecção (slot já reutilizado ou cópia rasgada) não é entregue
+        if not self.ring.valid(detection.seq):
+            self.meter.torn += 1
+            return None, detection
+        np.copyto(self._display, self.ring.frame(detection.seq))
+        if not self.ring.valid(detection.seq):
+            self.meter.torn += 1
+            return None, detection
+        return self._display, detection
+
+    async def read_async(self, timeout=1.0, copy_frame=True):
+        """Versão de read() que não bloqueia o loop asyncio"""
+        return await asyncio.to_thread(self.read, timeout, copy_frame)
+
+    def stop(self):
+        """Encerra os processos e libera a memória compartilhada"""
+        self._stop.set()
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+        for process in (self._vision, self._capture):
+            if process and process.is_alive():
+                process.join(timeout=2)
+                if process.is_alive():
+                    process.terminate()
+        self._collect_stats(final=True)
+
+    def report(self):
+        """Linha de resumo: FPS e fila de cada etapa"""
+        return " | ".join(f"{stage}: {info['fps']:.1f} fps, fila {info['queue']}"
+                          for stage, info in self.stats.items())
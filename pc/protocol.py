@@ -0,0 +1,150 @@
+"""
+Protocolo binário compacto de comandos para o ESP32
+Cada comando é uma struct de tamanho fixo enviada como frame WebSocket binário
+Mantenha em sincronia com as constantes de esp32/main.py
+"""
+
+import struct
+
+# Comando: opcode, seq, velocidade esquerda, velocidade direita, flags
+COMMAND_FORMAT = '<BHbbB'
+COMMAND_SIZE = struct.calcsize(COMMAND_FORMAT)
+
+# Ack: opcode, seq, status
+ACK_FORMAT = '<BHB'
+ACK_SIZE = struct.calcsize(ACK_FORMAT)
+
+# Horários do ESP32 no fim do ack: recepção e PWM aplicado (µs com wrap em 2^29)
+ACK_TIMING_FORMAT = '<II'
+ACK_TIMING_SIZE = struct.calcsize(ACK_TIMING_FORMAT)
+TIMING_PERIOD_US = 1 << 29
+
+# Datagrama UDP: comando + timestamp do PC (ms, 32 bits)
+# O ack UDP é o ack normal seguido do timestamp ecoado e dos horários ('<BHBIII')
+UDP_COMMAND_FORMAT = '<BHbbBI'
+UDP_COMMAND_SIZE = struct.calcsize(UDP_COMMAND_FORMAT)
+
+# Opcodes
+OP_STOP = 0x00
+OP_FORWARD = 0x01
+OP_BACKWARD = 0x02
+OP_LEFT = 0x03
+OP_RIGHT = 0x04
+OP_SHARP_LEFT = 0x05
+OP_SHARP_RIGHT = 0x06
+OP_CUSTOM = 0x07
+OP_LINE = 0x08   # Erro da linha para o controlador no ESP32
+OP_GAINS = 0x09  # Ganhos do controlador (somente JSON)
+OP_ACK = 0x80
+
+# Flags
+FLAG_ACK_REQUESTED = 0x01
+
+# OP_LINE: erro e heading normalizados (-1 a 1) vão nos campos de velocidade
+# multiplicados por LINE_SCALE; a confiança (0 a 1) ocupa os bits 1-7 das flags
+LINE_SCALE = 127
+
+# Rampa do ESP32: sem setpoints novos por HOLD_MS o alvo começa a decair até parar
+HOLD_MS = 250
+
+# Status do ack
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+ACTION_OPCODES = {
+    'stop': OP_STOP,
+    'forward': OP_FORWARD,
+    'backward': OP_BACKWARD,
+    'left': OP_LEFT,
+    'right': OP_RIGHT,
+    'sharp_left': OP_SHARP_LEFT,
+    'sharp_right': OP_SHARP_RIGHT,
+    'custom': OP_CUSTOM,
+    'line': OP_LINE,
+    'gains': OP_GAINS,
+}
+
+
+def _clamp_speed(value):
+    """Arredonda como o drive() do ESP32 (metade para longe do zero) e limita a ±100"""
+    magnitude = min(100, int(abs(value) + 0.5))
+    return magnitude if value >= 0 else -magnitude
+
+
+def _scale(value):
+    return max(-LINE_SCALE, min(LINE_SCALE, int(round(value * LINE_SCALE))))
+
+
+def _command_fields(command):
+    """Converte o dict de comando em (opcode, esquerda, direita, flags extras)"""
+    action = command.get("action", "stop")
+    opcode = ACTION_OPCODES[action]
+
+    if opcode == OP_GAINS:
+        raise ValueError("Ganhos só podem ser enviados em JSON")
+
+    if opcode == OP_LINE:
+        confidence = max(0.0, min(1.0, command.get("confidence", 1.0)))
+        return (opcode, _scale(command.get("error", 0.0)),
+                _scale(command.get("heading", 0.0)),
+                int(round(confidence * LINE_SCALE)) << 1)
+
+    if opcode == OP_CUSTOM:
+        left = command.get("left", 0)
+        right = command.get("right", 0)
+    else:
+        left = command.get("speed", 50)
+        right = 0
+
+    return opcode, _clamp_speed(left), _clamp_speed(right), 0
+
+
+def setpoint_key(command, encoding='binary'):
+    """
+    Valores do comando como vão no fio (dois comandos com a mesma chave são iguais)
+    Binário: os campos codificados. JSON: velocidades arredondadas como no ESP32;
+    erro, heading e confiança da linha seguem em float
+    """
+    fields = _command_fields(command)
+    if encoding == 'json' and fields[0] == OP_LINE:
+        return (OP_LINE, float(command.get("error", 0.0)), float(command.get("heading", 0.0)),
+                float(command.get("confidence", 1.0)))
+    return fields
+
+
+def encode_command(command, seq, flags=FLAG_ACK_REQUESTED):
+    """
+    Codifica um comando no formato dict (o mesmo usado em JSON) em bytes
+    Ações nomeadas levam a velocidade no campo esquerdo
+    """
+    opcode, left, right, extra = _command_fields(command)
+    return struct.pack(COMMAND_FORMAT, opcode, seq & 0xFFFF, left, right, flags | extra)
+
+
+def encode_datagram(command, seq, timestamp_ms, flags=FLAG_ACK_REQUESTED):
+    """Codifica um comando para o canal UDP, com o horário de envio em ms"""
+    opcode, left, right, extra = _command_fields(command)
+    return struct.pack(UDP_COMMAND_FORMAT, opcode, seq & 0xFFFF, left, right, flags | extra,
+                       int(timestamp_ms) & 0xFFFFFFFF)
+
+
+def decode_ack(data):
+    """
+    Decodifica um ack binário
+    Retorna: (seq, status) ou None se não for um ack
+    """
+    if len(data) < ACK_SIZE or data[0] != OP_ACK:
+        return None
+
+    _, seq, status = struct.unpack_from(ACK_FORMAT, data)
+    return seq, status
+
+
+def decode_ack_timing(data):
+    """
+    Horários ecoados pelo ESP32 num ack binário (WebSocket ou UDP)
+    Retorna: (recepção, PWM aplicado) em µs do ESP32 ou None (firmware antigo)
+    """
+    if len(data) < ACK_SIZE + ACK_TIMING_SIZE:
+        return None
+    return struct.unpack_from(ACK_TIMING_FORMAT, data, len(data) - ACK_TIMING_SIZE)
@@ -0,0 +1,277 @@
+"""
+Gravação e reprodução de execuções
+Uma gravação é uma pasta com:
+    frames.raw      frames brutos em sequência (lidos com np.memmap, sem cópia)
+    records.raw     um registro por frame (RECORD_DTYPE): timestamp e saída de process_frame
+    commands.jsonl  comandos enviados ao ESP32, com horário
+    meta.json       formato dos frames, contagem e parâmetros da execução
+
+ReplaySource substitui a câmera (tempo real ou o mais rápido possível) e
+replay_offline() reprocessa todos os frames com os timestamps gravados, de
+forma determinística, para benchmark e testes de regressão:
+
+    python recording.py info corrida1
+    python recording.py replay corrida1 --detector fast --tracking
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Registro por frame; line_x/line_y = -1 quando a linha não foi detectada
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('line_x', '<i4'),
+    ('line_y', '<i4'),
+    ('deviation', '<i4'),
+    ('heading', '<f4'),
+])
+
+
+def is_recording(path):
+    return isinstance(path, str) and os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+class RunRecorder:
+    """Grava frames, saídas da detecção e comandos de uma execução"""
+
+    def __init__(self, path, settings=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.settings = settings or {}
+        self.shape = None
+        self.dtype = None
+        self.frames = 0
+        self.records = 0
+        self.commands = 0
+        self._start = time.monotonic()
+
+        # Escrita sem buffer do Python: cada frame vai direto ao arquivo
+        self._frames = open(os.path.join(path, 'frames.raw'), 'wb', buffering=0)
+        self._records = open(os.path.join(path, 'records.raw'), 'wb', buffering=0)
+        self._commands = open(os.path.join(path, 'commands.jsonl'), 'w')
+        self._record = np.zeros(1, RECORD_DTYPE)
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {"version": FORMAT_VERSION,
+                "shape": list(self.shape) if self.shape else None,
+                "dtype": str(self.dtype) if self.dtype else None,
+                "frames": self.frames,
+                "records": self.records,
+                "commands": self.commands,
+                "settings": self.settings}
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+
+    def write_frame(self, frame, timestamp):
+        """Grava o frame bruto (antes de qualquer desenho de debug)"""
+        if self.shape is None:
+            self.shape = frame.shape
+            self.dtype = frame.dtype
+            self._write_meta()
+        elif frame.shape != self.shape:
+            raise ValueError(f"Formato do frame mudou: {frame.shape} != {self.shape}")
+
+        self._frames.write(np.ascontiguousarray(frame).data)
+        self._record['timestamp'] = timestamp
+        self.frames += 1
+
+    def write_detection(self, line_center, deviation, heading=0.0):
+        """Grava a saída de process_frame do último frame"""
+        record = self._record
+        record['line_x'], record['line_y'] = line_center if line_center else (-1, -1)
+        record['deviation'] = deviation
+        record['heading'] = heading
+        self._records.write(record.data)
+        self.records += 1
+
+    def write_command(self, command, timestamp=None):
+        """Grava um comando enviado (horário relativo ao início da gravação)"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        entry = {"t": round(timestamp - self._start, 6), "frame": self.frames - 1}
+        entry.update(command)
+        self._commands.write(json.dumps(entry) + "\n")
+        self.commands += 1
+
+    def close(self):
+        self._frames.close()
+        self._records.close()
+        self._commands.close()
+        self._write_meta()
+
+
+class Recording:
+    """Leitura de uma gravação; frames é um memmap (N, H, W[, C])"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+        shape = tuple(self.meta["shape"] or ())
+        dtype = np.dtype(self.meta["dtype"] or np.uint8)
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize if shape else 0
+
+        # A contagem vem do tamanho dos arquivos (vale para gravações interrompidas)
+        frames_path = os.path.join(path, 'frames.raw')
+        available = os.path.getsize(frames_path) // frame_bytes if frame_bytes else 0
+        records = np.fromfile(os.path.join(path, 'records.raw'), RECORD_DTYPE)
+        count = min(available, len(records)) if len(records) else available
+        self.records = records[:count]
+
+        # Modo 'c' (copy-on-write): o debug pode desenhar no frame sem alterar o arquivo
+        if count:
+            self.frames = np.memmap(frames_path, dtype, 'c', shape=(count,) + shape)
+        else:
+            self.frames = np.empty((0,) + shape, dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    def commands(self):
+        """Lista de comandos gravados"""
+        with open(os.path.join(self.path, 'commands.jsonl')) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplaySource:
+    """
+    Substitui a câmera reproduzindo uma gravação (interface do cv2.VideoCapture)
+    realtime: respeita os intervalos gravados; False = o mais rápido possível
+    frame_time() devolve o timestamp gravado do último frame no relógio atual
+    """
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.recording = Recording(path)
+        self.realtime = realtime
+        self.loop = loop
+        self._index = 0
+        self._start = None
+        self._last_time = 0.0
+
+    def isOpened(self):
+        return len(self.recording) > 0
+
+    def read(self, image=None):
+        recording = self.recording
+        if self._index >= len(recording):
+            if not self.loop or not len(recording):
+                return False, None
+            self._index = 0
+            self._start = None
+
+        timestamps = recording.timestamps
+        first = timestamps[0]
+        if self._start is None:
+            self._start = time.monotonic()
+
+        # Timestamp gravado rebaseado para o relógio monotônico desta execução
+        self._last_time = self._start + float(timestamps[self._index] - first)
+        if self.realtime:
+            delay = self._last_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = recording.frames[self._index]
+        self._index += 1
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def frame_time(self):
+        return self._last_time
+
+    def release(self):
+        pass
+
+
+def replay_offline(recording, follower):
+    """
+    Reprocessa todos os frames com os timestamps gravados (sem rede nem câmera)
+    Retorna: (registros no RECORD_DTYPE, tempo de process_frame por frame em ms)
+    """
+    outputs = np.zeros(len(recording), RECORD_DTYPE)
+    timings = np.zeros(len(recording))
+
+    for i, (frame, timestamp) in enumerate(zip(recording.frames, recording.timestamps)):
+        start = time.perf_counter()
+        _, line_center, deviation = follower.process_frame(frame, float(timestamp))
+        timings[i] = (time.perf_counter() - start) * 1000
+
+        outputs[i]['timestamp'] = timestamp
+        outputs[i]['line_x'], outputs[i]['line_y'] = line_center if line_center else (-1, -1)
+        outputs[i]['deviation'] = deviation
+        outputs[i]['heading'] = follower.line_heading()
+    return outputs, timings
+
+
+def compare_records(recorded, replayed):
+    """Diferenças entre duas saídas: detecções divergentes e erro de desvio"""
+    found_a = recorded['line_x'] >= 0
+    found_b = replayed['line_x'] >= 0
+    both = found_a & found_b
+    diff = np.abs(recorded['deviation'][both] - replayed['deviation'][both])
+    return {"frames": len(recorded),
+            "detection_mismatch": int(np.count_nonzero(found_a != found_b)),
+            "deviation_mean_px": float(diff.mean()) if len(diff) else 0.0,
+            "deviation_max_px": int(diff.max()) if len(diff) else 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gravações de execuções do seguidor')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    info = sub.add_parser('info', help='Resumo da gravação')
+    info.add_argument('path')
+
+    replay = sub.add_parser('replay', help='Reprocessa a gravação e compara com o original')
+    replay.add_argument('path')
+    replay.add_argument('--detector', choices=['hsv', 'fast', 'bands'], default=None,
+                        help='Detector (padrão: o da gravação)')
+    replay.add_argument('--tracking', action='store_true')
+    args = parser.parse_args()
+
+    recording = Recording(args.path)
+    settings = recording.meta.get("settings", {})
+
+    if args.command == 'info':
+        timestamps = recording.timestamps
+        duration = float(timestamps[-1] - timestamps[0]) if len(recording) > 1 else 0.0
+        print(f"Frames: {len(recording)} {tuple(recording.meta['shape'] or ())}")
+        print(f"Duração: {duration:.1f} s ({len(recording) / duration if duration else 0:.1f} fps)")
+        print(f"Comandos: {len(recording.commands())}")
+        print(f"Parâmetros: {settings}")
+        return
+
+    # Import local: line_follower importa este módulo
+    from line_follower import LineFollower
+
+    follower = LineFollower("0.0.0.0", detector=args.detector or settings.get("detector", "hsv"),
+                            tracking=args.tracking)
+    for name in ('roi_height', 'fast_threshold', 'fast_channel', 'min_contour_area', 'bands'):
+        if name in settings:
+            setattr(follower, name, settings[name])
+
+    outputs, timings = replay_offline(recording, follower)
+    result = compare_records(recording.records, outputs)
+    print(f"Detector: {follower.detector}{' + rastreamento' if args.tracking else ''}")
+    print(f"process_frame: {timings.mean():.3f} ms/frame (p95 {np.percentile(timings, 95):.3f} ms)")
+    print(f"Detecções divergentes: {result['detection_mismatch']} de {result['frames']} frames")
+    print(f"Diferença de desvio: média {result['deviation_mean_px']:.1f} px, "
+          f"máx {result['deviation_max_px']} px")
+
+
+if __name__ == '__main__':
+    main()
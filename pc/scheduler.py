@@ -0,0 +1,114 @@
+"""
+Agendamento adaptativo do envio de comandos
+O intervalo entre comandos sai da dinâmica da linha (variação do erro e
+heading: curvas pedem comandos mais frequentes, retas menos) e nunca fica
+abaixo do que o enlace absorve (RTT medido e acks pendentes no CommandChannel).
+O teto (ceiling) mantém o ESP32 alimentado mesmo com enlace lento: fica abaixo
+do keepalive de setpoint, do HOLD_MS da rampa e do watchdog
+"""
+
+import time
+
+from config import COMMAND_INTERVAL
+
+# Atividade (erro normalizado por segundo + peso * |heading|) que leva à taxa máxima
+ACTIVITY_FULL = 2.0
+HEADING_WEIGHT = 2.0
+
+# Usa no máximo esta fração da capacidade do enlace (janela de acks / RTT)
+LINK_UTILIZATION = 0.5
+
+
+class CommandScheduler:
+    """
+    Decide quando o próximo comando deve ser enviado
+    base_interval: intervalo nominal (LineFollower.command_interval); em retas o
+    intervalo vai até max_interval (2x) e em curvas até min_interval (1/4)
+    channel: CommandChannel de onde vêm o RTT e os acks pendentes
+    ceiling: intervalo máximo mesmo com o enlace saturado
+    """
+
+    def __init__(self, base_interval=COMMAND_INTERVAL, min_interval=None, max_interval=None,
+                 channel=None, ceiling=0.2, smoothing=0.3):
+        self.base_interval = base_interval
+        self.min_interval = min_interval if min_interval is not None else base_interval / 4
+        self.max_interval = max_interval if max_interval is not None else base_interval * 2
+        self.channel = channel
+        self.ceiling = ceiling
+        self.smoothing = smoothing
+
+        self.activity = 0.0
+        self._last_error = None
+        self._last_timestamp = None
+        self._last_sent = 0.0
+
+        # Estatísticas
+        self.sent = 0
+        self.urgent = 0
+        self.link_limited = 0
+        self._interval_sum = 0.0
+
+    def reset(self):
+        """Linha perdida: a próxima medição recomeça a estimativa da variação"""
+        self._last_error = None
+        self._last_timestamp = None
+
+    def observe(self, error, timestamp, heading=0.0):
+        """Nova medição: erro normalizado (-1 a 1) e heading no horário de captura"""
+        if self._last_timestamp is not None and timestamp > self._last_timestamp:
+            rate = abs(error - self._last_error) / (timestamp - self._last_timestamp)
+            activity = rate + HEADING_WEIGHT * abs(heading)
+            self.activity += self.smoothing * (activity - self.activity)
+        self._last_error = error
+        self._last_timestamp = timestamp
+
+    def dynamic_interval(self):
+        """Intervalo pela dinâmica da linha: max_interval parado, min_interval em curva forte"""
+        fraction = min(1.0, self.activity / ACTIVITY_FULL)
+        return self.max_interval + (self.min_interval - self.max_interval) * fraction
+
+    def link_interval(self):
+        """Menor intervalo que o enlace absorve (0 sem medições de RTT)"""
+        channel = self.channel
+        if channel is None or channel.rtt_avg is None:
+            return 0.0
+        interval = channel.rtt_avg / (channel.max_in_flight * LINK_UTILIZATION)
+        # Acks acumulados: o enlace já está atrasado, espaça mais
+        backlog = channel.backlog / channel.max_in_flight
+        if backlog >= 0.5:
+            interval *= 1 + backlog
+        return interval
+
+    def interval(self):
+        return min(max(self.dynamic_interval(), self.link_interval()), self.ceiling)
+
+    def due(self, now=None, urgent=False):
+        """
+        Já é hora de enviar
+        urgent: mudança de estado (linha perdida/reencontrada) - ignora a
+        dinâmica, mas não o limite do enlace
+        """
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self._last_sent
+        if urgent:
+            return elapsed >= min(self.link_interval(), self.ceiling)
+        return elapsed >= self.interval()
+
+    def mark_sent(self, now=None, urgent=False):
+        """Registra o envio (urgent: mudança de estado)"""
+        if now is None:
+            now = time.monotonic()
+        self._interval_sum += self.interval()
+        self._last_sent = now
+        self.sent += 1
+        if urgent:
+            self.urgent += 1
+        if self.link_interval() >= self.dynamic_interval():
+            self.link_limited += 1
+
+    def stats(self):
+        return {"sent": self.sent,
+                "urgent": self.urgent,
+                "avg_interval_ms": self._interval_sum / self.sent * 1000 if self.sent else 0.0,
+                "link_limited": self.link_limited / self.sent if self.sent else 0.0}
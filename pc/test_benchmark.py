@@ -0,0 +1,74 @@
+"""Testes da suíte de desempenho (benchmark.py)"""
+
+import functools
+
+import numpy as np
+import pytest
+
+import benchmark
+from benchmark import (case_key, compare_results, describe, make_track_frame, measure,
+                       suite_controllers, suite_esp32, suite_process_frame)
+from detectors import dark_mask, find_line_columns
+
+
+def result(median_us, **params):
+    return dict(name="process_frame", median_us=median_us, min_us=median_us * 0.9, calls=70,
+                **params)
+
+
+@pytest.mark.parametrize('offset', [-0.5, 0.0, 0.5])
+def test_track_frame_line_position(offset):
+    frame = make_track_frame(320, 240, offset=offset, seed=3)
+    np.testing.assert_array_equal(frame, make_track_frame(320, 240, offset=offset, seed=3))
+    cx, _, _, _ = find_line_columns(dark_mask(frame[-20:], 60))
+    assert cx == pytest.approx(160 * (1 + offset), abs=3)
+
+
+def test_measure_calibrates_number():
+    calls = []
+    stats = measure(lambda: calls.append(1), rounds=3, min_time=0.001)
+    assert stats["calls"] > 3 and stats["calls"] % 3 == 0
+    assert 0 < stats["min_us"] <= stats["median_us"]
+    assert len(calls) > stats["calls"]  # inclui a calibração
+
+    assert measure(lambda: None, number=10, rounds=2)["calls"] == 20
+
+
+def test_case_key_ignores_measurements():
+    a = result(100.0, detector='fast', debug=False, resolution='640x480', roi=0.3)
+    b = result(250.0, detector='fast', debug=False, resolution='640x480', roi=0.3)
+    assert case_key(a) == case_key(b)
+    assert case_key(a) != case_key(result(100.0, detector='fast', debug=True,
+                                          resolution='640x480', roi=0.3))
+
+
+def test_compare_results_flags_only_regressions():
+    baseline = {"results": [result(100.0, detector='hsv'), result(100.0, detector='fast'),
+                            result(100.0, detector='bands')]}
+    current = {"results": [result(119.0, detector='hsv'), result(130.0, detector='fast'),
+                           result(50.0, detector='bands'), result(999.0, detector='novo')]}
+    regressions = compare_results(current, baseline, threshold=0.2)
+    assert [(r["detector"], before) for r, before in regressions] == [('fast', 100.0)]
+    assert compare_results(current, baseline, threshold=0.1)[0][0]["detector"] == 'hsv'
+
+
+def test_describe():
+    assert describe(result(1.0, detector='fast', debug=False)) == \
+        "process_frame(detector=fast, debug=False)"
+
+
+def test_suites_produce_comparable_results(monkeypatch):
+    # Rodadas curtas: aqui importa a forma dos resultados, não o tempo
+    monkeypatch.setattr(benchmark, 'measure', functools.partial(measure, rounds=2,
+                                                                min_time=0.001))
+    results = suite_process_frame([(160, 120)], [0.3], detectors=('fast',), frame_count=3)
+    results += suite_controllers()
+    results += suite_esp32()
+
+    assert {r["name"] for r in results} == {
+        "process_frame", "calculate_motor_speeds", "esp32.parse_websocket_frame",
+        "esp32.create_websocket_frame", "esp32.handle_command"}
+    assert len(results) == 2 + 4 + 6
+    assert len({case_key(r) for r in results}) == len(results)
+    assert all(r["median_us"] > 0 for r in results)
+    assert compare_results({"results": results}, {"results": results}) == []
@@ -0,0 +1,135 @@
+"""Testes da calibração HSV automática com dados sintéticos (calibrate_hsv.py)"""
+
+import cv2
+import numpy as np
+import pytest
+
+from calibrate_hsv import (SATURATION_MARGIN, auto_calibrate, check_profile, estimate_thresholds,
+                           kmeans_threshold, load_profile, otsu_threshold, save_profile,
+                           separability)
+
+rng = np.random.default_rng(1)
+
+
+def bimodal(low=40, high=190, spread=12, size=20000, low_fraction=0.2):
+    values = np.concatenate([rng.normal(low, spread, int(size * low_fraction)),
+                             rng.normal(high, spread, size - int(size * low_fraction))])
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+def histogram(values):
+    return np.bincount(values, minlength=256).astype(np.float64)
+
+
+def track_samples(line_v, background_v, line_s=40, background_s=60, frames=4,
+                  shape=(60, 160), line_width=32):
+    """ROIs HSV com uma faixa vertical (a linha) no meio de um fundo uniforme"""
+    samples = np.empty((frames,) + shape + (3,), np.uint8)
+    samples[..., 0] = 90
+    samples[..., 1] = np.clip(rng.normal(background_s, 4, (frames,) + shape), 0, 255)
+    samples[..., 2] = np.clip(rng.normal(background_v, 6, (frames,) + shape), 0, 255)
+    x0 = (shape[1] - line_width) // 2
+    band = samples[:, :, x0:x0 + line_width]
+    band[..., 1] = np.clip(rng.normal(line_s, 3, band.shape[:3]), 0, 255)
+    band[..., 2] = np.clip(rng.normal(line_v, 6, band.shape[:3]), 0, 255)
+    return samples, line_width / shape[1]
+
+
+def test_otsu_matches_opencv():
+    # Classes sobrepostas (sem patamar): mesmo critério do cv2.THRESH_OTSU
+    values = bimodal(low=70, high=160, spread=30)
+    threshold, _ = cv2.threshold(values.reshape(1, -1), 0, 255,
+                                 cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    assert abs(otsu_threshold(histogram(values)) - threshold) <= 1
+
+
+@pytest.mark.parametrize('threshold_fn', [otsu_threshold, kmeans_threshold])
+def test_threshold_between_modes(threshold_fn):
+    hist = histogram(bimodal(low=40, high=190))
+    threshold = threshold_fn(hist)
+    assert 80 < threshold < 150
+    assert separability(hist, threshold) > 0.9
+
+
+def test_otsu_centered_in_empty_gap():
+    hist = np.zeros(256)
+    hist[20:40] = 5
+    hist[200:230] = 20
+    # Qualquer limiar entre 39 e 199 separa as classes: fica no meio
+    assert otsu_threshold(hist) == 119
+
+
+def test_kmeans_close_to_otsu_on_balanced_modes():
+    hist = histogram(bimodal(low=60, high=180, low_fraction=0.5))
+    assert abs(kmeans_threshold(hist) - otsu_threshold(hist)) <= 3
+    assert kmeans_threshold(hist) == pytest.approx(120, abs=5)
+
+
+def test_separability_low_for_single_mode():
+    hist = histogram(np.clip(rng.normal(128, 20, 20000), 0, 255).astype(np.uint8))
+    assert separability(hist, otsu_threshold(hist)) < 0.7
+    assert separability(np.ones(256), 255) == 0.0
+
+
+@pytest.mark.parametrize('method', ['otsu', 'kmeans'])
+def test_black_line_profile(method):
+    samples, fraction = track_samples(line_v=35, background_v=200)
+    profile = estimate_thresholds(samples, 'black', method)
+    threshold = profile["upper_hsv"][2]
+    assert 60 < threshold < 175
+    assert profile["lower_hsv"] == [0, 0, 0]
+    assert profile["fast_threshold"] == threshold and profile["fast_channel"] == 'v'
+    assert profile["line_fraction"] == pytest.approx(fraction, abs=0.01)
+    assert profile["frames"] == 4
+    assert check_profile(profile) == []
+
+
+def test_white_line_profile_limits_saturation():
+    samples, fraction = track_samples(line_v=235, background_v=110, line_s=20,
+                                      background_s=90)
+    profile = estimate_thresholds(samples, 'white')
+    assert 130 < profile["lower_hsv"][2] < 215
+    assert profile["upper_hsv"][2] == 255
+    # Saturação máxima da linha + margem, abaixo da do fundo
+    assert 20 + SATURATION_MARGIN <= profile["upper_hsv"][1] < 90
+    assert profile["fast_threshold"] is None
+    assert profile["line_fraction"] == pytest.approx(fraction, abs=0.01)
+
+
+def test_check_profile_warnings():
+    # Linha branca calibrada como preta: a "linha" vira o fundo todo
+    samples, _ = track_samples(line_v=235, background_v=110)
+    warnings = check_profile(estimate_thresholds(samples, 'black'))
+    assert any("--line" in warning for warning in warnings)
+
+    flat, _ = track_samples(line_v=124, background_v=124)
+    warnings = check_profile(estimate_thresholds(flat, 'black'))
+    assert any("contraste" in warning for warning in warnings)
+
+
+def test_profile_round_trip(tmp_path):
+    path = str(tmp_path / 'perfil.json')
+    assert load_profile(path) is None
+    samples, _ = track_samples(line_v=35, background_v=200)
+    profile = estimate_thresholds(samples)
+    save_profile(profile, path)
+    loaded = load_profile(path)
+    assert "created" in loaded
+    loaded.pop("created")
+    assert loaded == profile
+
+
+def test_auto_calibrate_from_video(tmp_path):
+    path = str(tmp_path / 'pista.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 120))
+    for i in range(12):
+        frame = np.full((120, 160, 3), 210, np.uint8)
+        cv2.rectangle(frame, (60 + i, 0), (90 + i, 119), (25, 25, 25), -1)
+        writer.write(frame)
+    writer.release()
+
+    profile = auto_calibrate(path, frames=4, step=3, roi_height=0.5)
+    assert profile["frames"] == 4 and profile["roi_height"] == 0.5
+    assert 40 < profile["upper_hsv"][2] < 200
+    assert profile["line_fraction"] == pytest.approx(31 / 160, abs=0.04)
+    assert profile["separability"] > 0.9
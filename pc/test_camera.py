@@ -0,0 +1,110 @@
+"""Testes da captura com descarte de frames acumulados (camera.py)"""
+
+import time
+
+import cv2
+import numpy as np
+
+from camera import (CameraCapture, FrameGrabber, decode_fourcc, describe_mode, drain_stale,
+                    is_device, is_live)
+
+
+class BufferedCamera:
+    """
+    Driver com buffered frames já no buffer (grab() instantâneo) e depois um
+    frame novo a cada period segundos; limit encerra a câmera
+    """
+
+    def __init__(self, buffered, period=0.02, limit=None):
+        self.buffered = buffered
+        self.period = period
+        self.limit = limit
+        self.index = -1
+        self.grabs = 0
+        self.drain_frames = 4
+        self.drain_threshold = period / 4
+
+    def grab(self):
+        if self.limit is not None and self.grabs >= self.limit:
+            return False
+        self.grabs += 1
+        if self.buffered:
+            self.buffered -= 1
+        else:
+            time.sleep(self.period)
+        self.index += 1
+        return True
+
+    def retrieve(self, image=None):
+        return True, np.full((4, 4), self.index, np.uint8)
+
+
+def test_drain_stale_discards_buffered_frames():
+    camera = BufferedCamera(buffered=3)
+    ok, drained = drain_stale(camera, max_frames=8, threshold=camera.drain_threshold)
+    # Os 3 frames do buffer são descartados; o 4º grab esperou um frame novo
+    assert ok and drained == 3
+    assert camera.index == 3
+
+
+def test_drain_stale_limited_by_max_frames():
+    camera = BufferedCamera(buffered=10)
+    ok, drained = drain_stale(camera, max_frames=4, threshold=camera.drain_threshold)
+    assert ok and drained == 4
+    assert camera.grabs == 5
+
+
+def test_drain_stale_without_buffer():
+    camera = BufferedCamera(buffered=0)
+    assert drain_stale(camera, max_frames=4, threshold=camera.drain_threshold) == (True, 0)
+
+
+def test_drain_stale_reports_failure():
+    camera = BufferedCamera(buffered=5, limit=2)
+    ok, drained = drain_stale(camera, max_frames=8, threshold=camera.drain_threshold)
+    assert not ok and drained == 2
+
+
+def test_grabber_reads_newest_frame():
+    camera = BufferedCamera(buffered=3, limit=6)
+    grabber = FrameGrabber(camera, lockstep=True)
+    grabber.start()
+    try:
+        frame, _, _ = grabber.read(0)
+        assert frame[0, 0] == 3
+        assert grabber.drained_frames == 3
+    finally:
+        grabber.stop()
+
+
+def test_fourcc_and_source_helpers():
+    assert decode_fourcc(cv2.VideoWriter_fourcc(*'MJPG')) == 'MJPG'
+    assert decode_fourcc(0) is None
+    assert is_device(0) and is_device('2') and is_device('/dev/video1')
+    assert not is_device('video.avi')
+    assert is_live('http://192.168.0.5:8080/video') and not is_live('video.avi')
+    assert describe_mode(None) == "desconhecido"
+    assert describe_mode({"fourcc": 'MJPG', "width": 640, "height": 480, "fps": 60.0,
+                          "buffer_size": None, "backend": 'V4L2'}) == \
+        "MJPG 640x480 @ 60 fps, buffer não ajustável (V4L2)"
+
+
+def test_capture_reads_back_obtained_mode(tmp_path):
+    path = str(tmp_path / 'video.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (64, 48))
+    for value in range(5):
+        writer.write(np.full((48, 64, 3), value * 40, np.uint8))
+    writer.release()
+
+    capture = CameraCapture(path, width=320, height=240)
+    try:
+        assert capture.isOpened()
+        # Arquivo: o modo pedido não se aplica; vale o que foi lido de volta
+        assert (capture.mode["width"], capture.mode["height"]) == (64, 48)
+        assert capture.mode["fps"] == 25
+        if capture.mode["buffer_size"] != 1:
+            assert capture.drain_frames == (capture.mode["buffer_size"] or 4)
+        assert capture.drain_threshold == 0.25 / 25
+        assert capture.read()[0]
+    finally:
+        capture.release()
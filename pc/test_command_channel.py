@@ -0,0 +1,99 @@
+"""Testes do CommandChannel com uma conexão falsa (sem rede)"""
+
+import asyncio
+import json
+import time
+
+from command_channel import CommandChannel
+
+
+class SilentConnection:
+    """Conexão que registra os envios e nunca devolve acks (acks perdidos)"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append((time.monotonic(), json.loads(message)))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.Event().wait()
+
+
+def run_channel(scenario, **options):
+    async def main():
+        connection = SilentConnection()
+        channel = CommandChannel(connection, **options)
+        channel.start()
+        try:
+            await scenario(channel)
+        finally:
+            await channel.close(flush_timeout=0)
+        return connection, channel
+
+    return asyncio.run(main())
+
+
+def test_pending_setpoint_sent_when_lost_ack_expires():
+    """Janela cheia com ack perdido: o setpoint novo sai no vencimento, sem outro submit"""
+    async def scenario(channel):
+        channel.submit({"action": "custom", "left": 10, "right": 10})
+        await asyncio.sleep(0.02)
+        channel.submit({"action": "custom", "left": 50, "right": 50})
+        await asyncio.sleep(0.4)
+
+    connection, channel = run_channel(scenario, ack_timeout=0.2, max_in_flight=1)
+
+    assert [message["left"] for _, message in connection.sent] == [10, 50]
+    delay = connection.sent[1][0] - connection.sent[0][0]
+    assert 0.15 < delay < 0.3
+    assert channel.missed_acks >= 1
+
+
+def test_latest_setpoint_wins_while_window_full():
+    async def scenario(channel):
+        channel.submit({"action": "custom", "left": 1, "right": 1})
+        await asyncio.sleep(0.02)
+        for speed in (2, 3, 4):
+            channel.submit({"action": "custom", "left": speed, "right": speed})
+        await asyncio.sleep(0.3)
+
+    connection, channel = run_channel(scenario, ack_timeout=0.2, max_in_flight=1)
+
+    assert [message["left"] for _, message in connection.sent] == [1, 4]
+    assert channel.coalesced == 2
+
+
+class ScriptedConnection(SilentConnection):
+    """Conexão que entrega mensagens prontas do ESP32 e depois fica em silêncio"""
+
+    def __init__(self, messages):
+        super().__init__()
+        self.messages = list(messages)
+
+    async def __anext__(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.Event().wait()
+
+
+def test_config_queued_and_other_messages_forwarded():
+    received = []
+
+    async def main():
+        telemetry = json.dumps({"type": "telemetry", "udp_received": 3})
+        connection = ScriptedConnection([telemetry])
+        channel = CommandChannel(connection, on_message=received.append)
+        channel.start()
+        # Não bloqueia: só deposita na fila de configuração
+        assert channel.submit_config({"action": "gains", "kp": 1.0})
+        await asyncio.sleep(0.05)
+        await channel.close(flush_timeout=0)
+        return connection
+
+    connection = asyncio.run(main())
+    assert [message["action"] for _, message in connection.sent] == ["gains"]
+    assert [json.loads(message)["type"] for message in received] == ["telemetry"]
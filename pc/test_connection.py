@@ -1,12 +1,29 @@
 """
 Script para testar a conexão com o ESP32
 Use este script para verificar se tudo está funcionando antes de rodar o seguidor de linha
+
+Com --stress envia comandos numa rampa de taxas (ex.: 10 a 500 Hz) em JSON,
+binário e UDP e mede taxa alcançada, RTT dos acks (p50/p95/p99), timeouts
+e acks fora de ordem - no carrinho ou no emulador (esp32/emulator.py):
+
+    python test_connection.py 127.0.0.1 --stress --output stress.csv
 """
 
+import argparse
 import asyncio
+import csv
 import websockets
 import json
 import sys
+import time
+
+import numpy as np
+
+import protocol
+from udp_transport import UdpTransport
+
+# Rampa padrão de taxas do teste de carga (comandos por segundo)
+STRESS_RATES = [10, 20, 50, 100, 200, 500]
 
 async def test_esp32(esp32_ip, port=8765):
     """Testa conexão e comandos básicos com o ESP32"""
@@ -103,6 +120,188 @@ async def test_camera(camera_url=None):
         print(f"❌ Problemas na câmera ({success_count}/5 frames capturados)")
         return False
 
+def stress_message(encoding, seq, speed):
+    """Comando de teste (custom com a mesma velocidade nas duas rodas)"""
+    command = {"action": "custom", "left": speed, "right": speed}
+    if encoding == 'udp':
+        return protocol.encode_datagram(command, seq, time.monotonic() * 1000)
+    if encoding == 'binary':
+        return protocol.encode_command(command, seq)
+    return json.dumps(dict(command, seq=seq))
+
+def stress_ack_seq(message):
+    """seq confirmado por um ack, ou None (telemetria, erro)"""
+    if isinstance(message, bytes):
+        ack = protocol.decode_ack(message)
+        return ack[0] if ack else None
+    try:
+        ack = json.loads(message)
+    except ValueError:
+        return None
+    if isinstance(ack, dict) and ack.get("status") == "ok":
+        return ack.get("seq")
+    return None
+
+async def stress_step(connection, encoding, rate, duration, ack_timeout, speed, seq):
+    """
+    Envia comandos na taxa pedida por duration segundos
+    Retorna: (resultado do passo, próximo seq)
+    """
+    in_flight = {}  # seq -> horário de envio
+    rtts = []
+    result = {"encoding": encoding, "target_hz": rate, "sent": 0, "acked": 0,
+              "timeouts": 0, "out_of_order": 0}
+    last_acked = None
+    
+    async def receive():
+        nonlocal last_acked
+        async for message in connection:
+            now = time.monotonic()
+            acked = stress_ack_seq(message)
+            if acked is None:
+                continue
+            sent_at = in_flight.pop(acked, None)
+            if sent_at is None:
+                continue
+            # Ack de um seq anterior ao último confirmado (seq de 16 bits com wrap)
+            if last_acked is not None and (acked - last_acked) & 0xFFFF >= 0x8000:
+                result["out_of_order"] += 1
+            else:
+                last_acked = acked
+            rtts.append(now - sent_at)
+            result["acked"] += 1
+    
+    receiver = asyncio.create_task(receive())
+    interval = 1.0 / rate
+    start = time.monotonic()
+    next_time = start
+    try:
+        while time.monotonic() - start < duration:
+            seq = (seq + 1) & 0xFFFF
+            in_flight[seq] = time.monotonic()
+            # Em WebSocket o send espera o buffer de saída: a taxa alcançada mostra o limite
+            await connection.send(stress_message(encoding, seq, speed))
+            result["sent"] += 1
+            
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elapsed = time.monotonic() - start
+        
+        # Aguarda os acks que ainda estão a caminho
+        deadline = time.monotonic() + ack_timeout
+        while in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.005)
+    finally:
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
+    
+    # Acks que passaram do timeout também contam como perdidos
+    late = sum(1 for rtt in rtts if rtt > ack_timeout)
+    result["timeouts"] = len(in_flight) + late
+    result["achieved_hz"] = round(result["sent"] / elapsed, 1)
+    if rtts:
+        p50, p95, p99 = np.percentile(np.array(rtts) * 1000, (50, 95, 99))
+        result.update(rtt_p50_ms=round(p50, 2), rtt_p95_ms=round(p95, 2),
+                      rtt_p99_ms=round(p99, 2), rtt_max_ms=round(max(rtts) * 1000, 2))
+    return result, seq
+
+async def stress_connect(esp32_ip, encoding, port, udp_port):
+    """WebSocket (json/binary) ou socket UDP (udp) com a interface send + iteração"""
+    if encoding == 'udp':
+        connection = UdpTransport()
+        await connection.connect(esp32_ip, udp_port)
+        return connection
+    return await asyncio.wait_for(websockets.connect(f"ws://{esp32_ip}:{port}"), timeout=5)
+
+async def stress_test(esp32_ip, rates, encodings, duration=3.0, ack_timeout=0.5, speed=0,
+                      port=8765, udp_port=8766):
+    """Rampa de taxas para cada formato; retorna a lista de resultados por passo"""
+    results = []
+    for encoding in encodings:
+        print(f"\n🧪 Teste de carga: {encoding}")
+        # UDP: como no seguidor, um WebSocket fica aberto durante o teste; a conexão
+        # zera no ESP32 o seq e o atraso mínimo do canal UDP de execuções anteriores
+        keepalive = None
+        if encoding == 'udp':
+            try:
+                keepalive = await stress_connect(esp32_ip, 'json', port, udp_port)
+            except (OSError, asyncio.TimeoutError):
+                pass
+        
+        try:
+            connection = await stress_connect(esp32_ip, encoding, port, udp_port)
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"❌ Erro ao conectar ({encoding}): {e}")
+            if keepalive:
+                await keepalive.close()
+            continue
+        
+        seq = 0
+        try:
+            for rate in rates:
+                result, seq = await stress_step(connection, encoding, rate, duration,
+                                                ack_timeout, speed, seq)
+                results.append(result)
+                print(f"  {rate:>5g} Hz -> {result['achieved_hz']:>6.1f} Hz  "
+                      f"acks {result['acked']}/{result['sent']}  "
+                      f"RTT p50 {result.get('rtt_p50_ms', float('nan')):.1f} "
+                      f"p95 {result.get('rtt_p95_ms', float('nan')):.1f} "
+                      f"p99 {result.get('rtt_p99_ms', float('nan')):.1f} ms  "
+                      f"timeouts {result['timeouts']}  fora de ordem {result['out_of_order']}")
+        except (OSError, websockets.ConnectionClosed) as e:
+            print(f"❌ Conexão perdida: {e}")
+        finally:
+            # Para o carrinho antes de fechar
+            try:
+                await connection.send(stress_message(encoding, (seq + 1) & 0xFFFF, 0))
+            except (OSError, websockets.ConnectionClosed):
+                pass
+            await connection.close()
+            if keepalive:
+                await keepalive.close()
+    return results
+
+def write_stress_results(results, path):
+    """Grava os resultados em CSV ou JSON (pela extensão)"""
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        return
+    
+    fields = ["encoding", "target_hz", "achieved_hz", "sent", "acked", "timeouts",
+              "out_of_order", "rtt_p50_ms", "rtt_p95_ms", "rtt_p99_ms", "rtt_max_ms"]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(results)
+
+def parse_arguments():
+    """Parse argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(description='Teste de conexão do carrinho seguidor de linha')
+    parser.add_argument('esp32_ip', help='IP do ESP32 (ou 127.0.0.1 com o emulador)')
+    parser.add_argument('camera_url', nargs='?', default=None,
+                        help='URL da câmera (padrão: webcam do PC)')
+    parser.add_argument('--stress', action='store_true',
+                        help='Teste de carga: rampa de taxas de comando (sem teste de câmera)')
+    parser.add_argument('--rates', type=float, nargs='+', default=STRESS_RATES,
+                        help='Taxas do teste de carga em Hz (padrão: 10 20 50 100 200 500)')
+    parser.add_argument('--duration', type=float, default=3.0,
+                        help='Duração de cada taxa em segundos (padrão: 3)')
+    parser.add_argument('--encodings', nargs='+', choices=['json', 'binary', 'udp'],
+                        default=['json', 'binary', 'udp'],
+                        help='Formatos testados (padrão: todos)')
+    parser.add_argument('--ack-timeout', type=float, default=0.5,
+                        help='Ack mais lento que isto conta como timeout (s, padrão: 0.5)')
+    parser.add_argument('--speed', type=int, default=0,
+                        help='Velocidade dos comandos de teste (padrão: 0, motores parados)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--udp-port', type=int, default=8766)
+    parser.add_argument('--output', type=str, default=None, metavar='ARQUIVO',
+                        help='Salva os resultados do teste de carga (.csv ou .json)')
+    return parser.parse_args()
+
 def main():
     """Função principal"""
     print("=" * 60)
@@ -110,21 +309,24 @@ def main():
     print("=" * 60)
     print()
     
-    if len(sys.argv) < 2:
-        print("Uso: python test_connection.py <IP_DO_ESP32> [URL_CAMERA]")
-        print("\nExemplo:")
-        print("  python test_connection.py 192.168.1.100")
-        print("  python test_connection.py 192.168.1.100 http://192.168.1.101:8080/video")
-        sys.exit(1)
+    args = parse_arguments()
+    esp32_ip = args.esp32_ip
+    camera_url = args.camera_url
     
-    esp32_ip = sys.argv[1]
-    camera_url = sys.argv[2] if len(sys.argv) > 2 else None
+    if args.stress:
+        results = asyncio.run(stress_test(esp32_ip, args.rates, args.encodings, args.duration,
+                                          args.ack_timeout, args.speed, args.port,
+                                          args.udp_port))
+        if args.output and results:
+            write_stress_results(results, args.output)
+            print(f"\n✅ Resultados salvos em {args.output}")
+        sys.exit(0 if results else 1)
     
     # Testa câmera
     camera_ok = asyncio.run(test_camera(camera_url))
     
     # Testa ESP32
-    esp32_ok = asyncio.run(test_esp32(esp32_ip))
+    esp32_ok = asyncio.run(test_esp32(esp32_ip, args.port))
     
     # Resultado final
     print("\n" + "=" * 60)
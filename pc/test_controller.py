@@ -0,0 +1,108 @@
+"""Testes dos controladores de direção (controller.py)"""
+
+import numpy as np
+import pytest
+
+from controller import BangBangController, PIDController, SteeringController, evaluate_pid
+
+
+def run(pid, errors, dt=0.02):
+    return [float(pid.update(error, i * dt)) for i, error in enumerate(errors)]
+
+
+def test_output_clamped():
+    pid = PIDController(kp=1000.0, output_limit=70.0)
+    assert run(pid, [1.0, -1.0, 0.5]) == [70.0, -70.0, 70.0]
+
+    outputs = PIDController(kp=1000.0, output_limit=70.0).update(np.array([-1.0, 0.01, 1.0]), 0.0)
+    np.testing.assert_allclose(outputs, [-70.0, 10.0, 70.0])
+
+
+def test_anti_windup_while_saturated():
+    pid = PIDController(kp=100.0, ki=50.0, output_limit=20.0, integral_limit=20.0)
+    run(pid, [1.0] * 200)
+    # Saída saturada desde o início: o integral não acumula
+    assert pid.integral == 0.0
+
+    # Erro inverte: a saída responde na hora, sem descarregar integral acumulado
+    assert float(pid.update(-0.5, 200 * 0.02)) == -20.0
+
+
+def test_integral_accumulates_when_not_saturated():
+    pid = PIDController(kp=0.0, ki=10.0, output_limit=70.0, integral_limit=5.0)
+    outputs = run(pid, [1.0] * 100)
+    assert outputs[10] == pytest.approx(10 * 0.02 * 10.0)
+    # Limitado por integral_limit
+    assert outputs[-1] == pytest.approx(5.0)
+
+
+def test_derivative_filter_step_response():
+    tau, dt = 0.05, 0.01
+    pid = PIDController(kp=0.0, kd=1.0, derivative_tau=tau, output_limit=1e9)
+    outputs = run(pid, [0.0] + [1.0] * 30, dt)
+
+    raw = 1.0 / dt
+    alpha = dt / (tau + dt)
+    assert outputs[0] == 0.0
+    # Degrau: só uma fração alpha da derivada bruta passa no primeiro passo
+    assert outputs[1] == pytest.approx(alpha * raw)
+    assert outputs[1] < raw
+    # Depois decai geometricamente com (1 - alpha)
+    assert outputs[2] == pytest.approx(outputs[1] * (1 - alpha))
+    assert all(a > b for a, b in zip(outputs[1:], outputs[2:]))
+    assert outputs[-1] < 0.01 * outputs[1]
+
+
+def test_zero_dt_keeps_state():
+    pid = PIDController(kp=2.0, ki=5.0, kd=1.0)
+    first = float(pid.update(0.5, 1.0))
+    assert first == pytest.approx(1.0)  # só o termo proporcional
+
+    # Mesmo timestamp (ou anterior): sem divisão por zero, estado inalterado
+    integral, derivative = pid.integral, pid.derivative
+    for timestamp in (1.0, 0.5):
+        output = float(pid.update(0.8, timestamp))
+        assert np.isfinite(output)
+        assert output == pytest.approx(2.0 * 0.8)
+        assert (pid.integral, pid.derivative) == (integral, derivative)
+
+
+def test_very_large_dt():
+    pid = PIDController(kp=1.0, ki=10.0, kd=5.0, output_limit=70.0, integral_limit=30.0)
+    pid.update(0.0, 0.0)
+    output = float(pid.update(1.0, 1e6))
+    assert np.isfinite(output)
+    # Integral limitado e derivada desprezível (variação diluída no dt)
+    assert pid.integral == pytest.approx(30.0)
+    assert abs(pid.derivative) < 1e-5
+    assert output == pytest.approx(31.0, abs=1e-3)
+
+
+def test_scalar_update_matches_evaluate_pid():
+    rng = np.random.default_rng(0)
+    timestamps = np.cumsum(rng.uniform(0.01, 0.05, 100))
+    errors = np.cumsum(rng.normal(0, 0.1, (100, 3)), axis=0)
+    kp, ki, kd = np.array([40.0, 60.0, 80.0]), 10.0, np.array([0.0, 5.0, 10.0])
+
+    vector = evaluate_pid(errors, timestamps, kp, ki, kd, output_limit=70.0)
+    assert vector.shape == (100, 3)
+    for column in range(3):
+        pid = PIDController(kp[column], ki, kd[column], output_limit=70.0)
+        scalar = [float(pid.update(errors[i, column], t)) for i, t in enumerate(timestamps)]
+        np.testing.assert_allclose(vector[:, column], scalar)
+
+
+def test_steering_independent_of_resolution():
+    speeds = []
+    for width in (320, 640, 1280):
+        controller = SteeringController(kp=60.0, ki=0.0, kd=0.0)
+        speeds.append(controller.compute(0.25 * width / 2, width, 0.0, 45))
+    assert speeds[0] == speeds[1] == speeds[2]
+
+
+def test_bangbang_threshold_is_fraction_of_width():
+    controller = BangBangController(turn_speed=55, sharp_turn_threshold=150 / 320)
+    for width in (320, 640, 1280):
+        # Logo abaixo e logo acima do limiar, na mesma fração de cada resolução
+        assert controller.compute(0.45 * width / 2, width, 0.0, 45)[1] > 0
+        assert controller.compute(0.5 * width / 2, width, 0.0, 45) == (55, -16)
@@ -0,0 +1,157 @@
+"""Testes dos detectores de linha de canal único (detectors.py)"""
+
+import cv2
+import numpy as np
+import pytest
+
+from detectors import dark_mask, detect_bands, find_line_columns
+from frame_context import ProcessingContext
+from line_follower import LineFollower
+
+
+def track_frame(x0, x1, width=640, height=480, line=(20, 20, 20), background=(200, 200, 200)):
+    frame = np.full((height, width, 3), background, np.uint8)
+    cv2.rectangle(frame, (x0, 0), (x1 - 1, height - 1), line, -1)
+    return frame
+
+
+@pytest.mark.parametrize('channel', ['gray', 'v'])
+def test_dark_mask_channels(channel):
+    roi = track_frame(100, 140, height=60)
+    # Linha azul escura: V = máximo dos canais, gray pondera o azul por 0.114
+    roi[:, 100:140] = (90, 10, 10)
+    mask = dark_mask(roi, 50, channel)
+    line = mask[:, 100:140].all() if channel == 'gray' else not mask[:, 100:140].any()
+    assert line
+    assert not mask[:, :100].any() and not mask[:, 140:].any()
+
+
+def test_dark_mask_reuses_context_buffers():
+    context = ProcessingContext()
+    roi = track_frame(100, 140, height=60)
+    first = dark_mask(roi, 50, 'v', context)
+    second = dark_mask(roi, 50, 'v', context)
+    assert first is second
+    np.testing.assert_array_equal(first, dark_mask(roi, 50, 'v'))
+
+    # ROI já em tons de cinza (leitor MJPEG com --grayscale)
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    np.testing.assert_array_equal(dark_mask(gray, 50), dark_mask(roi, 50))
+
+
+def test_columns_pick_largest_run():
+    mask = np.zeros((60, 320), np.uint8)
+    mask[:, 40:50] = 255     # ruído estreito
+    mask[:, 200:230] = 255   # linha
+    mask[:3, 100:110] = 255  # poucas linhas: abaixo de min_column_fraction
+    cx, pixels, start, end = find_line_columns(mask)
+    assert (start, end) == (200, 230)
+    assert cx == 214
+    assert pixels == 60 * 30
+
+
+def test_columns_weighted_centroid():
+    mask = np.zeros((100, 50), np.uint8)
+    mask[:, 10:20] = 255
+    mask[:50, 20:30] = 255
+    cx, pixels, start, end = find_line_columns(mask)
+    assert (start, end, pixels) == (10, 30, 1500)
+    # (14.5 * 1000 + 24.5 * 500) / 1500 = 17.8, truncado como a coluna do centro
+    assert cx == 17
+
+
+def test_columns_reject_small_or_empty():
+    assert find_line_columns(np.zeros((60, 320), np.uint8)) is None
+    mask = np.zeros((60, 320), np.uint8)
+    mask[:, 10:11] = 255
+    assert find_line_columns(mask, min_area=100) is None
+
+
+@pytest.mark.parametrize('x0', [60, 300, 560])
+def test_fast_detector_matches_hsv(x0):
+    frame = track_frame(x0, x0 + 40)
+    centers = {}
+    for detector in ('hsv', 'fast'):
+        follower = LineFollower('127.0.0.1', headless=True, detector=detector)
+        _, line_center, deviation = follower.process_frame(frame, 0.0)
+        centers[detector] = line_center[0]
+        assert deviation == line_center[0] - 320
+    assert abs(centers['fast'] - centers['hsv']) <= 1
+    assert abs(centers['fast'] - (x0 + 19.5)) <= 1
+
+
+def test_fast_detector_without_line():
+    follower = LineFollower('127.0.0.1', headless=True, detector='fast')
+    _, line_center, _ = follower.process_frame(np.full((480, 640, 3), 200, np.uint8), 0.0)
+    assert line_center is None
+
+
+def line_mask(x_of_y, height=120, width=320, line_width=16):
+    """Máscara com a linha centrada em x_of_y(y) em cada linha da imagem"""
+    mask = np.zeros((height, width), np.uint8)
+    for y in range(height):
+        x = int(round(x_of_y(y)))
+        mask[y, max(0, x - line_width // 2):max(0, x + line_width // 2)] = 255
+    return mask
+
+
+def test_bands_straight_line():
+    estimate = detect_bands(line_mask(lambda y: 160), bands=6)
+    assert estimate.valid.all()
+    np.testing.assert_allclose(estimate.points[:, 0], 159.5)
+    # Faixa 0 = base da ROI
+    assert estimate.points[0, 1] > estimate.points[-1, 1]
+    np.testing.assert_allclose(estimate.widths, 16)
+    assert estimate.heading == pytest.approx(0, abs=1e-9)
+    assert estimate.curvature == pytest.approx(0, abs=1e-6)
+
+
+@pytest.mark.parametrize('slope', [0.5, -0.5])
+def test_bands_heading_sign(slope):
+    # x cresce para cima (y menor) com slope > 0: linha indo para a direita à frente
+    estimate = detect_bands(line_mask(lambda y: 160 + slope * (60 - y)), bands=6)
+    assert estimate.heading == pytest.approx(np.arctan(slope), abs=0.02)
+    assert estimate.curvature == pytest.approx(0, abs=0.05)
+
+
+def test_bands_curvature_sign():
+    # Curva que se abre para a direita à frente
+    left = detect_bands(line_mask(lambda y: 100 + 0.01 * (120 - y) ** 2), bands=6)
+    right = detect_bands(line_mask(lambda y: 220 - 0.01 * (120 - y) ** 2), bands=6)
+    assert left.valid.all() and right.valid.all()
+    assert left.heading > 0 and right.heading < 0
+    assert left.curvature * right.curvature < 0
+    assert abs(left.curvature) == pytest.approx(abs(right.curvature), rel=0.05)
+
+
+def test_bands_need_two_valid():
+    mask = np.zeros((120, 320), np.uint8)
+    mask[100:, 150:170] = 255
+    assert detect_bands(mask, bands=6) is None
+    mask[80:90, 150:170] = 255  # metade da faixa 1 (linhas 80 a 100)
+    estimate = detect_bands(mask, bands=6)
+    assert estimate.valid.tolist() == [True, True, False, False, False, False]
+    assert detect_bands(np.zeros((4, 320), np.uint8), bands=6) is None
+
+
+def test_bands_context_matches_plain():
+    context = ProcessingContext()
+    # Altura que não divide em faixas iguais: as linhas de cima são descartadas
+    mask = line_mask(lambda y: 120 + 0.4 * y, height=125)
+    plain = detect_bands(mask, bands=6)
+    for _ in range(2):
+        reused = detect_bands(mask, bands=6, context=context)
+        np.testing.assert_allclose(reused.points, plain.points)
+        assert reused.heading == plain.heading
+
+
+def test_bands_detector_heading_in_line_follower():
+    frame = np.full((480, 640, 3), 200, np.uint8)
+    cv2.line(frame, (300, 479), (420, 0), (20, 20, 20), 30)
+    follower = LineFollower('127.0.0.1', headless=True, detector='bands')
+    _, line_center, _ = follower.process_frame(frame, 0.0)
+    assert line_center is not None
+    heading = np.arctan(120 / 480)
+    assert follower.last_estimate.heading == pytest.approx(heading, abs=0.05)
+    # Normalizado por 90 graus para o controlador
+    assert follower.line_heading() == pytest.approx(heading / (np.pi / 2), abs=0.03)
@@ -0,0 +1,119 @@
+"""Testes da janela de debug fora do loop de controle (display.py)"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import display
+from display import DebugDisplay, render_status
+from line_follower import LineFollower
+
+
+class FakeHighgui:
+    """imshow/waitKey que registram as chamadas (o OpenCV headless não tem janela)"""
+
+    def __init__(self, keys=(), render_time=0.0):
+        self.shown = []
+        self.keys = list(keys)
+        self.render_time = render_time
+        self.threads = set()
+
+    def imshow(self, window, image):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.render_time)
+        self.shown.append(image[0, 0, 0])
+
+    def waitKey(self, delay):
+        time.sleep(delay / 1000)
+        return self.keys.pop(0) if self.keys else -1
+
+    def destroyWindow(self, window):
+        pass
+
+
+@pytest.fixture
+def highgui(monkeypatch):
+    fake = FakeHighgui(keys=[ord('p'), -1, ord('q')])
+    for name in ('imshow', 'waitKey', 'destroyWindow'):
+        monkeypatch.setattr(display.cv2, name, getattr(fake, name))
+    return fake
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+def test_due_limits_rate():
+    window = DebugDisplay(max_fps=10)
+    assert window.due()
+    window.submit(frame(1), {})
+    assert not window.due()
+    assert window.due(now=time.monotonic() + 0.1)
+
+
+def test_submit_copies_and_reuses_buffers():
+    window = DebugDisplay()
+    source = frame(1)
+    window.submit(source, {"frames": 1})
+    first = window._pending
+    assert first is not source
+    source[:] = 99
+    assert first[0, 0, 0] == 1
+
+    # Snapshot não desenhado é substituído; o buffer antigo vira o reserva
+    window.submit(frame(2), {"frames": 2})
+    assert window._pending[0, 0, 0] == 2 and window._spare is first
+    window.submit(frame(3), {"frames": 3})
+    assert window._pending is first and window._status == {"frames": 3}
+    assert window.submitted == 3
+
+    # Resolução diferente: buffer novo
+    window.submit(np.zeros((10, 10, 3), np.uint8), {})
+    assert window._pending.shape == (10, 10, 3)
+
+
+def test_renders_in_own_thread(highgui):
+    window = DebugDisplay(max_fps=100)
+    window.start()
+    try:
+        for value in range(1, 6):
+            window.submit(frame(value), {"frames": value})
+            time.sleep(0.03)
+        time.sleep(0.05)
+    finally:
+        window.stop()
+    assert highgui.threads == {'DebugDisplay'}
+    assert window.rendered == len(highgui.shown) >= 3
+    # O status desenhado por cima não altera o canto (0, 0) usado para identificar
+    assert highgui.shown[-1] == 5
+    assert window.keys() == [ord('p'), ord('q')]
+    assert window.keys() == []
+
+
+def test_slow_window_does_not_block_submit(highgui):
+    highgui.render_time = 0.2
+    window = DebugDisplay(max_fps=100)
+    window.start()
+    try:
+        start = time.monotonic()
+        for value in range(20):
+            window.submit(frame(value), {})
+        elapsed = time.monotonic() - start
+    finally:
+        window.stop()
+    assert elapsed < 0.1
+    assert window.rendered < window.submitted
+
+
+def test_render_status_draws_in_place():
+    image = np.zeros((200, 300, 3), np.uint8)
+    render_status(image, {"paused": True, "frames": 10, "line": False, "fps": 30})
+    assert image.any()
+
+
+def test_headless_disables_debug():
+    follower = LineFollower('127.0.0.1', debug=True, headless=True)
+    assert not follower.debug and not follower.draw
+    assert follower.display is None
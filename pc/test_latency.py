@@ -0,0 +1,111 @@
+"""Testes da sincronização de relógio e das janelas de latência (latency.py)"""
+
+import json
+
+import pytest
+
+from latency import ClockSync, LatencyMonitor, RollingWindow, wrap_signed
+from protocol import TIMING_PERIOD_US
+
+
+class EspClock:
+    """Relógio do ESP32: µs com wrap em 2^29, adiantado offset_us do PC"""
+
+    def __init__(self, offset_us):
+        self.offset_us = offset_us
+
+    def at(self, pc_time):
+        return (int(pc_time * 1e6) + self.offset_us) % TIMING_PERIOD_US
+
+
+def exchange(esp, sent, forward, esp_time, backward):
+    """Horários de um comando: (sent, recepção, PWM aplicado, ack) com atrasos em s"""
+    received = sent + forward
+    applied = received + esp_time
+    return sent, esp.at(received), esp.at(applied), applied + backward
+
+
+def test_wrap_signed():
+    assert wrap_signed(5) == 5
+    assert wrap_signed(TIMING_PERIOD_US - 5) == -5
+    assert wrap_signed(-TIMING_PERIOD_US // 2) == -TIMING_PERIOD_US // 2
+
+
+def test_offset_from_symmetric_exchange():
+    esp = EspClock(123_456_789)
+    clock = ClockSync()
+    clock.update(*exchange(esp, 100.0, 0.002, 0.0001, 0.002))
+    assert wrap_signed(clock.offset_us - esp.offset_us) == pytest.approx(0, abs=2)
+    assert clock.rtt == pytest.approx(0.004, abs=1e-5)
+
+
+def test_min_rtt_sample_wins():
+    esp = EspClock(-7_000_000 % TIMING_PERIOD_US)
+    clock = ClockSync(window=16)
+    # Amostras com fila assimétrica na volta erram o offset; a de menor RTT não
+    for i in range(10):
+        clock.update(*exchange(esp, 10.0 + i, 0.001, 0.0002, 0.030 + 0.005 * i))
+    clock.update(*exchange(esp, 20.0, 0.001, 0.0002, 0.0012))
+    for i in range(5):
+        clock.update(*exchange(esp, 21.0 + i, 0.001, 0.0002, 0.050))
+
+    assert clock.rtt == pytest.approx(0.0022, abs=1e-5)
+    # Erro limitado a metade da assimetria da amostra escolhida
+    assert abs(wrap_signed(clock.offset_us - esp.offset_us)) <= 150
+
+
+def test_offset_across_esp_wrap():
+    # O relógio do ESP32 dá a volta no meio da troca
+    esp = EspClock(TIMING_PERIOD_US - 1_000)
+    clock = ClockSync()
+    sent, received_us, applied_us, acked = exchange(esp, 0.0, 0.0005, 0.001, 0.0005)
+    assert applied_us < received_us
+    clock.update(sent, received_us, applied_us, acked)
+    assert wrap_signed(clock.offset_us - esp.offset_us) == pytest.approx(0, abs=2)
+    assert clock.to_pc(received_us, sent) == pytest.approx(0.0005, abs=2e-6)
+    assert clock.to_pc(applied_us, acked) == pytest.approx(0.0015, abs=2e-6)
+
+
+def test_window_forgets_old_samples():
+    esp = EspClock(0)
+    clock = ClockSync(window=4)
+    clock.update(*exchange(esp, 0.0, 0.0005, 0.0, 0.0005))
+    for i in range(4):
+        clock.update(*exchange(esp, 1.0 + i, 0.003, 0.0, 0.003))
+    assert clock.rtt == pytest.approx(0.006, abs=1e-5)
+
+
+def test_rolling_window_percentiles():
+    window = RollingWindow(size=100)
+    assert window.summary() is None
+    for value in range(1, 201):
+        window.add(value / 1000)
+    summary = window.summary()
+    # Só as últimas 100 amostras (101 a 200 ms)
+    assert summary["count"] == 200
+    assert summary["max_ms"] == pytest.approx(200)
+    assert summary["p50_ms"] == pytest.approx(150.5)
+
+
+def test_monitor_splits_stages(tmp_path):
+    log_path = tmp_path / "latencia.jsonl"
+    monitor = LatencyMonitor(str(log_path))
+    esp = EspClock(42_000_000)
+
+    stamps = monitor.frame(capture=0.990, decoded=0.995, start=0.996)
+    stamps.detected = 0.998
+    stamps.submitted = 0.999
+    monitor.frame_done(stamps)
+    sent, received_us, applied_us, acked = exchange(esp, 1.000, 0.002, 0.001, 0.003)
+    monitor.on_ack(stamps, sent, acked, (received_us, applied_us))
+    monitor.close()
+
+    summary = json.loads(log_path.read_text().splitlines()[-1])["stages"]
+    expected = {"decodificacao": 5, "espera": 1, "deteccao": 2, "controle": 1, "fila": 1,
+                "esp32": 1, "rtt": 6}
+    for stage, ms in expected.items():
+        assert summary[stage]["p50_ms"] == pytest.approx(ms, abs=0.01)
+    # Com uma amostra o offset divide a assimetria: ida e volta ficam com 2.5 ms
+    assert summary["rede_ida"]["p50_ms"] == pytest.approx(2.5, abs=0.01)
+    assert summary["rede_volta"]["p50_ms"] == pytest.approx(2.5, abs=0.01)
+    assert summary["total"]["p50_ms"] == pytest.approx(13.5, abs=0.01)
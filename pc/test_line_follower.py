@@ -0,0 +1,113 @@
+"""Testes do envio de comandos por frame do LineFollower (agendador e keepalive)"""
+
+import asyncio
+import json
+import types
+
+import pytest
+
+import command_channel
+import scheduler
+from command_channel import CommandChannel
+from line_follower import LineFollower
+from protocol import HOLD_MS
+
+
+class FakeClock:
+    """time.monotonic controlado pelo teste"""
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class AckingConnection:
+    """ESP32 falso: confirma cada comando na hora e guarda o horário de recepção"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.received = []
+        self._acks = asyncio.Queue()
+
+    async def send(self, message):
+        command = json.loads(message)
+        self.received.append((self.clock(), command))
+        self._acks.put_nowait(json.dumps({"status": "ok", "seq": command["seq"]}))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._acks.get()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    fake_time = types.SimpleNamespace(monotonic=clock)
+    monkeypatch.setattr(command_channel, 'time', fake_time)
+    monkeypatch.setattr(scheduler, 'time', fake_time)
+    return clock
+
+
+def run_frames(follower, clock, frames, fps):
+    """Processa frames [(centro da linha, desvio)]; retorna os comandos recebidos"""
+    connection = AckingConnection(clock)
+
+    async def scenario():
+        follower.channel = CommandChannel(connection, encoding='json')
+        follower.channel.start()
+        follower.scheduler.channel = follower.channel
+        for center, deviation in frames:
+            clock.now += 1 / fps
+            await follower.command_frame(center, deviation, 320, clock.now)
+            # Deixa o envio e o ack acontecerem antes do próximo frame
+            for _ in range(5):
+                await asyncio.sleep(0)
+        await follower.channel.close()
+
+    asyncio.run(scenario())
+    return connection.received
+
+
+def test_keepalive_derived_from_firmware_hold():
+    follower = LineFollower('127.0.0.1', headless=True)
+    assert follower.setpoint_keepalive == HOLD_MS / 2 / 1000
+    assert follower.scheduler.ceiling <= follower.setpoint_keepalive
+
+
+@pytest.mark.parametrize('fps', [30, 20])
+def test_keepalive_refreshes_well_inside_hold(clock, fps):
+    follower = LineFollower('127.0.0.1', headless=True)
+    # Curva fechada: o desvio oscila (agendador na taxa máxima), mas o bangbang
+    # repete o mesmo comando de curva brusca
+    frames = [((260, 200), 100 + 10 * (i % 2)) for i in range(3 * fps)]
+    received = run_frames(follower, clock, frames, fps)
+
+    # Setpoint repetido: a maioria é suprimida, mas o ESP32 nunca fica sem refresh
+    assert {(command["action"], command["left"], command["right"])
+            for _, command in received} == {("custom", 55, -16)}
+    assert follower.suppressed_commands > len(received)
+    gaps = [b - a for (a, _), (b, _) in zip(received, received[1:])]
+    assert max(gaps) <= follower.setpoint_keepalive + 1 / fps + 1e-9
+    # Sobra margem para a latência do enlace antes do decaimento da rampa
+    assert max(gaps) < 0.8 * HOLD_MS / 1000
+
+    # Só os envios de fato contam no agendador
+    assert follower.scheduler.sent == len(received)
+
+
+def test_lost_line_stops_immediately_then_keeps_alive(clock):
+    follower = LineFollower('127.0.0.1', headless=True)
+    frames = [((160, 200), 0)] * 10 + [(None, 0)] * 30
+    received = run_frames(follower, clock, frames, 30)
+
+    actions = [command["action"] for _, command in received]
+    first_stop = actions.index("stop")
+    assert set(actions[first_stop:]) == {"stop"}
+    # A parada sai no primeiro frame sem linha
+    assert received[first_stop][0] == pytest.approx(100.0 + 11 / 30)
+    gaps = [b - a for (a, _), (b, _) in zip(received[first_stop:], received[first_stop + 1:])]
+    assert gaps and max(gaps) <= follower.setpoint_keepalive + 1 / 30 + 1e-9
@@ -0,0 +1,148 @@
+"""Testes do leitor MJPEG (mjpeg_stream.py) contra o servidor local (mjpeg_server.py)"""
+
+import socket
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import mjpeg_stream
+from mjpeg_server import BOUNDARY, MjpegServer
+from mjpeg_stream import MjpegStream
+
+
+def make_jpeg(value, comment=None):
+    """JPEG 32x24 com um gradiente; comment vai num segmento COM logo após o SOI"""
+    image = np.full((24, 32, 3), value, np.uint8)
+    image[:, :, 1] = np.arange(32, dtype=np.uint8) * 4
+    jpeg = cv2.imencode('.jpg', image)[1].tobytes()
+    if comment:
+        segment = b'\xff\xfe' + (len(comment) + 2).to_bytes(2, 'big') + comment
+        jpeg = jpeg[:2] + segment + jpeg[2:]
+    return jpeg
+
+
+# Bytes de um delimitador completo, como o servidor os escreve
+PART_HEADER = (f"\r\n--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+               f"Content-Length: 3\r\n\r\n").encode()
+
+
+class ChunkedSocket:
+    """Socket que entrega no máximo size bytes por recv (força cortes no delimitador)"""
+
+    def __init__(self, sock, size):
+        self.sock = sock
+        self.size = size
+
+    def recv_into(self, buffer, nbytes=0):
+        return self.sock.recv_into(buffer[:self.size])
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    create_connection = socket.create_connection
+
+    def connect(*args, **kwargs):
+        return ChunkedSocket(create_connection(*args, **kwargs), 5)
+
+    monkeypatch.setattr(mjpeg_stream.socket, 'create_connection', connect)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(frames, **options):
+        server = MjpegServer(frames, port=0, **options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def read_frames(stream, count):
+    frames = []
+    for _ in range(count):
+        ok, frame = stream.read()
+        assert ok
+        frames.append(frame)
+    return frames
+
+
+def assert_known(frames, jpegs):
+    """Cada frame lido é exatamente a decodificação de um dos JPEGs servidos"""
+    expected = [cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR) for jpeg in jpegs]
+    for frame in frames:
+        assert any(np.array_equal(frame, image) for image in expected)
+
+
+@pytest.mark.parametrize('content_length', [True, False])
+def test_boundary_split_across_reads(serve, chunked, content_length):
+    jpegs = [make_jpeg(value) for value in (40, 120, 200)]
+    server = serve(jpegs, fps=200, content_length=content_length)
+    stream = MjpegStream(server.url, timeout=2.0)
+    try:
+        frames = read_frames(stream, 10)
+    finally:
+        stream.release()
+    assert_known(frames, jpegs)
+    assert stream.decoded == 10
+
+
+def test_jpeg_containing_boundary_bytes(serve, chunked):
+    jpegs = [make_jpeg(value, comment=PART_HEADER * 2) for value in (40, 200)]
+    assert all(f"--{BOUNDARY}".encode() in jpeg for jpeg in jpegs)
+
+    server = serve(jpegs, fps=200)
+    stream = MjpegStream(server.url, timeout=2.0)
+    try:
+        frames = read_frames(stream, 6)
+    finally:
+        stream.release()
+    assert_known(frames, jpegs)
+
+
+def test_reduced_decode(serve):
+    server = serve([make_jpeg(90)], fps=200)
+    stream = MjpegStream(server.url, decode_scale=2, grayscale=True, timeout=2.0)
+    try:
+        ok, frame = stream.read()
+    finally:
+        stream.release()
+    assert ok and frame.shape == (12, 16)
+
+
+def test_reconnect_after_server_drop(serve):
+    jpegs = [make_jpeg(value) for value in (40, 120, 200)]
+    # loop=False: o servidor encerra a conexão depois do último frame
+    server = serve(jpegs, fps=100, loop=False)
+    stream = MjpegStream(server.url, timeout=2.0)
+    try:
+        frames = read_frames(stream, 12)
+        assert stream.reconnects >= 2
+        assert stream.running and not stream.failed
+    finally:
+        stream.release()
+    assert_known(frames, jpegs)
+
+
+def test_gives_up_when_server_stays_down(serve):
+    server = serve([make_jpeg(40)], fps=100, loop=False)
+    stream = MjpegStream(server.url, timeout=2.0, reconnect_timeout=0.5)
+    server.stop()
+    try:
+        start = time.monotonic()
+        while stream.read()[0]:
+            pass
+        # read() espera a reconexão e só falha quando o leitor desiste
+        assert time.monotonic() - start >= 0.4
+        assert stream.failed and not stream.running
+    finally:
+        stream.release()
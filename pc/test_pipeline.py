@@ -0,0 +1,135 @@
+"""Testes do anel de frames em memória compartilhada e da leitura das detecções (pipeline.py)"""
+
+import queue
+
+import numpy as np
+
+from pipeline import Detection, FrameRing, VisionPipeline, put_latest
+
+
+def write(ring, seq):
+    slot = ring.begin_write(seq)
+    slot[:] = seq % 256
+    ring.commit(seq)
+
+
+def test_ring_wraparound():
+    ring = FrameRing((4, 6, 3), slots=4)
+    try:
+        for seq in range(1, 11):
+            write(ring, seq)
+        # Só os 4 frames mais novos continuam no anel
+        assert [seq for seq in range(1, 11) if ring.valid(seq)] == [7, 8, 9, 10]
+        for seq in (7, 8, 9, 10):
+            assert ring.slot(seq) == seq % 4
+            assert (ring.frame(seq) == seq).all()
+    finally:
+        ring.close()
+
+
+def test_overwritten_frame_detected_by_reader():
+    ring = FrameRing((2, 2), slots=3)
+    reader = FrameRing((2, 2), slots=3, name=ring.name)
+    try:
+        write(ring, 5)
+        assert reader.valid(5)
+        view = reader.frame(5)
+
+        # Escrita em andamento no mesmo slot (seq 8 = 5 + slots)
+        ring.begin_write(8)
+        assert not reader.valid(5) and not reader.valid(8)
+        ring.frame(8)[:] = 8
+        ring.commit(8)
+
+        # O leitor vê o frame novo pela mesma view, mas o seq denuncia a troca
+        assert not reader.valid(5) and reader.valid(8)
+        assert (view == 8).all()
+        del view
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_ring_dtype_and_initial_state():
+    ring = FrameRing((3, 5), slots=2, dtype=np.float32)
+    try:
+        assert ring.frames.dtype == np.float32
+        assert not ring.valid(1) and not ring.valid(2)
+        write(ring, 2)
+        assert ring.valid(2) and not ring.valid(1)
+    finally:
+        ring.close()
+
+
+def test_put_latest_drops_oldest():
+    q = queue.Queue(maxsize=2)
+    for item in range(5):
+        put_latest(q, item)
+    assert [q.get_nowait(), q.get_nowait()] == [3, 4]
+
+
+class TearingRing(FrameRing):
+    """Anel cujo slot é sobrescrito enquanto o processo principal copia o frame"""
+
+    def frame(self, seq):
+        view = super().frame(seq)
+        write(self, seq + self.slots)
+        return view
+
+
+def reading_pipeline(ring):
+    """VisionPipeline sem processos: as detecções são colocadas direto na fila"""
+    pipeline = VisionPipeline(0, {}, slots=ring.slots)
+    pipeline.ring = ring
+    pipeline._display = np.empty(ring.shape, np.uint8)
+    return pipeline
+
+
+def read(pipeline, seq, **kwargs):
+    pipeline._results.put(Detection(seq, 0.0, (3, 1), 0, 0.0, pipeline.ring.shape[1]))
+    return pipeline.read(timeout=5.0, **kwargs)
+
+
+def test_read_copies_frame_of_detection():
+    pipeline = reading_pipeline(FrameRing((2, 4), slots=4))
+    try:
+        write(pipeline.ring, 3)
+        frame, detection = read(pipeline, 3)
+        assert detection.seq == 3
+        assert (frame == 3).all()
+        assert pipeline.meter.torn == 0
+
+        frame, _ = read(pipeline, 3, copy_frame=False)
+        assert frame is None
+    finally:
+        pipeline.stop()
+
+
+def test_read_skips_overwritten_slot():
+    pipeline = reading_pipeline(FrameRing((2, 4), slots=4))
+    try:
+        # Primeira leitura com o slot já reutilizado: nada de memória não inicializada
+        write(pipeline.ring, 5)
+        write(pipeline.ring, 9)
+        frame, detection = read(pipeline, 5)
+        assert frame is None and detection.seq == 5
+
+        # Depois de um frame válido, não repete o frame da detecção anterior
+        assert (read(pipeline, 9)[0] == 9).all()
+        write(pipeline.ring, 13)
+        frame, detection = read(pipeline, 9)
+        assert frame is None and detection.seq == 9
+        assert pipeline.meter.torn == 2
+    finally:
+        pipeline.stop()
+
+
+def test_read_skips_torn_copy():
+    pipeline = reading_pipeline(TearingRing((2, 4), slots=4))
+    try:
+        write(pipeline.ring, 2)
+        frame, detection = read(pipeline, 2)
+        assert frame is None and detection.seq == 2
+        assert pipeline.meter.torn == 1
+    finally:
+        pipeline.stop()
@@ -0,0 +1,57 @@
+"""Testes do protocolo binário e da chave de setpoint (protocol.py)"""
+
+import struct
+
+import pytest
+
+import protocol
+from benchmark import load_esp32_module
+from protocol import setpoint_key
+
+
+def custom(left, right):
+    return {"action": "custom", "left": left, "right": right}
+
+
+def line(error, heading=0.0, confidence=1.0):
+    return {"action": "line", "error": error, "heading": heading, "confidence": confidence}
+
+
+@pytest.mark.parametrize('encoding', ['json', 'binary', 'datagram'])
+def test_speeds_rounded_like_firmware(encoding):
+    # drive() no ESP32 usa int(|v| + 0.5): 10.2 e 10.7 viram 10 e 11
+    assert setpoint_key(custom(10.2, 0), encoding) != setpoint_key(custom(10.7, 0), encoding)
+    assert setpoint_key(custom(10.2, 0), encoding) == setpoint_key(custom(10.4, 0), encoding)
+    assert setpoint_key(custom(-10.5, 0), encoding) == setpoint_key(custom(-11, 0), encoding)
+    assert setpoint_key(custom(150, -250), encoding) == (protocol.OP_CUSTOM, 100, -100, 0)
+
+
+def test_binary_fields_match_key():
+    command = custom(10.7, -33.5)
+    payload = protocol.encode_command(command, seq=7, flags=0)
+    opcode, seq, left, right, flags = struct.unpack(protocol.COMMAND_FORMAT, payload)
+    assert setpoint_key(command, 'binary') == (opcode, left, right, flags) == \
+        (protocol.OP_CUSTOM, 11, -34, 0)
+
+
+def test_line_key_follows_encoding():
+    a, b = line(0.1001), line(0.1002)
+    # Binário: mesma quantização (erro * 127) no fio
+    assert setpoint_key(a, 'binary') == setpoint_key(b, 'binary')
+    # JSON: o float vai inteiro no fio
+    assert setpoint_key(a, 'json') != setpoint_key(b, 'json')
+    assert setpoint_key(a, 'json') == (protocol.OP_LINE, 0.1001, 0.0, 1.0)
+
+
+def test_gains_have_no_binary_form():
+    with pytest.raises(ValueError):
+        setpoint_key({"action": "gains", "kp": 60})
+
+
+def test_constants_match_firmware():
+    firmware = load_esp32_module()
+    for name in ('COMMAND_FORMAT', 'ACK_FORMAT', 'UDP_COMMAND_FORMAT', 'LINE_SCALE',
+                 'FLAG_ACK_REQUESTED', 'HOLD_MS'):
+        assert getattr(protocol, name) == getattr(firmware, name), name
+    for action, opcode in protocol.ACTION_OPCODES.items():
+        assert firmware.ACTION_OPCODES[action] == opcode
@@ -0,0 +1,140 @@
+"""Testes da gravação e reprodução de execuções (recording.py)"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from line_follower import LineFollower
+from recording import (RECORD_DTYPE, Recording, ReplaySource, RunRecorder, compare_records,
+                       is_recording, replay_offline)
+
+
+def track_frames(count, width=320, height=240):
+    """Linha escura andando para a direita; sem linha no último frame"""
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width, 3), 200, np.uint8)
+        if i < count - 1:
+            x = 80 + 10 * i
+            cv2.rectangle(frame, (x, 0), (x + 20, height - 1), (20, 20, 20), -1)
+        frames.append(frame)
+    return frames
+
+
+def record_run(path, frames, follower=None, dt=1 / 30):
+    recorder = RunRecorder(path, {"detector": "fast"})
+    for i, frame in enumerate(frames):
+        timestamp = 100.0 + i * dt
+        recorder.write_frame(frame, timestamp)
+        if follower:
+            _, line_center, deviation = follower.process_frame(frame.copy(), timestamp)
+            recorder.write_detection(line_center, deviation, follower.line_heading())
+        else:
+            recorder.write_detection((i, i + 1), i - 5, 0.25)
+        recorder.write_command({"action": "custom", "left": i, "right": -i})
+    recorder.close()
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'corrida')
+    frames = track_frames(6)
+    record_run(path, frames)
+    assert is_recording(path) and not is_recording(str(tmp_path))
+
+    recording = Recording(path)
+    assert len(recording) == 6
+    assert isinstance(recording.frames, np.memmap)
+    np.testing.assert_array_equal(recording.frames, np.stack(frames))
+    np.testing.assert_allclose(recording.timestamps, 100.0 + np.arange(6) / 30)
+    assert recording.records['line_x'].tolist() == list(range(6))
+    assert recording.records['deviation'].tolist() == [i - 5 for i in range(6)]
+    assert recording.meta["shape"] == [240, 320, 3] and recording.meta["frames"] == 6
+    assert recording.meta["settings"] == {"detector": "fast"}
+
+    commands = recording.commands()
+    assert [command["left"] for command in commands] == list(range(6))
+    assert [command["frame"] for command in commands] == list(range(6))
+
+
+def test_frames_are_copy_on_write(tmp_path):
+    path = str(tmp_path / 'corrida')
+    record_run(path, track_frames(3))
+    recording = Recording(path)
+    recording.frames[0][:] = 0
+    assert Recording(path).frames[0].max() == 200
+
+
+def test_interrupted_recording(tmp_path):
+    path = str(tmp_path / 'corrida')
+    record_run(path, track_frames(4))
+    # Queda no meio do último frame: só os frames completos (e com registro) valem
+    frames_path = os.path.join(path, 'frames.raw')
+    with open(frames_path, 'r+b') as f:
+        f.truncate(os.path.getsize(frames_path) - 100)
+    assert len(Recording(path)) == 3
+
+
+def test_shape_change_rejected(tmp_path):
+    recorder = RunRecorder(str(tmp_path / 'corrida'))
+    recorder.write_frame(np.zeros((4, 4, 3), np.uint8), 0.0)
+    with pytest.raises(ValueError):
+        recorder.write_frame(np.zeros((4, 5, 3), np.uint8), 0.1)
+    recorder.close()
+
+
+def test_replay_source_fast_realtime_and_loop(tmp_path):
+    path = str(tmp_path / 'corrida')
+    frames = track_frames(4)
+    record_run(path, frames, dt=0.05)
+
+    source = ReplaySource(path, realtime=False)
+    start = time.monotonic()
+    read = [source.read()[1] for _ in range(4)]
+    assert time.monotonic() - start < 0.05
+    assert source.read() == (False, None)
+    np.testing.assert_array_equal(read[2], frames[2])
+
+    source = ReplaySource(path, realtime=True, loop=True)
+    start = time.monotonic()
+    times = []
+    for _ in range(5):
+        ok, _ = source.read()
+        assert ok
+        times.append(source.frame_time())
+    # Intervalos gravados respeitados e o loop recomeça do primeiro frame
+    assert time.monotonic() - start >= 0.14
+    np.testing.assert_allclose(np.diff(times[:4]), 0.05, atol=1e-6)
+
+
+def test_replay_offline_reproduces_recorded_detection(tmp_path):
+    path = str(tmp_path / 'corrida')
+    record_run(path, track_frames(8), LineFollower('127.0.0.1', headless=True,
+                                                   detector='fast'))
+    recording = Recording(path)
+
+    outputs, timings = replay_offline(recording, LineFollower('127.0.0.1', headless=True,
+                                                              detector='fast'))
+    assert outputs.dtype == RECORD_DTYPE and len(timings) == 8
+    np.testing.assert_array_equal(outputs, recording.records)
+    assert compare_records(recording.records, outputs) == {
+        "frames": 8, "detection_mismatch": 0, "deviation_mean_px": 0.0, "deviation_max_px": 0}
+
+    # O detector HSV diverge pouco e também perde a linha no último frame
+    outputs, _ = replay_offline(recording, LineFollower('127.0.0.1', headless=True))
+    result = compare_records(recording.records, outputs)
+    assert result["detection_mismatch"] == 0
+    assert result["deviation_max_px"] <= 2
+
+
+def test_compare_records_counts_mismatches():
+    recorded = np.zeros(3, RECORD_DTYPE)
+    replayed = np.zeros(3, RECORD_DTYPE)
+    recorded['deviation'] = [10, 20, 30]
+    replayed['deviation'] = [12, 20, 0]
+    replayed['line_x'][2] = -1
+    assert compare_records(recorded, replayed) == {
+        "frames": 3, "detection_mismatch": 1, "deviation_mean_px": 1.0, "deviation_max_px": 2}
@@ -0,0 +1,116 @@
+"""Testes do agendamento adaptativo de comandos (scheduler.py)"""
+
+import os
+
+import pytest
+
+import config
+from line_follower import LineFollower
+from scheduler import ACTIVITY_FULL, CommandScheduler
+
+
+class FakeChannel:
+    """Só os atributos do CommandChannel que o agendador lê"""
+
+    def __init__(self, rtt_avg=None, max_in_flight=4, backlog=0):
+        self.rtt_avg = rtt_avg
+        self.max_in_flight = max_in_flight
+        self.backlog = backlog
+
+
+def observe_steady(scheduler, rate, steps=50, dt=0.01):
+    """Erro variando a rate por segundo até a média exponencial convergir"""
+    for i in range(steps):
+        scheduler.observe(rate * i * dt, i * dt)
+
+
+def test_default_interval_from_pc_config():
+    # O config.py do PC, não o do firmware (esp32/config.py)
+    assert os.path.dirname(config.__file__) == os.path.dirname(os.path.abspath(__file__))
+    scheduler = CommandScheduler()
+    assert scheduler.base_interval == config.COMMAND_INTERVAL
+    assert scheduler.min_interval == config.COMMAND_INTERVAL / 4
+    assert scheduler.max_interval == config.COMMAND_INTERVAL * 2
+
+    follower = LineFollower('127.0.0.1', headless=True)
+    assert follower.command_interval == config.COMMAND_INTERVAL
+    assert follower.scheduler.base_interval == config.COMMAND_INTERVAL
+
+
+def test_dynamic_interval_between_min_and_max():
+    scheduler = CommandScheduler(base_interval=0.04)
+    assert scheduler.interval() == pytest.approx(0.08)  # reta (sem atividade)
+
+    observe_steady(scheduler, ACTIVITY_FULL * 10)
+    assert scheduler.interval() == pytest.approx(0.01)  # curva forte
+
+    moderate = CommandScheduler(base_interval=0.04)
+    observe_steady(moderate, ACTIVITY_FULL / 2)
+    assert 0.01 < moderate.interval() < 0.08
+
+
+def test_heading_raises_activity():
+    scheduler = CommandScheduler(base_interval=0.04)
+    for i in range(50):
+        scheduler.observe(0.0, i * 0.01, heading=1.0)
+    assert scheduler.interval() == pytest.approx(0.01)
+
+
+def test_link_interval_is_a_floor():
+    channel = FakeChannel(rtt_avg=0.1, max_in_flight=4)
+    scheduler = CommandScheduler(base_interval=0.04, channel=channel)
+    observe_steady(scheduler, ACTIVITY_FULL * 10)
+    # rtt / (janela * utilização) = 0.1 / 2 = 50 ms, acima do mínimo de 10 ms
+    assert scheduler.link_interval() == pytest.approx(0.05)
+    assert scheduler.interval() == pytest.approx(0.05)
+
+    # Acks acumulados espaçam mais
+    channel.backlog = 2
+    assert scheduler.link_interval() == pytest.approx(0.05 * 1.5)
+    channel.backlog = 1
+    assert scheduler.link_interval() == pytest.approx(0.05)
+
+
+def test_ceiling_caps_slow_link():
+    channel = FakeChannel(rtt_avg=2.0, max_in_flight=4, backlog=4)
+    scheduler = CommandScheduler(base_interval=0.04, channel=channel, ceiling=0.2)
+    assert scheduler.link_interval() > 0.2
+    assert scheduler.interval() == 0.2
+
+    # Mesmo urgente respeita o enlace, até o teto
+    scheduler.mark_sent(now=10.0)
+    assert not scheduler.due(now=10.19, urgent=True)
+    assert scheduler.due(now=10.21, urgent=True)
+
+
+def test_urgent_ignores_dynamics():
+    scheduler = CommandScheduler(base_interval=0.04, channel=FakeChannel(rtt_avg=0.02))
+    scheduler.mark_sent(now=5.0)
+    assert not scheduler.due(now=5.02)
+    assert not scheduler.due(now=5.005, urgent=True)
+    assert scheduler.due(now=5.011, urgent=True)
+    assert scheduler.due(now=5.08)
+
+
+def test_reset_restarts_rate_estimate():
+    scheduler = CommandScheduler(base_interval=0.04)
+    scheduler.observe(0.0, 0.0)
+    scheduler.reset()
+    # Sem reset, o salto de erro contaria como variação enorme
+    scheduler.observe(1.0, 0.01)
+    assert scheduler.activity == 0.0
+
+    # Timestamps fora de ordem não alteram a atividade
+    scheduler.observe(-1.0, 0.005)
+    assert scheduler.activity == 0.0
+
+
+def test_stats():
+    channel = FakeChannel(rtt_avg=0.4)
+    scheduler = CommandScheduler(base_interval=0.04, channel=channel)
+    scheduler.mark_sent(now=1.0, urgent=True)
+    scheduler.mark_sent(now=1.2)
+    stats = scheduler.stats()
+    assert stats["sent"] == 2 and stats["urgent"] == 1
+    assert stats["link_limited"] == 1.0
+    assert stats["avg_interval_ms"] == pytest.approx(200.0)
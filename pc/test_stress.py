@@ -0,0 +1,131 @@
+"""Testes do modo de carga de test_connection.py (--stress)"""
+
+import asyncio
+import importlib.util
+import json
+import socket
+import struct
+
+import pytest
+
+import protocol
+from benchmark import ESP32_EMULATOR
+from test_connection import (stress_ack_seq, stress_message, stress_step, stress_test,
+                             write_stress_results)
+
+
+class ReorderingConnection:
+    """ESP32 falso: confirma cada comando, trocando a ordem de cada par de acks"""
+
+    def __init__(self, encoding, drop_every=0):
+        self.encoding = encoding
+        self.drop_every = drop_every
+        self.sent = []
+        self._held = None
+        self._acks = asyncio.Queue()
+
+    async def send(self, message):
+        seq = json.loads(message)["seq"] if self.encoding == 'json' else \
+            struct.unpack_from('<BH', message)[1]
+        self.sent.append(seq)
+        if self.drop_every and len(self.sent) % self.drop_every == 0:
+            return
+        ack = (json.dumps({"status": "ok", "seq": seq}) if self.encoding == 'json'
+               else struct.pack(protocol.ACK_FORMAT, protocol.OP_ACK, seq, 0))
+        if self._held is None:
+            self._held = ack
+        else:
+            self._acks.put_nowait(ack)
+            self._acks.put_nowait(self._held)
+            self._held = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._acks.get()
+
+
+@pytest.mark.parametrize('encoding', ['json', 'binary', 'udp'])
+def test_message_round_trip(encoding):
+    message = stress_message(encoding, 513, 40)
+    if encoding == 'json':
+        assert json.loads(message) == {"action": "custom", "left": 40, "right": 40, "seq": 513}
+        return
+    fields = struct.unpack(protocol.UDP_COMMAND_FORMAT if encoding == 'udp'
+                           else protocol.COMMAND_FORMAT, message)
+    assert fields[:5] == (protocol.OP_CUSTOM, 513, 40, 40, protocol.FLAG_ACK_REQUESTED)
+
+
+def test_ack_seq_parsing():
+    assert stress_ack_seq(struct.pack(protocol.ACK_FORMAT, protocol.OP_ACK, 77, 0)) == 77
+    # Ack UDP: ack normal seguido do timestamp ecoado e dos horários
+    assert stress_ack_seq(struct.pack('<BHBIII', protocol.OP_ACK, 78, 0, 1, 2, 3)) == 78
+    assert stress_ack_seq(json.dumps({"status": "ok", "seq": 79})) == 79
+    assert stress_ack_seq(json.dumps({"status": "error", "seq": 80})) is None
+    assert stress_ack_seq(json.dumps({"type": "telemetry", "commands": 3})) is None
+    assert stress_ack_seq("não é json") is None
+    assert stress_ack_seq(b'\x01\x02') is None
+
+
+@pytest.mark.parametrize('encoding', ['json', 'binary'])
+def test_step_counts_reordered_and_lost_acks(encoding):
+    async def scenario():
+        connection = ReorderingConnection(encoding, drop_every=10)
+        return await stress_step(connection, encoding, rate=200, duration=0.2,
+                                 ack_timeout=0.05, speed=0, seq=0xFFF0)
+
+    result, seq = asyncio.run(scenario())
+    sent = result["sent"]
+    assert sent >= 30 and seq == (0xFFF0 + sent) & 0xFFFF
+    # Um em cada 10 sem ack; o ack guardado no fim também não chega
+    assert result["timeouts"] >= sent // 10
+    assert result["acked"] + result["timeouts"] == sent
+    # Cada par trocado gera um ack atrasado (inclusive na volta do seq de 16 bits)
+    assert result["out_of_order"] >= result["acked"] // 2 - 1
+    assert result["rtt_p50_ms"] <= result["rtt_p99_ms"] <= result["rtt_max_ms"]
+
+
+def free_port(kind):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def load_emulator():
+    spec = importlib.util.spec_from_file_location('esp32_emulator', ESP32_EMULATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_stress_against_emulator(tmp_path):
+    emulator_module = load_emulator()
+    port, udp_port = free_port(socket.SOCK_STREAM), free_port(socket.SOCK_DGRAM)
+
+    async def scenario():
+        emulator = emulator_module.EmulatedESP32(port=port, udp_port=udp_port)
+        await emulator.start()
+        try:
+            return await stress_test('127.0.0.1', [50, 200], ['json', 'binary', 'udp'],
+                                     duration=0.2, port=port, udp_port=udp_port)
+        finally:
+            await emulator.stop()
+
+    results = asyncio.run(scenario())
+    assert [(r["encoding"], r["target_hz"]) for r in results] == [
+        ('json', 50), ('json', 200), ('binary', 50), ('binary', 200), ('udp', 50), ('udp', 200)]
+    for result in results:
+        assert result["acked"] == result["sent"] > 0
+        assert result["timeouts"] == 0 and result["out_of_order"] == 0
+
+    path = str(tmp_path / 'stress.csv')
+    write_stress_results(results, path)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("encoding,target_hz,achieved_hz") and len(lines) == 7
+
+    path = str(tmp_path / 'stress.json')
+    write_stress_results(results, path)
+    with open(path) as f:
+        assert json.load(f) == results
@@ -0,0 +1,83 @@
+"""Testes do rastreamento da linha entre frames (tracking.py)"""
+
+import pytest
+
+from tracking import LineTracker
+
+
+def follow(tracker, positions, width=640, dt=1 / 30):
+    """Alimenta posições (fração da largura) e retorna as janelas usadas"""
+    windows = []
+    for i, position in enumerate(positions):
+        x0, x1 = tracker.window(width, i * dt)
+        windows.append((x0, x1))
+        assert x0 <= position * width <= x1
+        tracker.update(position * width, width)
+    return windows
+
+
+def test_first_search_uses_full_width():
+    tracker = LineTracker()
+    assert tracker.window(640, 0.0) == (0, 640)
+    assert not tracker.tracking
+
+
+def test_window_narrows_on_steady_line():
+    tracker = LineTracker()
+    windows = follow(tracker, [0.5] * 20)
+    spans = [x1 - x0 for x0, x1 in windows]
+    assert spans[0] == 640
+    # Estabiliza na largura mínima, centrada na linha
+    assert spans[-1] == int(0.25 * 640)
+    assert windows[-1] == (240, 400)
+    assert tracker.stats()["pixels_fraction"] < 0.5
+
+
+def test_window_follows_moving_line():
+    tracker = LineTracker()
+    # Linha andando 0.3 da largura por segundo
+    positions = [0.2 + 0.01 * i for i in range(40)]
+    windows = follow(tracker, positions)
+    x0, x1 = windows[-1]
+    assert x1 - x0 < 640
+    assert tracker.velocity == pytest.approx(0.3, rel=0.1)
+
+
+def test_window_kept_inside_frame():
+    tracker = LineTracker()
+    follow(tracker, [0.02] * 10)
+    x0, x1 = tracker.window(640, 10 / 30)
+    assert x0 == 0 and x1 == int(0.25 * 640)
+
+
+def test_miss_resets_to_full_width():
+    tracker = LineTracker()
+    follow(tracker, [0.5] * 10)
+    tracker.miss()
+    assert not tracker.tracking
+    assert tracker.window(640, 1.0) == (0, 640)
+
+
+def test_measurement_at_window_edge_resets():
+    tracker = LineTracker()
+    follow(tracker, [0.5] * 10)
+    x0, x1 = tracker.window(640, 10 / 30)
+    tracker.update(x0 + 2, 640)
+    assert not tracker.tracking
+
+    # Na borda do frame (janela encostada em 0) não reseta
+    follow(tracker, [0.05] * 10)
+    x0, _ = tracker.window(640, 20 / 30)
+    assert x0 == 0
+    tracker.update(2, 640)
+    assert tracker.tracking
+
+
+def test_long_gap_widens_window():
+    tracker = LineTracker()
+    follow(tracker, [0.5] * 10)
+    narrow = tracker.window(640, 10 / 30)
+    tracker.update(320, 640)
+    # Um segundo sem frames: a incerteza cresce até a largura toda
+    assert narrow != (0, 640)
+    assert tracker.window(640, 2.0) == (0, 640)
@@ -0,0 +1,132 @@
+"""
+Rastreamento da linha entre frames
+Um filtro de Kalman de velocidade constante prevê a posição da linha no
+próximo frame; a detecção roda só numa janela em torno da previsão e volta
+para a largura toda da ROI quando a linha some ou encosta na borda da janela
+"""
+
+import math
+
+
+class LineTracker:
+    """
+    Filtro de Kalman 1D (posição, velocidade) para a coluna da linha
+    As posições são frações da largura do frame (0 a 1), então os parâmetros
+    não dependem da resolução
+    """
+
+    def __init__(self, process_noise=4.0, measurement_noise=1e-4, min_window=0.25,
+                 gate_sigma=3.0, window_step=0.125, edge_margin=0.02):
+        # Ruído de aceleração (fração/s²)² e ruído da medição (fração²)
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        # Largura mínima da janela (fração do frame) e largura em desvios-padrão
+        self.min_window = min_window
+        self.gate_sigma = gate_sigma
+        # A largura é arredondada para múltiplos do passo: poucas formas de
+        # buffer no ProcessingContext
+        self.window_step = window_step
+        # Medição a menos disso da borda da janela = confiança baixa
+        self.edge_margin = edge_margin
+
+        # Estatísticas
+        self.full_searches = 0
+        self.window_searches = 0
+        self.pixels_fraction = 0.0
+        self.reset()
+
+    def reset(self):
+        """Descarta o estado: a próxima busca usa a largura toda"""
+        self.position = None
+        self.velocity = 0.0
+        self.p00 = self.p01 = self.p11 = 0.0
+        self._time = None
+        self._window = None
+
+    @property
+    def tracking(self):
+        return self.position is not None
+
+    def predict(self, timestamp):
+        """Avança o estado até timestamp (segundos)"""
+        if self._time is not None:
+            dt = max(0.0, timestamp - self._time)
+            q = self.process_noise
+            # x = F x ; P = F P F' + Q (aceleração branca)
+            self.position += self.velocity * dt
+            self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+            self.p01 += dt * self.p11 + q * dt ** 2 / 2
+            self.p11 += q * dt
+        self._time = timestamp
+
+    def window(self, width, timestamp):
+        """
+        Colunas (x0, x1) a examinar no frame de largura width
+        Sem rastreamento retorna a largura toda
+        """
+        if self.position is None:
+            self._window = None
+            self.full_searches += 1
+            self.pixels_fraction += 1.0
+            return 0, width
+
+        self.predict(timestamp)
+        sigma = math.sqrt(self.p00 + self.measurement_noise)
+        size = max(self.min_window, 2 * self.gate_sigma * sigma)
+        size = math.ceil(size / self.window_step) * self.window_step
+        if size >= 1.0:
+            self._window = None
+            self.full_searches += 1
+            self.pixels_fraction += 1.0
+            return 0, width
+
+        # Desloca (sem encolher) a janela para dentro do frame
+        span = int(round(size * width))
+        x0 = int(round(self.position * width)) - span // 2
+        x0 = max(0, min(width - span, x0))
+        self._window = (x0, x0 + span)
+        self.window_searches += 1
+        self.pixels_fraction += span / width
+        return self._window
+
+    def update(self, x, width):
+        """Incorpora a coluna medida (pixels no frame de largura width)"""
+        z = x / width
+
+        if self.position is None:
+            # Primeira medição: posição conhecida, velocidade incerta
+            self.position = z
+            self.velocity = 0.0
+            self.p00 = self.measurement_noise
+            self.p01 = 0.0
+            self.p11 = 1.0
+            return
+
+        # Ganho de Kalman com H = [1, 0]
+        s = self.p00 + self.measurement_noise
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        innovation = z - self.position
+        self.position += k0 * innovation
+        self.velocity += k1 * innovation
+        self.p11 -= k1 * self.p01
+        self.p01 -= k0 * self.p01
+        self.p00 -= k0 * self.p00
+
+        # Linha encostada na borda da janela: pode estar saindo dela
+        if self._window:
+            x0, x1 = self._window
+            margin = self.edge_margin * width
+            if (x0 > 0 and x - x0 < margin) or (x1 < width and x1 - x < margin):
+                self.reset()
+
+    def miss(self):
+        """Linha não encontrada na janela: volta para a busca completa"""
+        self.reset()
+
+    def stats(self):
+        """Fração média de colunas examinadas e contagem de cada tipo de busca"""
+        searches = self.full_searches + self.window_searches
+        return {"full_searches": self.full_searches,
+                "window_searches": self.window_searches,
+                "pixels_fraction": self.pixels_fraction / searches if searches else 1.0}
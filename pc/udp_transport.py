@@ -0,0 +1,56 @@
+"""
+Transporte UDP para o canal de controle
+Sem retransmissões nem bloqueio por ordem: um datagrama perdido é simplesmente
+substituído pelo próximo setpoint
+"""
+
+import asyncio
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """Encaminha os datagramas recebidos (acks) para uma fila"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def datagram_received(self, data, addr):
+        self.queue.put_nowait(data)
+
+    def error_received(self, exc):
+        # ICMP "porta inalcançável" etc. - o datagrama é tratado como perdido
+        pass
+
+    def connection_lost(self, exc):
+        self.queue.put_nowait(None)
+
+
+class UdpTransport:
+    """Interface compatível com a conexão WebSocket usada pelo CommandChannel"""
+
+    def __init__(self):
+        self.transport = None
+        self._queue = asyncio.Queue()
+
+    async def connect(self, host, port):
+        """Cria o socket UDP ligado ao ESP32"""
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self._queue), remote_addr=(host, port))
+
+    async def send(self, data):
+        """Envia um datagrama (nunca espera pela rede)"""
+        self.transport.sendto(data)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self._queue.get()
+        if data is None:
+            raise StopAsyncIteration
+        return data
+
+    async def close(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None